@@ -0,0 +1,182 @@
+"""
+Async variants of the password endpoints.
+
+DRF views are synchronous, so these are plain Django async views. Password
+hashing runs on the bounded pool in ``api.hashers`` and database work on
+Django's sync thread, leaving the event loop free for other requests when
+the project is served over ASGI. The request and response bodies match the
+synchronous views.
+"""
+import json
+import logging
+import math
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model, password_validation
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.audit import model_to_json
+
+from .authentication import CachedJWTAuthentication
+from .hashers import ahash_password, averify_password
+from .throttling import check_buckets
+from .tokens import VersionedRefreshToken
+from .views import apply_new_password, register_user
+
+User = get_user_model()
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _token_pair(user):
+    refresh = VersionedRefreshToken.for_user(user)
+    return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+
+def _throttled(request, phone_number):
+    """429 response when the caller's password-endpoint buckets are empty."""
+    wait = check_buckets(request, "password", phone_number)
+    if wait is None:
+        return None
+    response = JsonResponse({"detail": "Request was throttled."}, status=429)
+    response["Retry-After"] = str(math.ceil(wait))
+    return response
+
+
+async def _verify_and_upgrade(user, raw_password):
+    valid, new_hash = await averify_password(raw_password, user.password)
+    if valid and new_hash:
+        user.password = new_hash
+        await user.asave(update_fields=["password"])
+    return valid
+
+
+@csrf_exempt
+@require_POST
+async def self_register(request):
+    logger = logging.getLogger("user_registration")
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+    throttled = _throttled(request, data.get("phone_number"))
+    if throttled is not None:
+        return throttled
+
+    phone_number = data.get("phone_number")
+    if not data.get("full_name") or not phone_number:
+        logger.warning(f"Validation failed - Missing fields | phone: {phone_number}")
+        return JsonResponse({"error": "full_name and phone_number are required"}, status=400)
+    if await User.objects.by_phone(phone_number).aexists():
+        logger.warning(f"Validation failed - Phone already registered | phone: {phone_number}")
+        return JsonResponse({"error": "A user with this phone number already exists"}, status=400)
+
+    try:
+        password_hash = await ahash_password(data.get("password"))
+        user = await sync_to_async(register_user)(data, password_hash)
+    except Exception as e:
+        logger.exception(f"Registration failed | phone: {phone_number} | error={str(e)}")
+        return JsonResponse({"error": "Internal server error"}, status=500)
+    user_data = await sync_to_async(model_to_json)(user, exclude=["password", "last_login", "updated_date"])
+    logger.info("User registered successfully | user_data=" + json.dumps(user_data))
+    return JsonResponse({"message": "Registration successful"})
+
+
+@csrf_exempt
+@require_POST
+async def set_new_password(request):
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+    throttled = _throttled(request, data.get("phone_number"))
+    if throttled is not None:
+        return throttled
+    phone_number = data.get("phone_number")
+    password = data.get("password")
+    if not phone_number or not password:
+        return JsonResponse({"error": "Phone number and password are required"}, status=400)
+
+    user = await User.objects.by_phone(phone_number).afirst()
+    if user is None:
+        return JsonResponse({"error": f"Phone {phone_number} does not exist"}, status=404)
+    if user.has_usable_password():
+        return JsonResponse({"error": "User already has a password. Please login instead."}, status=400)
+
+    tokens = await sync_to_async(apply_new_password)(user, await ahash_password(password))
+    return JsonResponse({
+        "message": "Password set successfully",
+        "user": {
+            "id": user.id,
+            "full_name": user.full_name,
+            "phone_number": user.phone_number,
+        },
+        **tokens,
+    })
+
+
+@csrf_exempt
+@require_POST
+async def change_password(request):
+    try:
+        authenticated = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed as e:
+        # Same body DRF's exception handler would render
+        return JsonResponse(e.detail if isinstance(e.detail, dict) else {"detail": e.detail}, status=401)
+    if authenticated is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+    user = authenticated[0]
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+    errors = {}
+    for field in ("old_password", "new_password", "confirm_password"):
+        if not data.get(field):
+            errors[field] = ["This field is required."]
+    if errors:
+        return JsonResponse(errors, status=400)
+    if not await _verify_and_upgrade(user, data["old_password"]):
+        return JsonResponse({"old_password": ["Old password is not correct"]}, status=400)
+    if data["new_password"] != data["confirm_password"]:
+        return JsonResponse({"confirm_password": ["Password confirmation does not match"]}, status=400)
+    try:
+        password_validation.validate_password(data["new_password"], user)
+    except ValidationError as e:
+        return JsonResponse({"new_password": list(e.messages)}, status=400)
+
+    tokens = await sync_to_async(apply_new_password)(user, await ahash_password(data["new_password"]))
+    return JsonResponse({"detail": "Password changed successfully", **tokens})
+
+
+@csrf_exempt
+@require_POST
+async def obtain_token_pair(request):
+    """Async counterpart of ``auth/jwt/create/``."""
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
+    throttled = _throttled(request, data.get("phone_number"))
+    if throttled is not None:
+        return throttled
+    phone_number = data.get("phone_number")
+    password = data.get("password")
+    if not phone_number or not password:
+        return JsonResponse({"detail": "phone_number and password are required"}, status=400)
+
+    user = await User.objects.by_phone(phone_number).afirst()
+    if user is None:
+        # Same cost as a real check so timing does not reveal registered numbers
+        await ahash_password(password)
+    if user is None or not user.is_active or not await _verify_and_upgrade(user, password):
+        return JsonResponse({"detail": "No active account found with the given credentials"}, status=401)
+    # for_user() reads the user's memberships for the role claim
+    return JsonResponse(await sync_to_async(_token_pair)(user))
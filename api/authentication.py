@@ -0,0 +1,85 @@
+import copy
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .hashers import hash_password, verify_password
+from .invalidation import invalidate_now_and_on_commit
+from .lrucache import MISSING, TTLCache
+from .tokens import TOKEN_VERSION_CLAIM
+
+user_cache = TTLCache(
+    max_entries=getattr(settings, "AUTH_USER_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "AUTH_USER_CACHE_TTL", 300),
+)
+
+
+def invalidate_cached_user(user_id):
+    """Make the next request of ``user_id`` load the user from the database."""
+    keys = [str(user_id)]
+    invalidate_now_and_on_commit(lambda: user_cache.delete_many(keys))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that keeps authenticated users in a process-local
+    LRU cache instead of loading ``CustomUser`` on every request.
+
+    Tokens whose ``ver`` claim differs from the user's ``token_version`` are
+    rejected, which is how password changes revoke older tokens.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            key = str(validated_token[api_settings.USER_ID_CLAIM])
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        cached = user_cache.get(key)
+        if cached is MISSING:
+            user = super().get_user(validated_token)
+            user_cache.set(key, copy.copy(user))
+        else:
+            # Views may modify request.user; never hand out the cached instance
+            user = copy.copy(cached)
+
+        if validated_token.get(TOKEN_VERSION_CLAIM, 0) != user.token_version:
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        return user
+
+
+def check_user_password(user, raw_password):
+    """
+    Verify ``raw_password`` for ``user`` on the hashing pool, saving the
+    upgraded hash when the configured work factor changed.
+    """
+    valid, new_hash = verify_password(raw_password, user.password)
+    if valid and new_hash:
+        user.password = new_hash
+        user.save(update_fields=["password"])
+    return valid
+
+
+class PooledModelBackend(ModelBackend):
+    """``ModelBackend`` that hashes on the bounded pool instead of the request thread."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Spend the same time as a real check so timing does not reveal
+            # which numbers are registered
+            hash_password(password)
+            return None
+        if check_user_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,154 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Edir, FeeAssignment, MemberBalance
+from .responsecache import invalidate_edir_responses
+
+BALANCE_FIELDS = ("outstanding", "pending", "paid")
+ZERO = Decimal("0.00")
+
+# Expense fees are assigned to the supported member with the edir's
+# WITHDRAW transaction; that payout is not a member balance
+INCOME = Q(fee__fee_type="Income")
+UNPAID = INCOME & Q(fee__status="Active") & (
+    Q(transaction__isnull=True) | ~Q(transaction__payment_status__in=["APPROVED", "PENDING"])
+)
+PENDING = INCOME & Q(transaction__transaction_type="PAYMENT", transaction__payment_status="PENDING")
+PAID = INCOME & Q(transaction__transaction_type="PAYMENT", transaction__payment_status="APPROVED")
+
+
+def unpaid_assignments():
+    """Fee assignments of active fees with no approved or pending payment."""
+    return FeeAssignment.objects.filter(UNPAID)
+
+
+def balance_totals(assignments):
+    """
+    ``{(user_id, edir_id): {"outstanding": ..., "pending": ..., "paid": ...}}``
+    computed from the raw ``assignments`` in one grouped query.
+    """
+    rows = (
+        assignments.filter(user__isnull=False)
+        .order_by()
+        .values("user_id", "fee__edir_id")
+        .annotate(
+            outstanding=Sum("fee__amount", filter=UNPAID),
+            pending=Sum("fee__amount", filter=PENDING),
+            paid=Sum("fee__amount", filter=PAID),
+        )
+    )
+    return {
+        (row["user_id"], row["fee__edir_id"]): {field: row[field] or ZERO for field in BALANCE_FIELDS}
+        for row in rows
+    }
+
+
+def refresh_member_balances(edir_id, user_ids):
+    """
+    Recompute the ``MemberBalance`` rows of ``user_ids`` in ``edir_id`` from
+    their fee assignments and upsert them in one statement, inside the
+    caller's transaction.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    if edir_id is None or not user_ids:
+        return
+    totals = balance_totals(FeeAssignment.objects.filter(fee__edir_id=edir_id, user_id__in=user_ids))
+    zero = dict.fromkeys(BALANCE_FIELDS, ZERO)
+    MemberBalance.objects.bulk_create(
+        [
+            MemberBalance(user_id=user_id, edir_id=edir_id, **totals.get((user_id, edir_id), zero))
+            for user_id in user_ids
+        ],
+        update_conflicts=True,
+        unique_fields=["user", "edir"],
+        update_fields=[*BALANCE_FIELDS, "updated_at"],
+    )
+    invalidate_edir_responses(edir_id)
+
+
+def assigned_members(assignments):
+    """``{edir_id: {user_id, ...}}`` for the members ``assignments`` belong to."""
+    members = defaultdict(set)
+    for user_id, edir_id in assignments.order_by().values_list("user_id", "fee__edir_id").distinct():
+        members[edir_id].add(user_id)
+    return members
+
+
+def refresh_assigned_members(members):
+    """Refresh the balances in an ``assigned_members()`` mapping, one upsert per edir."""
+    for edir_id, user_ids in members.items():
+        refresh_member_balances(edir_id, user_ids)
+
+
+def refresh_balances_for(assignments):
+    """Refresh the balances of every (user, edir) pair touched by ``assignments``."""
+    refresh_assigned_members(assigned_members(assignments))
+
+
+def get_member_balance(user_id, edir_id):
+    """The member's ledger row; an unsaved zero row when nothing was assigned."""
+    balance = MemberBalance.objects.filter(user_id=user_id, edir_id=edir_id).first()
+    return balance or MemberBalance(user_id=user_id, edir_id=edir_id)
+
+
+def _decimal(expression):
+    return Coalesce(
+        expression,
+        Value(ZERO),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+
+
+def outstanding_balance_subquery(edir_id=None, user_ref="pk"):
+    """
+    Ledger outstanding balance of the user at ``OuterRef(user_ref)``, limited
+    to one edir when ``edir_id`` is given.
+    """
+    balances = MemberBalance.objects.filter(user=OuterRef(user_ref))
+    if edir_id is not None:
+        return _decimal(Subquery(balances.filter(edir_id=edir_id).values("outstanding")[:1]))
+    total = balances.order_by().values("user").annotate(total=Sum("outstanding")).values("total")
+    return _decimal(Subquery(total))
+
+
+def user_outstanding_subquery(user_id, edir_ref="pk"):
+    """
+    Ledger outstanding balance of ``user_id`` in the edir at
+    ``OuterRef(edir_ref)``; the per-edir counterpart of
+    ``outstanding_balance_subquery``.
+    """
+    return _decimal(Subquery(
+        MemberBalance.objects.filter(user_id=user_id, edir=OuterRef(edir_ref)).values("outstanding")[:1]
+    ))
+
+
+def verify_balances(fix=False, batch_size=500):
+    """
+    Recompute every ledger row from the raw fee assignments, edir by edir.
+
+    Returns ``[(user_id, edir_id, stored, actual)]`` for each row that
+    drifted, where ``stored`` and ``actual`` are field dicts (``stored`` is
+    ``None`` for a missing row). With ``fix`` the drifted rows are
+    rewritten.
+    """
+    drift = []
+    edir_ids = Edir.objects.order_by("id").values_list("id", flat=True)
+    for edir_id in edir_ids.iterator(chunk_size=batch_size):
+        actual = balance_totals(FeeAssignment.objects.filter(fee__edir_id=edir_id))
+        stored = {
+            (row["user_id"], edir_id): {field: row[field] for field in BALANCE_FIELDS}
+            for row in MemberBalance.objects.filter(edir_id=edir_id).values("user_id", *BALANCE_FIELDS)
+        }
+        zero = dict.fromkeys(BALANCE_FIELDS, ZERO)
+        stale = []
+        for key in actual.keys() | stored.keys():
+            expected = actual.get(key, zero)
+            if stored.get(key) != expected:
+                drift.append((key[0], edir_id, stored.get(key), expected))
+                stale.append(key[0])
+        if fix and stale:
+            refresh_member_balances(edir_id, stale)
+    return drift
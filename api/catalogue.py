@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .invalidation import bump_cache_version, cache_version, invalidate_now_and_on_commit
+from .lrucache import MISSING, TTLCache
+from .models import Edir, EdirUser
+from .serializers import EdirSerializer
+
+POPULAR_EDIRS_VERSION_KEY = "popular_edirs:version"
+POPULAR_EDIRS_TIMEOUT = getattr(settings, "POPULAR_EDIRS_CACHE_TIMEOUT", 300)
+
+# (user_id, membership_version) -> frozenset of active/pending edir ids; a
+# membership change bumps the version, so entries never need invalidating
+joined_edirs_cache = TTLCache(max_entries=10000, ttl=POPULAR_EDIRS_TIMEOUT)
+
+
+def popular_edirs_version():
+    return cache_version(cache, POPULAR_EDIRS_VERSION_KEY)
+
+
+def invalidate_popular_edirs():
+    """Start a new catalogue version, so the next request rebuilds it."""
+    invalidate_now_and_on_commit(lambda: bump_cache_version(cache, POPULAR_EDIRS_VERSION_KEY))
+
+
+def popular_edirs():
+    """
+    Serialized active popular edirs, built once per catalogue version and
+    shared by every user.
+    """
+    key = f"popular_edirs:{popular_edirs_version()}"
+    data = cache.get(key)
+    if data is None:
+        edirs = Edir.objects.filter(status="Active", is_popular=True).order_by("id")
+        data = [dict(item) for item in EdirSerializer(edirs, many=True).data]
+        cache.set(key, data, timeout=POPULAR_EDIRS_TIMEOUT)
+    return data
+
+
+def joined_edir_ids(user):
+    """Ids of the edirs ``user`` is an active or pending member of."""
+    key = (user.id, user.membership_version)
+    edir_ids = joined_edirs_cache.get(key)
+    if edir_ids is MISSING:
+        edir_ids = frozenset(
+            EdirUser.objects.filter(user=user, status__in=["Active", "Pending"])
+            .values_list("edir_id", flat=True)
+        )
+        joined_edirs_cache.set(key, edir_ids)
+    return edir_ids
@@ -0,0 +1,59 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .authentication import invalidate_cached_user
+from .models import CustomUser, Family
+from .stats import refresh_committee_snapshots
+
+
+def active_family_count_subquery():
+    return Coalesce(
+        Subquery(
+            Family.objects.filter(user=OuterRef("pk"), status="Active")
+            .order_by()
+            .values("user")
+            .annotate(count=Count("id"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def refresh_active_family_count(*user_ids):
+    """Recompute ``CustomUser.active_family_count`` in a single UPDATE."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return
+    CustomUser.objects.filter(id__in=user_ids).update(
+        active_family_count=active_family_count_subquery()
+    )
+    # queryset.update() skips post_save, so drop the authenticated-user copies here
+    for user_id in user_ids:
+        invalidate_cached_user(user_id)
+    # Committee rosters on the dashboard show each member's family count
+    refresh_committee_snapshots(user_ids)
+
+
+def repair_active_family_counts(batch_size=1000):
+    """
+    Recompute every user's active family count in primary key batches.
+
+    Returns the number of users whose stored count was wrong.
+    """
+    repaired = 0
+    last_id = 0
+    while True:
+        batch = list(
+            CustomUser.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .annotate(actual=active_family_count_subquery())
+            .values_list("id", "active_family_count", "actual")[:batch_size]
+        )
+        if not batch:
+            return repaired
+        stale = [CustomUser(id=user_id, active_family_count=actual)
+                 for user_id, stored, actual in batch if stored != actual]
+        if stale:
+            CustomUser.objects.bulk_update(stale, ["active_family_count"])
+            repaired += len(stale)
+        last_id = batch[-1][0]
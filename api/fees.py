@@ -0,0 +1,29 @@
+from .balances import refresh_member_balances
+from .models import FeeAssignment
+from .responsecache import invalidate_edir_responses
+from .revisions import bump_revision
+
+FEE_ASSIGN_CHUNK_SIZE = 500
+
+
+def assign_fee(fee, user_ids, maker=None):
+    """
+    Assign ``fee`` to ``user_ids`` with chunked ``bulk_create`` calls in the
+    caller's transaction and return the assignments.
+
+    ``bulk_create()`` skips ``post_save``, so the fee revision, the members'
+    ledger rows and the edir's cached responses are refreshed here, once
+    for the whole batch.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return []
+    assignments = FeeAssignment.objects.bulk_create(
+        [FeeAssignment(fee=fee, user_id=user_id, maker=maker) for user_id in user_ids],
+        batch_size=FEE_ASSIGN_CHUNK_SIZE,
+    )
+    bump_revision(fee.edir_id, "fees")
+    for start in range(0, len(user_ids), FEE_ASSIGN_CHUNK_SIZE):
+        refresh_member_balances(fee.edir_id, user_ids[start:start + FEE_ASSIGN_CHUNK_SIZE])
+    invalidate_edir_responses(fee.edir_id)
+    return assignments
@@ -0,0 +1,119 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.serializers import BaseSerializer
+
+FIELDS_PARAM = "fields"
+INCLUDE_PARAM = "include"
+
+
+def _param_set(params, name):
+    value = params.get(name) if params is not None else None
+    if not value:
+        return None
+    return {item.strip() for item in value.split(",") if item.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Lets list clients shape the output of a ``ModelSerializer``:
+
+    * ``?fields=id,name`` keeps only the named fields;
+    * ``?include=edir`` replaces the primary key of a relation named in
+      ``Meta.expandable_fields`` with its nested representation.
+
+    The query parameters are read from ``context["fieldset"]`` (usually
+    ``request.query_params``) or from ``context["request"]``. Views pass
+    their queryset through ``sparse_queryset()`` so only the columns and
+    joins the trimmed serializer needs are fetched.
+
+    ``Meta.expandable_fields`` maps a relation name to a zero-argument
+    callable returning the nested serializer; ``Meta.sparse_sources`` maps
+    fields the mixin cannot trace to a model column (method fields,
+    annotations) to the model paths they read.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        params = self._fieldset_params()
+        # Writes always validate against the full field set
+        if params is None or hasattr(self, "initial_data"):
+            return
+
+        include = _param_set(params, INCLUDE_PARAM) or set()
+        for name, factory in getattr(self.Meta, "expandable_fields", {}).items():
+            if name in include and name in self.fields:
+                self.fields[name] = factory()
+
+        wanted = _param_set(params, FIELDS_PARAM)
+        if wanted:
+            for name in set(self.fields) - wanted - include:
+                self.fields.pop(name)
+
+    def _fieldset_params(self):
+        if "fieldset" in self._context:
+            return self._context["fieldset"]
+        request = self._context.get("request")
+        return getattr(request, "query_params", None)
+
+    @classmethod
+    def sparse_queryset(cls, queryset, params):
+        """
+        Restrict ``queryset`` to the columns (``only()``) and joins
+        (``select_related()``) the serializer needs for ``params``,
+        replacing any joins already on it. Left unchanged when a field
+        cannot be traced to the model.
+        """
+        paths = _model_paths(cls(context={"fieldset": params}))
+        if paths is None:
+            return queryset
+        only, related = paths
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        return queryset.only(*sorted(only))
+
+
+def _model_paths(serializer, prefix=""):
+    """``(only, select_related)`` lookups for ``serializer``'s fields, or ``None``."""
+    model = serializer.Meta.model
+    only = {prefix + model._meta.pk.name}
+    related = set()
+    sources = getattr(serializer.Meta, "sparse_sources", {})
+
+    for name, field in serializer.fields.items():
+        if name in sources:
+            for path in sources[name]:
+                only.add(prefix + path)
+                if "__" in path:
+                    related.add(prefix + path.rsplit("__", 1)[0])
+            continue
+        if field.source == "*":
+            return None
+
+        parts = field.source.split(".")
+        current = model
+        try:
+            for index, part in enumerate(parts):
+                model_field = current._meta.get_field(part)
+                if model_field.many_to_many or model_field.one_to_many:
+                    return None
+                if index < len(parts) - 1:
+                    if not model_field.is_relation:
+                        return None
+                    current = model_field.related_model
+        except FieldDoesNotExist:
+            return None
+        path = prefix + "__".join(parts)
+
+        if isinstance(field, BaseSerializer):
+            nested = _model_paths(field, path + "__")
+            if nested is None:
+                return None
+            related.add(path)
+            related |= nested[1]
+            only |= nested[0]
+        else:
+            if len(parts) > 1:
+                related.add(prefix + "__".join(parts[:-1]))
+            only.add(path)
+
+    return only, related
@@ -0,0 +1,97 @@
+import math
+
+import requests
+from django.conf import settings
+
+from .models import Edir
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOCODER_URL = getattr(settings, "GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_USER_AGENT = getattr(settings, "GEOCODER_USER_AGENT", "edir-amba")
+GEOCODER_COUNTRY_CODES = getattr(settings, "GEOCODER_COUNTRY_CODES", "et")
+GEOCODER_TIMEOUT = getattr(settings, "GEOCODER_TIMEOUT", 10)
+
+
+class GeocodingError(Exception):
+    pass
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in kilometres between two WGS84 points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """
+    ``(min_lat, max_lat, min_lng, max_lng)`` enclosing the circle of
+    ``radius_km`` around the point. Near the poles the longitude span is
+    left unbounded; boxes are not split across the antimeridian, which no
+    edir is close to.
+    """
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = max(-90.0, lat - d_lat), min(90.0, lat + d_lat)
+    cos_lat = math.cos(math.radians(lat))
+    if max_lat >= 90.0 or min_lat <= -90.0 or cos_lat < 1e-9:
+        return min_lat, max_lat, -180.0, 180.0
+    d_lng = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    return min_lat, max_lat, max(-180.0, lng - d_lng), min(180.0, lng + d_lng)
+
+
+def nearby_edirs(lat, lng, radius_km, queryset=None):
+    """
+    Active edirs within ``radius_km`` of the point, nearest first, each with
+    a ``distance_km`` attribute.
+
+    The bounding box is applied in SQL so the ``(latitude, longitude)``
+    index prunes the table; the exact distance is only computed for the
+    rows inside the box.
+    """
+    if queryset is None:
+        queryset = Edir.objects.all()
+    min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, radius_km)
+    candidates = queryset.filter(
+        status="Active",
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lng, max_lng),
+    )
+
+    nearby = []
+    for edir in candidates:
+        distance = haversine_km(lat, lng, edir.latitude, edir.longitude)
+        if distance <= radius_km:
+            edir.distance_km = round(distance, 3)
+            nearby.append(edir)
+    nearby.sort(key=lambda edir: (edir.distance_km, edir.id))
+    return nearby
+
+
+def geocode_address(address, session=None):
+    """
+    Look ``address`` up with the configured Nominatim-compatible geocoder.
+    Returns ``(latitude, longitude)`` or ``None`` when nothing matched.
+    """
+    response = (session or requests).get(
+        GEOCODER_URL,
+        params={
+            "q": address,
+            "format": "json",
+            "limit": 1,
+            "countrycodes": GEOCODER_COUNTRY_CODES,
+        },
+        headers={"User-Agent": GEOCODER_USER_AGENT},
+        timeout=GEOCODER_TIMEOUT,
+    )
+    if response.status_code != 200:
+        raise GeocodingError(f"Geocoder returned HTTP {response.status_code}")
+    try:
+        results = response.json()
+    except ValueError:
+        raise GeocodingError("Geocoder returned invalid JSON")
+    if not results:
+        return None
+    return float(results[0]["lat"]), float(results[0]["lon"])
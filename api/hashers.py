@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with the work factor taken from
+    ``settings.PASSWORD_HASH_ITERATIONS``.
+
+    The algorithm name is unchanged, so existing hashes still verify and
+    ``must_update()`` makes Django rehash them with the configured count the
+    next time the user logs in.
+    """
+    iterations = getattr(settings, "PASSWORD_HASH_ITERATIONS", PBKDF2PasswordHasher.iterations)
+
+
+# PBKDF2 releases the GIL, so a burst of logins or registrations could use
+# every core; the pool caps hashing at PASSWORD_HASH_WORKERS at a time.
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, "PASSWORD_HASH_WORKERS", 2),
+    thread_name_prefix="password-hash",
+)
+
+
+def _check(raw_password, encoded):
+    rehashed = []
+    valid = check_password(
+        raw_password, encoded, setter=lambda password: rehashed.append(make_password(password))
+    )
+    return valid, (rehashed[0] if rehashed else None)
+
+
+def hash_password(raw_password):
+    """``make_password`` run on the bounded hashing pool."""
+    return password_hash_executor.submit(make_password, raw_password).result()
+
+
+async def ahash_password(raw_password):
+    return await asyncio.wrap_future(password_hash_executor.submit(make_password, raw_password))
+
+
+def verify_password(raw_password, encoded):
+    """
+    Check ``raw_password`` on the hashing pool. Returns ``(valid, new_hash)``
+    where ``new_hash`` is set when the stored hash should be upgraded.
+    """
+    return password_hash_executor.submit(_check, raw_password, encoded).result()
+
+
+async def averify_password(raw_password, encoded):
+    return await asyncio.wrap_future(password_hash_executor.submit(_check, raw_password, encoded))
@@ -0,0 +1,122 @@
+from decimal import Decimal
+
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Subquery, Value, When, Window,
+)
+from django.db.models.functions import Coalesce, RowNumber
+from django.utils import timezone
+
+from .balances import user_outstanding_subquery
+from .models import BankChangeRequest, Edir, EdirChangeRequest, EdirUser, EdirUserChangeRequest, Event, Transaction
+from .serializers import EdirSerializer, EventSerializer
+
+HOME_EVENTS_PER_EDIR = 3
+
+
+def _count_subquery(queryset, edir_field="edir"):
+    """Row count of ``queryset`` for the edir at ``OuterRef("pk")``."""
+    counts = (
+        queryset.filter(**{edir_field: OuterRef("pk")})
+        .order_by()
+        .values(edir_field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), Value(0), output_field=IntegerField())
+
+
+def _committee_only(expression):
+    """``expression`` for edirs where the user is on the committee, else NULL."""
+    return Case(When(is_committee=True, then=expression), default=None, output_field=IntegerField())
+
+
+def home_edirs(user):
+    """
+    The user's active edirs with the member count, the user's outstanding
+    amount and, for committee members, the pending-approval counts, all
+    computed by correlated subqueries in a single query.
+    """
+    return (
+        Edir.objects.filter(ediruser__user=user, ediruser__status="Active")
+        .annotate(
+            is_committee=F("ediruser__is_committee"),
+            member_count=_count_subquery(EdirUser.objects.filter(status="Active")),
+            outstanding=user_outstanding_subquery(user.id),
+            pending_join_requests=_committee_only(
+                _count_subquery(EdirUser.objects.filter(status="Pending"))
+            ),
+            pending_payments=_committee_only(
+                _count_subquery(Transaction.objects.filter(payment_status="PENDING"))
+            ),
+            pending_edir_changes=_committee_only(
+                _count_subquery(EdirChangeRequest.objects.filter(status="PENDING"))
+            ),
+            pending_bank_changes=_committee_only(
+                _count_subquery(BankChangeRequest.objects.filter(status="PENDING"))
+            ),
+            pending_member_changes=_committee_only(
+                _count_subquery(EdirUserChangeRequest.objects.filter(status="PENDING"))
+            ),
+        )
+        .order_by("name", "id")
+    )
+
+
+def latest_events(edir_ids, per_edir=HOME_EVENTS_PER_EDIR):
+    """
+    The newest ``per_edir`` active events of each edir in one query,
+    numbered per edir with ``ROW_NUMBER()``.
+    """
+    return (
+        Event.objects.filter(edir_id__in=edir_ids, status="Active")
+        .annotate(position=Window(
+            RowNumber(),
+            partition_by=[F("edir_id")],
+            order_by=[F("date").desc(nulls_last=True), F("id").desc()],
+        ))
+        .filter(position__lte=per_edir)
+        .order_by("edir_id", "position")
+    )
+
+
+def home_summary(user, context=None):
+    """
+    Everything the app's home screen needs, in two queries whatever the
+    number of edirs: one for the edirs and their counts, one for events.
+    The nested events are never trimmed by the request's ``?fields=``.
+    """
+    edirs = list(home_edirs(user))
+
+    events_by_edir = {edir.id: [] for edir in edirs}
+    if edirs:
+        events = list(latest_events(list(events_by_edir)))
+        for event, data in zip(events, EventSerializer(events, many=True, context={**(context or {}), "fieldset": None}).data):
+            events_by_edir[event.edir_id].append(data)
+
+    today = timezone.localdate()
+    results = []
+    for edir, data in zip(edirs, EdirSerializer(edirs, many=True).data):
+        has_meeting = edir.meeting_date is not None and edir.meeting_date >= today
+        results.append({
+            **data,
+            "member_count": edir.member_count,
+            "is_committee": edir.is_committee,
+            "outstanding": edir.outstanding,
+            "next_meeting": {
+                "date": edir.meeting_date,
+                "place": edir.meeting_place,
+            } if has_meeting else None,
+            "pending_approvals": {
+                "join_requests": edir.pending_join_requests,
+                "payments": edir.pending_payments,
+                "edir_changes": edir.pending_edir_changes,
+                "bank_changes": edir.pending_bank_changes,
+                "member_changes": edir.pending_member_changes,
+            } if edir.is_committee else None,
+            "latest_events": events_by_edir[edir.id],
+        })
+
+    return {
+        "outstanding_total": sum((edir.outstanding for edir in edirs), Decimal("0")),
+        "edirs": results,
+    }
@@ -0,0 +1,234 @@
+import csv
+import io
+import os
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.audit import model_to_json
+
+from .membership import membership_changed
+from .models import GENDER_CHOICES, MARITAL_STATUS_CHOICES, CustomUser, EdirUser, EdirUserAuditLog, UserAuditLog
+from .phone import normalize_phone
+
+IMPORT_CHUNK_SIZE = 500
+MAX_PHONE_LENGTH = CustomUser._meta.get_field("phone_number").max_length
+
+HEADER_ALIASES = {
+    "name": "full_name",
+    "fullname": "full_name",
+    "phone": "phone_number",
+    "phonenumber": "phone_number",
+    "committee": "is_committee",
+}
+TRUE_VALUES = {"1", "true", "yes", "y"}
+USER_AUDIT_EXCLUDE = ["password", "last_login", "user_permissions", "groups", "updated_date"]
+
+
+class RosterImportError(Exception):
+    pass
+
+
+def _normalize_header(value):
+    key = str(value or "").strip().lower().replace(" ", "_")
+    return HEADER_ALIASES.get(key.replace("_", ""), key)
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    # Spreadsheet apps store phone numbers as numbers; keep them as digits
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_roster(fileobj, filename):
+    """Read a CSV or XLSX roster into a list of dicts keyed by column name."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        content = fileobj.read()
+        if isinstance(content, bytes):
+            content = content.decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(content)))
+    elif extension == ".xlsx":
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise RosterImportError("Reading .xlsx files requires openpyxl to be installed")
+        sheet = load_workbook(fileobj, read_only=True, data_only=True).active
+        rows = [[_cell(value) for value in row] for row in sheet.iter_rows(values_only=True)]
+    else:
+        raise RosterImportError("Unsupported file type, upload a .csv or .xlsx file")
+
+    if not rows:
+        raise RosterImportError("The roster file is empty")
+    headers = [_normalize_header(h) for h in rows[0]]
+    if "full_name" not in headers or "phone_number" not in headers:
+        raise RosterImportError("The roster must have full_name and phone_number columns")
+
+    return [
+        {header: _cell(value) for header, value in zip(headers, row)}
+        for row in rows[1:]
+        if any(_cell(value) for value in row)
+    ]
+
+
+def _validate_row(row):
+    errors = {}
+    if not row.get("full_name"):
+        errors["full_name"] = "full_name is required"
+    phone_number = row.get("phone_number", "")
+    if not phone_number:
+        errors["phone_number"] = "phone_number is required"
+    elif not phone_number.isdigit():
+        errors["phone_number"] = "Phone number must contain only digits."
+    elif len(phone_number) > MAX_PHONE_LENGTH:
+        errors["phone_number"] = f"Phone number must be at most {MAX_PHONE_LENGTH} digits."
+    if row.get("gender") and row["gender"] not in dict(GENDER_CHOICES):
+        errors["gender"] = f"Invalid gender {row['gender']}"
+    if row.get("marital_status") and row["marital_status"] not in dict(MARITAL_STATUS_CHOICES):
+        errors["marital_status"] = f"Invalid marital status {row['marital_status']}"
+    return errors
+
+
+def _phone_key(phone_number):
+    # Two spellings of one number count as the same member
+    return normalize_phone(phone_number) or phone_number
+
+
+def _existing_phone_keys(phone_numbers):
+    existing = set()
+    phone_numbers = list(phone_numbers)
+    for start in range(0, len(phone_numbers), IMPORT_CHUNK_SIZE):
+        chunk = phone_numbers[start:start + IMPORT_CHUNK_SIZE]
+        normalized = [number for number in map(normalize_phone, chunk) if number]
+        rows = CustomUser.objects.filter(
+            Q(normalized_phone__in=normalized) | Q(phone_number__in=chunk)
+        ).values_list("phone_number", "normalized_phone")
+        for phone_number, normalized_phone in rows:
+            existing.add(normalized_phone or phone_number)
+    return existing
+
+
+def import_roster(edir, rows, performed_by=None, dry_run=False):
+    """
+    Validate roster rows and create the members in bulk.
+
+    Every row is checked first; rows with errors and phone numbers that are
+    repeated in the file or already registered are reported and skipped. The
+    remaining users, their memberships and both audit trails are written with
+    chunked ``bulk_create`` calls inside a single transaction. With
+    ``dry_run`` nothing is written and the report shows what would happen.
+    """
+    report = {
+        "total_rows": len(rows),
+        "created": 0,
+        "duplicates": [],
+        "errors": [],
+        "dry_run": dry_run,
+    }
+
+    valid_rows = []
+    seen = set()
+    for line, row in enumerate(rows, start=2):
+        errors = _validate_row(row)
+        if errors:
+            report["errors"].append({"row": line, "errors": errors})
+            continue
+        key = _phone_key(row["phone_number"])
+        if key in seen:
+            report["duplicates"].append(
+                {"row": line, "phone_number": row["phone_number"], "reason": "Repeated in file"}
+            )
+            continue
+        seen.add(key)
+        valid_rows.append((line, row))
+
+    existing = _existing_phone_keys(row["phone_number"] for line, row in valid_rows)
+    new_rows = []
+    for line, row in valid_rows:
+        if _phone_key(row["phone_number"]) in existing:
+            report["duplicates"].append(
+                {"row": line, "phone_number": row["phone_number"], "reason": "Already registered"}
+            )
+        else:
+            new_rows.append(row)
+
+    if dry_run:
+        report["would_create"] = len(new_rows)
+        return report
+    if not new_rows:
+        return report
+
+    now = timezone.now()
+    with transaction.atomic():
+        users = []
+        for row in new_rows:
+            user = CustomUser(
+                full_name=row["full_name"],
+                phone_number=row["phone_number"],
+                # bulk_create skips CustomUser.save()
+                normalized_phone=normalize_phone(row["phone_number"]),
+                gender=row.get("gender") or None,
+                marital_status=row.get("marital_status") or None,
+                profession=row.get("profession") or None,
+                address=row.get("address") or None,
+            )
+            user.set_unusable_password()
+            users.append(user)
+        users = CustomUser.objects.bulk_create(users, batch_size=IMPORT_CHUNK_SIZE)
+
+        edir_users = EdirUser.objects.bulk_create(
+            [
+                EdirUser(
+                    user=user,
+                    edir=edir,
+                    is_committee=row.get("is_committee", "").lower() in TRUE_VALUES,
+                    status="Active",
+                    joined_date=now,
+                )
+                for user, row in zip(users, new_rows)
+            ],
+            batch_size=IMPORT_CHUNK_SIZE,
+        )
+
+        UserAuditLog.objects.bulk_create(
+            [
+                UserAuditLog(
+                    user=user,
+                    action="CREATED by Admin",
+                    performed_by=performed_by,
+                    new_status="Active",
+                    new_value=model_to_json(user, exclude=USER_AUDIT_EXCLUDE),
+                    comment="Bulk roster import",
+                )
+                for user in users
+            ],
+            batch_size=IMPORT_CHUNK_SIZE,
+        )
+        EdirUserAuditLog.objects.bulk_create(
+            [
+                EdirUserAuditLog(
+                    user=edir_user.user,
+                    edir=edir,
+                    action="Added by Admin",
+                    performed_by=performed_by,
+                    new_status=edir_user.status,
+                    new_value=model_to_json(edir_user),
+                    comment="Bulk roster import",
+                )
+                for edir_user in edir_users
+            ],
+            batch_size=IMPORT_CHUNK_SIZE,
+        )
+        membership_changed(
+            edir.id,
+            [user.id for user in users],
+            [(None, edir_user.status) for edir_user in edir_users],
+            committee=any(edir_user.is_committee for edir_user in edir_users),
+        )
+
+    report["created"] = len(users)
+    return report
@@ -0,0 +1,27 @@
+from django.db import transaction
+
+
+def invalidate_now_and_on_commit(invalidate):
+    """
+    Call ``invalidate`` now and again once the transaction commits, so a read
+    racing an uncommitted write cannot leave the old data cached.
+    """
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def cache_version(cache, key):
+    """The version counter stored under ``key`` in ``cache``, starting at 1."""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_cache_version(cache, key):
+    """Move the counter under ``key`` on; entries built for older versions are never read again."""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+
+from api.authentication import user_cache
+from api.models import CustomUser
+from api.tokens import VersionedRefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure authenticated requests per second with and without the JWT user cache. "
+        "Runs against the configured database inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument("--path", default="/auth/users/me/", help="Authenticated GET endpoint to call")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(phone_number="benchmark", full_name="Benchmark")
+            token = VersionedRefreshToken.for_user(user).access_token
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+            results = {}
+            for label, cached in (("without cache", False), ("with cache", True)):
+                results[label] = self.run(client, options["path"], options["requests"], cached)
+            transaction.set_rollback(True)
+
+        for label, (per_second, queries) in results.items():
+            self.stdout.write(f"{label}: {per_second:.0f} requests/s | {queries:.1f} queries/request")
+
+    def run(self, client, path, count, cached):
+        user_cache.clear()
+        response = client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f"GET {path} returned {response.status_code}")
+
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            started = time.perf_counter()
+            for _ in range(count):
+                if not cached:
+                    user_cache.clear()
+                client.get(path)
+            elapsed = time.perf_counter() - started
+        return count / elapsed, queries / count
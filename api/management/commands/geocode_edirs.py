@@ -0,0 +1,51 @@
+import time
+
+import requests
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.catalogue import invalidate_popular_edirs
+from api.geo import GeocodingError, geocode_address
+from api.models import Edir
+
+
+class Command(BaseCommand):
+    help = "Fill Edir.latitude/longitude by geocoding each edir's address"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Re-geocode edirs that already have coordinates")
+        parser.add_argument("--limit", type=int, default=None, help="Geocode at most this many edirs")
+        parser.add_argument(
+            "--delay", type=float, default=1.0,
+            help="Seconds between geocoder requests (Nominatim allows one per second)",
+        )
+
+    def handle(self, *args, **options):
+        edirs = Edir.objects.exclude(address__isnull=True).exclude(address="")
+        if not options["all"]:
+            edirs = edirs.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True))
+        edirs = edirs.order_by("id").values_list("id", "address")
+        if options["limit"] is not None:
+            edirs = edirs[:options["limit"]]
+
+        located = missing = failed = 0
+        session = requests.Session()
+        for index, (edir_id, address) in enumerate(edirs.iterator()):
+            if index and options["delay"]:
+                time.sleep(options["delay"])
+            try:
+                point = geocode_address(address, session=session)
+            except (GeocodingError, requests.RequestException) as e:
+                failed += 1
+                self.stderr.write(f"Edir {edir_id}: {e}")
+                continue
+            if point is None:
+                missing += 1
+                continue
+            # update() skips the save signals; the catalogue is invalidated once below
+            Edir.objects.filter(pk=edir_id).update(latitude=point[0], longitude=point[1])
+            located += 1
+
+        if located:
+            invalidate_popular_edirs()
+        self.stdout.write(f"Geocoded {located} edir(s), {missing} not found, {failed} failed")
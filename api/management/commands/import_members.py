@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import RosterImportError, import_roster, read_roster
+from api.models import CustomUser, Edir
+
+
+class Command(BaseCommand):
+    help = "Import an edir member roster from a CSV or XLSX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("edir_id", type=int)
+        parser.add_argument("path")
+        parser.add_argument("--dry-run", action="store_true", help="Validate the file without writing anything")
+        parser.add_argument("--performed-by", help="Phone number of the user recorded in the audit logs")
+
+    def handle(self, *args, **options):
+        try:
+            edir = Edir.objects.get(id=options["edir_id"])
+        except Edir.DoesNotExist:
+            raise CommandError(f"Edir {options['edir_id']} not found")
+
+        performed_by = None
+        if options["performed_by"]:
+            try:
+                performed_by = CustomUser.objects.get_by_phone(options["performed_by"])
+            except CustomUser.DoesNotExist:
+                raise CommandError(f"User {options['performed_by']} not found")
+
+        try:
+            with open(options["path"], "rb") as roster_file:
+                rows = read_roster(roster_file, options["path"])
+        except (OSError, RosterImportError) as e:
+            raise CommandError(str(e))
+
+        report = import_roster(edir, rows, performed_by=performed_by, dry_run=options["dry_run"])
+        self.stdout.write(json.dumps(report, indent=2))
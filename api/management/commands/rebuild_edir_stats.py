@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.stats import rebuild_edir_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the EdirStats row of every edir"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_edir_stats(batch_size=options["batch_size"])
+        self.stdout.write(f"Rebuilt stats for {rebuilt} edir(s)")
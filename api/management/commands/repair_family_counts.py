@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.family import repair_active_family_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute CustomUser.active_family_count from Family rows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        repaired = repair_active_family_counts(batch_size=options["batch_size"])
+        self.stdout.write(f"Repaired active family count for {repaired} user(s)")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.balances import verify_balances
+
+
+class Command(BaseCommand):
+    help = "Recompute MemberBalance rows from fee assignments and report drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Rewrite the rows that drifted")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        drift = verify_balances(fix=options["fix"], batch_size=options["batch_size"])
+        for user_id, edir_id, stored, actual in drift:
+            self.stdout.write(f"user={user_id} edir={edir_id} | stored={stored} | actual={actual}")
+        action = "Fixed" if options["fix"] else "Found"
+        self.stdout.write(f"{action} {len(drift)} drifted balance(s)")
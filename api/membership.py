@@ -0,0 +1,131 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .authentication import invalidate_cached_user
+from .models import CustomUser, EdirUser, EdirUserAuditLog
+from .permissions import invalidate_membership
+from .responsecache import invalidate_edir_responses
+from .revisions import bump_revision
+from .stats import apply_member_changes
+
+MAX_BATCH_SIZE = 1000
+
+STATUS_AUDIT_ACTIONS = {
+    "Active": "MODIFIED",
+    "Not Active": "Disabled",
+    "Blocked": "BLOCKED",
+    "Rejected": "MODIFIED",
+    "Leaved": "Leaved",
+}
+
+
+def bump_membership_version(user_ids):
+    """
+    Mark the edir-role claims in these users' JWTs as stale; edir-scoped
+    permission checks then make the client refresh its token.
+    """
+    user_ids = list(user_ids)
+    CustomUser.objects.filter(id__in=user_ids).update(membership_version=F("membership_version") + 1)
+    # queryset.update() skips post_save, so drop the authenticated-user copies here
+    for user_id in user_ids:
+        invalidate_cached_user(user_id)
+
+
+def membership_changed(edir_id, user_ids, transitions=(), committee=False):
+    """
+    Propagate ``EdirUser`` changes made without model signals.
+
+    ``queryset.update()`` and ``bulk_create()`` skip ``post_save``, so bulk
+    write paths call this once per edir instead. ``transitions`` lists the
+    ``(previous_status, new_status)`` of each changed row and ``committee``
+    whether the active committee changed; see ``apply_member_changes``.
+    """
+    bump_revision(edir_id, "members")
+    invalidate_membership(edir_id, user_ids)
+    bump_membership_version(user_ids)
+    apply_member_changes(edir_id, transitions, committee)
+    invalidate_edir_responses(edir_id)
+
+
+def transition_members(edir, user_ids, target_status, performed_by=None,
+                       from_statuses=None, comment=None, audit_action=None, **extra_updates):
+    """
+    Move many members of ``edir`` to ``target_status`` in one transaction.
+
+    Members are grouped by their current status and each group is changed
+    with one ``UPDATE ... WHERE status = <previous>``, so a row that changed
+    concurrently is left alone and reported as a conflict. Audit rows for the
+    members that moved are written with ``bulk_create``.
+
+    Returns a ``{user_id: {"outcome": ..., "previous_status": ...}}`` dict
+    where the outcome is one of ``updated``, ``unchanged``, ``not_member``,
+    ``skipped`` (status not in ``from_statuses``) or ``conflict``.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    current = dict(
+        EdirUser.objects.filter(edir=edir, user_id__in=user_ids).values_list("user_id", "status")
+    )
+
+    results = {}
+    groups = defaultdict(list)
+    for user_id in user_ids:
+        previous = current.get(user_id)
+        if previous is None:
+            results[user_id] = {"outcome": "not_member", "previous_status": None}
+        elif previous == target_status:
+            results[user_id] = {"outcome": "unchanged", "previous_status": previous}
+        elif from_statuses is not None and previous not in from_statuses:
+            results[user_id] = {"outcome": "skipped", "previous_status": previous}
+        else:
+            groups[previous].append(user_id)
+
+    now = timezone.now()
+    action = audit_action or STATUS_AUDIT_ACTIONS.get(target_status, "MODIFIED")
+    with transaction.atomic():
+        updated_ids = []
+        for previous, ids in groups.items():
+            updated = EdirUser.objects.filter(edir=edir, user_id__in=ids, status=previous).update(
+                status=target_status, updated_date=now, **extra_updates
+            )
+            if updated == len(ids):
+                changed = ids
+            else:
+                changed = list(
+                    EdirUser.objects.filter(
+                        edir=edir, user_id__in=ids, status=target_status, updated_date=now
+                    ).values_list("user_id", flat=True)
+                )
+            for user_id in ids:
+                if user_id in changed:
+                    results[user_id] = {"outcome": "updated", "previous_status": previous}
+                    updated_ids.append(user_id)
+                else:
+                    results[user_id] = {"outcome": "conflict", "previous_status": previous}
+
+        if updated_ids:
+            EdirUserAuditLog.objects.bulk_create([
+                EdirUserAuditLog(
+                    user_id=user_id,
+                    edir=edir,
+                    action=action,
+                    performed_by=performed_by,
+                    previous_status=results[user_id]["previous_status"],
+                    new_status=target_status,
+                    old_value={"status": results[user_id]["previous_status"]},
+                    new_value={"status": target_status, "updated_date": now.isoformat()},
+                    comment=comment,
+                )
+                for user_id in updated_ids
+            ])
+            transitions = [(results[user_id]["previous_status"], target_status) for user_id in updated_ids]
+            # Only members who are or were active committee members change the roster
+            committee = "is_committee" in extra_updates or (
+                any("Active" in transition for transition in transitions)
+                and EdirUser.objects.filter(edir=edir, user_id__in=updated_ids, is_committee=True).exists()
+            )
+            membership_changed(edir.id, updated_ids, transitions, committee)
+
+    return results
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_remove_bank_checker_remove_bank_maker_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ediruser',
+            index=models.Index(fields=['edir', 'status'], name='api_ediruse_edir_id_b91a54_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_ediruser_edir_status_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EdirRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(choices=[('members', 'Members'), ('banks', 'Banks'), ('events', 'Events'), ('fees', 'Fees')], max_length=20)),
+                ('revision', models.PositiveBigIntegerField(default=0)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('edir', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='api.edir')),
+            ],
+            options={
+                'unique_together': {('edir', 'resource')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:08
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_active_family_count(apps, schema_editor):
+    CustomUser = apps.get_model("api", "CustomUser")
+    Family = apps.get_model("api", "Family")
+    active_families = (
+        Family.objects.filter(user=OuterRef("pk"), status="Active")
+        .order_by()
+        .values("user")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    CustomUser.objects.update(
+        active_family_count=Coalesce(Subquery(active_families), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_edirrevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='active_family_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_active_family_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:13
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL_BATCH_SIZE = 1000
+
+# A frozen copy of api.phone.normalize_phone as it was when this migration
+# was written, so later changes to the app cannot change what it backfills.
+DEFAULT_COUNTRY_CODE = getattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", "251")
+NATIONAL_NUMBER_LENGTH = getattr(settings, "PHONE_NATIONAL_NUMBER_LENGTH", 9)
+
+_STRIP = re.compile(r"[\s\-().]")
+
+
+def normalize_phone(raw):
+    if raw is None:
+        return None
+    value = _STRIP.sub("", str(raw))
+    if value.startswith("00"):
+        value = "+" + value[2:]
+    international = value.startswith("+")
+    digits = value[1:] if international else value
+    if not digits.isdigit():
+        return None
+
+    if digits.startswith(DEFAULT_COUNTRY_CODE) and len(digits) == len(DEFAULT_COUNTRY_CODE) + NATIONAL_NUMBER_LENGTH:
+        return "+" + digits
+    if international:
+        return "+" + digits if 8 <= len(digits) <= 15 else None
+    if digits.startswith("0") and len(digits) == NATIONAL_NUMBER_LENGTH + 1:
+        return "+" + DEFAULT_COUNTRY_CODE + digits[1:]
+    if len(digits) == NATIONAL_NUMBER_LENGTH:
+        return "+" + DEFAULT_COUNTRY_CODE + digits
+    return None
+
+
+def backfill_normalized_phone(apps, schema_editor):
+    # Numbers that normalize to one already taken (e.g. "0911..." and
+    # "+251911..." for two accounts) keep NULL; CustomUserManager.by_phone
+    # finds them by the raw column and CustomUser.save() leaves them NULL.
+    CustomUser = apps.get_model("api", "CustomUser")
+    taken = set()
+    last_id = 0
+    while True:
+        batch = list(
+            CustomUser.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .only("id", "phone_number")[:BACKFILL_BATCH_SIZE]
+        )
+        if not batch:
+            return
+        changed = []
+        for user in batch:
+            normalized = normalize_phone(user.phone_number)
+            if normalized is not None and normalized not in taken:
+                taken.add(normalized)
+                user.normalized_phone = normalized
+                changed.append(user)
+        CustomUser.objects.bulk_update(changed, ["normalized_phone"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_customuser_active_family_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='normalized_phone',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_phone, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='customuser',
+            name='normalized_phone',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,92 @@
+from django.db import migrations
+
+# Full-text index over Edir name, address and description; see api.search.
+# SQLite gets an external-content FTS5 table kept in sync by triggers,
+# PostgreSQL a generated tsvector column with a GIN index. Other backends
+# fall back to icontains filtering and need nothing here.
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_edir_fts USING fts5(
+        name, address, description,
+        content='api_edir', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER api_edir_fts_insert AFTER INSERT ON api_edir BEGIN
+        INSERT INTO api_edir_fts(rowid, name, address, description)
+        VALUES (new.id, new.name, new.address, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_edir_fts_delete AFTER DELETE ON api_edir BEGIN
+        INSERT INTO api_edir_fts(api_edir_fts, rowid, name, address, description)
+        VALUES ('delete', old.id, old.name, old.address, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER api_edir_fts_update AFTER UPDATE OF name, address, description ON api_edir BEGIN
+        INSERT INTO api_edir_fts(api_edir_fts, rowid, name, address, description)
+        VALUES ('delete', old.id, old.name, old.address, old.description);
+        INSERT INTO api_edir_fts(rowid, name, address, description)
+        VALUES (new.id, new.name, new.address, new.description);
+    END
+    """,
+    "INSERT INTO api_edir_fts(api_edir_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS api_edir_fts_update",
+    "DROP TRIGGER IF EXISTS api_edir_fts_delete",
+    "DROP TRIGGER IF EXISTS api_edir_fts_insert",
+    "DROP TABLE IF EXISTS api_edir_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE api_edir ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(address, '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX api_edir_search_vector_idx ON api_edir USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS api_edir_search_vector_idx",
+    "ALTER TABLE api_edir DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_customuser_membership_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_edir_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='edir',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='edir',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='edir',
+            index=models.Index(fields=['latitude', 'longitude'], name='api_edir_lat_lng_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:29
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+BACKFILL_BATCH_SIZE = 500
+# UserWithNumFamSerializer's fields, as api.stats.committee_snapshot stores them
+COMMITTEE_FIELDS = ["id", "full_name", "phone_number", "gender", "marital_status", "profession", "address"]
+
+
+def _counts_by_edir(queryset, **aggregates):
+    return {row.pop("edir_id"): row for row in queryset.order_by().values("edir_id").annotate(**aggregates)}
+
+
+def backfill_edir_stats(apps, schema_editor):
+    Edir = apps.get_model("api", "Edir")
+    EdirStats = apps.get_model("api", "EdirStats")
+    EdirUser = apps.get_model("api", "EdirUser")
+    Transaction = apps.get_model("api", "Transaction")
+    change_models = {
+        "pending_edir_changes": apps.get_model("api", "EdirChangeRequest"),
+        "pending_bank_changes": apps.get_model("api", "BankChangeRequest"),
+        "pending_member_changes": apps.get_model("api", "EdirUserChangeRequest"),
+    }
+
+    last_id = 0
+    while True:
+        edir_ids = list(
+            Edir.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:BACKFILL_BATCH_SIZE]
+        )
+        if not edir_ids:
+            return
+        members = _counts_by_edir(
+            EdirUser.objects.filter(edir_id__in=edir_ids),
+            active_member_count=Count("id", filter=Q(status="Active")),
+            pending_join_requests=Count("id", filter=Q(status="Pending")),
+        )
+        payments = _counts_by_edir(
+            Transaction.objects.filter(edir_id__in=edir_ids),
+            total_collected=Sum("amount", filter=Q(payment_status="APPROVED", transaction_type="PAYMENT")),
+            pending_payments=Count("id", filter=Q(payment_status="PENDING")),
+        )
+        changes = {
+            field: _counts_by_edir(model.objects.filter(edir_id__in=edir_ids, status="PENDING"), count=Count("id"))
+            for field, model in change_models.items()
+        }
+        committees = defaultdict(list)
+        links = (
+            EdirUser.objects.filter(edir_id__in=edir_ids, is_committee=True, status="Active")
+            .select_related("user")
+            .order_by("id")
+        )
+        for link in links:
+            member = {field: getattr(link.user, field) for field in COMMITTEE_FIELDS}
+            member["number_of_family"] = link.user.active_family_count
+            committees[link.edir_id].append(member)
+
+        EdirStats.objects.bulk_create([
+            EdirStats(
+                edir_id=edir_id,
+                active_member_count=members.get(edir_id, {}).get("active_member_count", 0),
+                pending_join_requests=members.get(edir_id, {}).get("pending_join_requests", 0),
+                total_collected=payments.get(edir_id, {}).get("total_collected") or Decimal("0"),
+                pending_payments=payments.get(edir_id, {}).get("pending_payments", 0),
+                committee_members=committees[edir_id],
+                **{field: counts.get(edir_id, {}).get("count", 0) for field, counts in changes.items()},
+            )
+            for edir_id in edir_ids
+        ])
+        last_id = edir_ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_edir_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EdirStats',
+            fields=[
+                ('edir', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.edir')),
+                ('active_member_count', models.PositiveIntegerField(default=0)),
+                ('committee_members', models.JSONField(default=list)),
+                ('total_collected', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pending_join_requests', models.PositiveIntegerField(default=0)),
+                ('pending_payments', models.PositiveIntegerField(default=0)),
+                ('pending_edir_changes', models.PositiveIntegerField(default=0)),
+                ('pending_bank_changes', models.PositiveIntegerField(default=0)),
+                ('pending_member_changes', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_edir_stats, migrations.RunPython.noop),
+    ]
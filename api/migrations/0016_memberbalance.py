@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:31
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+
+def backfill_member_balances(apps, schema_editor):
+    FeeAssignment = apps.get_model("api", "FeeAssignment")
+    MemberBalance = apps.get_model("api", "MemberBalance")
+    income = Q(fee__fee_type="Income")
+    unpaid = income & Q(fee__status="Active") & (
+        Q(transaction__isnull=True) | ~Q(transaction__payment_status__in=["APPROVED", "PENDING"])
+    )
+    pending = income & Q(transaction__transaction_type="PAYMENT", transaction__payment_status="PENDING")
+    paid = income & Q(transaction__transaction_type="PAYMENT", transaction__payment_status="APPROVED")
+    rows = (
+        FeeAssignment.objects.filter(user__isnull=False)
+        .order_by()
+        .values("user_id", "fee__edir_id")
+        .annotate(
+            outstanding=Sum("fee__amount", filter=unpaid),
+            pending=Sum("fee__amount", filter=pending),
+            paid=Sum("fee__amount", filter=paid),
+        )
+    )
+    MemberBalance.objects.bulk_create(
+        [
+            MemberBalance(
+                user_id=row["user_id"],
+                edir_id=row["fee__edir_id"],
+                outstanding=row["outstanding"] or Decimal("0"),
+                pending=row["pending"] or Decimal("0"),
+                paid=row["paid"] or Decimal("0"),
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_edirstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pending', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('edir', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='member_balances', to='api.edir')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balances', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'edir'), name='unique_member_balance')],
+            },
+        ),
+        migrations.RunPython(backfill_member_balances, migrations.RunPython.noop),
+    ]
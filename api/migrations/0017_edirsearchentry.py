@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:56
+
+import api.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_memberbalance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EdirSearchEntry',
+            fields=[
+                ('edir', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='api.edir')),
+                ('document', api.models.FullTextDocumentField(db_column='api_edir_fts')),
+                ('name', models.TextField()),
+                ('address', models.TextField(null=True)),
+                ('description', models.TextField(null=True)),
+            ],
+            options={
+                'db_table': 'api_edir_fts',
+                'managed': False,
+            },
+        ),
+    ]
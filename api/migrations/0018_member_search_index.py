@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:06
+
+import api.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Full-text index over CustomUser.full_name for member search; see
+# api.search.search_members. Same layout as 0013: an external-content FTS5
+# table kept in sync by triggers on SQLite, a generated tsvector column with
+# a GIN index on PostgreSQL. Phone prefixes use the normalized_phone index.
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_customuser_fts USING fts5(
+        full_name,
+        content='api_customuser', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER api_customuser_fts_insert AFTER INSERT ON api_customuser BEGIN
+        INSERT INTO api_customuser_fts(rowid, full_name) VALUES (new.id, new.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER api_customuser_fts_delete AFTER DELETE ON api_customuser BEGIN
+        INSERT INTO api_customuser_fts(api_customuser_fts, rowid, full_name)
+        VALUES ('delete', old.id, old.full_name);
+    END
+    """,
+    """
+    CREATE TRIGGER api_customuser_fts_update AFTER UPDATE OF full_name ON api_customuser BEGIN
+        INSERT INTO api_customuser_fts(api_customuser_fts, rowid, full_name)
+        VALUES ('delete', old.id, old.full_name);
+        INSERT INTO api_customuser_fts(rowid, full_name) VALUES (new.id, new.full_name);
+    END
+    """,
+    "INSERT INTO api_customuser_fts(api_customuser_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS api_customuser_fts_update",
+    "DROP TRIGGER IF EXISTS api_customuser_fts_delete",
+    "DROP TRIGGER IF EXISTS api_customuser_fts_insert",
+    "DROP TABLE IF EXISTS api_customuser_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE api_customuser ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        to_tsvector('simple', coalesce(full_name, ''))
+    ) STORED
+    """,
+    "CREATE INDEX api_customuser_search_vector_idx ON api_customuser USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS api_customuser_search_vector_idx",
+    "ALTER TABLE api_customuser DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_edirsearchentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.CreateModel(
+            name='MemberSearchEntry',
+            fields=[
+                ('user', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('document', api.models.FullTextDocumentField(db_column='api_customuser_fts')),
+                ('full_name', models.TextField()),
+            ],
+            options={
+                'db_table': 'api_customuser_fts',
+                'managed': False,
+            },
+        ),
+    ]
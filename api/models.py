@@ -1,7 +1,10 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.core.exceptions import ValidationError
 from django.db import models
 import uuid
 
+from .phone import normalize_phone
+
 GENDER_CHOICES = [
     ('Male', 'Male'),
     ('Female', 'Female'),
@@ -63,9 +66,37 @@ class CustomUserManager(BaseUserManager):
         return self.create_user(phone_number, full_name, password, gender = gender,
                            marital_status = marital_status, address = address, **extra_fields)
 
+    def by_phone(self, phone_number):
+        """
+        The user matching ``phone_number`` however it is spelled, as a
+        queryset of at most one row.
+
+        An exact ``phone_number`` match wins: accounts whose number collides
+        with another one after normalization keep ``normalized_phone`` NULL
+        and are only reachable by their raw number.
+        """
+        normalized = normalize_phone(phone_number)
+        if normalized is None:
+            return self.filter(phone_number=phone_number)
+        return (
+            self.filter(models.Q(normalized_phone=normalized) | models.Q(phone_number=phone_number))
+            .order_by(models.Case(models.When(phone_number=phone_number, then=0), default=1), "id")[:1]
+        )
+
+    def get_by_phone(self, phone_number):
+        user = self.by_phone(phone_number).first()
+        if user is None:
+            raise self.model.DoesNotExist(f"No user with phone number {phone_number!r}")
+        return user
+
+    def get_by_natural_key(self, phone_number):
+        return self.get_by_phone(phone_number)
+
 class CustomUser(AbstractBaseUser, PermissionsMixin):
     full_name = models.CharField(max_length=100)
     phone_number = models.CharField(max_length=15, unique=True)
+    # E.164 form of phone_number, set in save(); None when it does not parse
+    normalized_phone = models.CharField(max_length=16, unique=True, null=True, blank=True, editable=False)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, blank=True, null=True)
     marital_status = models.CharField(max_length=20, choices=MARITAL_STATUS_CHOICES, blank=True, null=True)
     profession = models.CharField(max_length=100, blank=True, null=True)
@@ -73,6 +104,12 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     address = models.CharField(max_length=255, blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # Kept in sync with Family rows by api.family.refresh_active_family_count
+    active_family_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped whenever issued JWTs must stop working (password changes)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped whenever the user's EdirUser rows change; see api.tokens
+    membership_version = models.PositiveIntegerField(default=0, editable=False)
     created_date = models.DateTimeField(auto_now_add=True)
     updated_date = models.DateTimeField(null=True, blank=True)
 
@@ -83,6 +120,28 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.phone_number
+
+    def revoke_tokens(self):
+        """Invalidate every JWT issued to this user so far; caller saves."""
+        self.token_version += 1
+
+    def save(self, *args, **kwargs):
+        normalized = normalize_phone(self.phone_number)
+        if (
+            normalized is not None
+            and self.__dict__.get("normalized_phone") != normalized
+            and CustomUser.objects.filter(normalized_phone=normalized).exclude(pk=self.pk).exists()
+        ):
+            if self.pk is None:
+                raise ValidationError({"phone_number": "A user with this phone number already exists."})
+            # Another account holds this number in a different spelling;
+            # keep resolving this existing one by its raw phone_number
+            normalized = None
+        self.normalized_phone = normalized
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "phone_number" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_phone"}
+        super().save(*args, **kwargs)
     
 
 class UserAuditLog(models.Model):
@@ -232,12 +291,111 @@ class Edir(models.Model):
     #     CustomUser, on_delete=models.SET_NULL, null=True
     # )
     status = models.CharField(max_length=20, choices=STATUS, default='Active')
+    # WGS84 degrees; filled from the address by the geocode_edirs command
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
     created_date = models.DateField(auto_now_add=True)
     updated_date = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Bounding-box prefilter for api.geo.nearby_edirs
+            models.Index(fields=["latitude", "longitude"], name="api_edir_lat_lng_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
+class FullTextMatch(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+class FullTextDocumentField(models.TextField):
+    """The hidden column named after an FTS5 table; filter it with ``__match``."""
+
+
+FullTextDocumentField.register_lookup(FullTextMatch)
+
+
+class EdirSearchEntry(models.Model):
+    """
+    A row of the SQLite FTS5 index over Edir text, created and kept in sync
+    by migration 0013; see ``api.search.search_edirs``.
+    """
+    edir = models.OneToOneField(
+        Edir, on_delete=models.DO_NOTHING, primary_key=True, db_column="rowid",
+        db_constraint=False, related_name="search_entry",
+    )
+    document = FullTextDocumentField(db_column="api_edir_fts")
+    name = models.TextField()
+    address = models.TextField(null=True)
+    description = models.TextField(null=True)
+
+    class Meta:
+        managed = False
+        db_table = "api_edir_fts"
+
+
+class MemberSearchEntry(models.Model):
+    """
+    A row of the SQLite FTS5 index over member names, created and kept in
+    sync by migration 0018; see ``api.search.search_members``.
+    """
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.DO_NOTHING, primary_key=True, db_column="rowid",
+        db_constraint=False, related_name="search_entry",
+    )
+    document = FullTextDocumentField(db_column="api_customuser_fts")
+    full_name = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = "api_customuser_fts"
+
+class EdirStats(models.Model):
+    """
+    Dashboard figures for one edir, kept current by ``api.stats`` from the
+    write paths that change them; ``rebuild_edir_stats`` recomputes them.
+    """
+    edir = models.OneToOneField(Edir, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    active_member_count = models.PositiveIntegerField(default=0)
+    # UserWithNumFamSerializer data for the active committee members
+    committee_members = models.JSONField(default=list)
+    total_collected = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pending_join_requests = models.PositiveIntegerField(default=0)
+    pending_payments = models.PositiveIntegerField(default=0)
+    pending_edir_changes = models.PositiveIntegerField(default=0)
+    pending_bank_changes = models.PositiveIntegerField(default=0)
+    pending_member_changes = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for edir {self.edir_id}"
+
+class EdirRevision(models.Model):
+    RESOURCE_CHOICES = [
+        ("members", "Members"),
+        ("banks", "Banks"),
+        ("events", "Events"),
+        ("fees", "Fees"),
+    ]
+
+    edir = models.ForeignKey(Edir, on_delete=models.CASCADE, related_name="revisions")
+    resource = models.CharField(max_length=20, choices=RESOURCE_CHOICES)
+    revision = models.PositiveBigIntegerField(default=0)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("edir", "resource")
+
+    def __str__(self):
+        return f"{self.edir_id} - {self.resource} - {self.revision}"
+
 class EdirChangeRequest(models.Model):
     ACTION_CHOICES = (
         ("CREATE", "Create"),
@@ -323,6 +481,9 @@ class EdirUser(models.Model):
     class Meta:
         # db_table = "customuser_edirs"
         unique_together = ('user', 'edir')  # Prevent duplication
+        indexes = [
+            models.Index(fields=["edir", "status"]),
+        ]
 
     def __str__(self):
         return f"{self.user.full_name} - user id: {self.user.id} - edir name: {self.edir.name} edir id: {self.edir.id} is_committee: {self.is_committee} status: {self.status}"
@@ -701,6 +862,29 @@ class FeeAssignment(models.Model):
     transaction = models.ForeignKey(Transaction, on_delete=models.CASCADE, related_name='feeassignment_trx', null=True, blank=True)
 
     
+class MemberBalance(models.Model):
+    """
+    Running totals of a member's fee assignments in one edir, kept current
+    by ``api.balances`` from the fee and payment write paths;
+    ``verify_balances`` recomputes them from the raw rows.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="balances")
+    edir = models.ForeignKey(Edir, on_delete=models.CASCADE, related_name="member_balances")
+    # Active fees with no payment, or only a rejected one
+    outstanding = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # Fees covered by a payment awaiting approval
+    pending = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "edir"], name="unique_member_balance"),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} @ {self.edir_id}: {self.outstanding} outstanding"
+
 class FeeAssignAuditLog(models.Model):
     ACTION_CHOICES = (
         ("CREATED", "Created"),
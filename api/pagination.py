@@ -0,0 +1,67 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class MemberCursorPagination(CursorPagination):
+    """
+    Keyset pagination for an edir's member roster.
+
+    The queryset must carry the ``member_name`` and ``member_joined``
+    annotations (see ``edir_member_roster``); ``?ordering=`` picks one of
+    them and the primary key breaks ties.
+    """
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    orderings = {
+        "name": ("member_name", "id"),
+        "-name": ("-member_name", "-id"),
+        "joined": ("member_joined", "id"),
+        "-joined": ("-member_joined", "-id"),
+    }
+    ordering = orderings["name"]
+
+    @classmethod
+    def ordering_for(cls, request):
+        return cls.orderings.get(request.query_params.get("ordering"), cls.ordering)
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            cls.cursor_query_param in request.query_params
+            or cls.page_size_query_param in request.query_params
+        )
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering_for(request)
+
+
+class MemberSearchPagination(LimitOffsetPagination):
+    """Limit/offset pages for ranked member search results."""
+    default_limit = 20
+    max_limit = 100
+
+
+class JoinRequestCursorPagination(CursorPagination):
+    """Keyset pagination for an edir's pending join requests, oldest first."""
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+    ordering = ("id",)
+
+
+class EdirCatalogPagination(LimitOffsetPagination):
+    """
+    Limit/offset pages over the edir catalogue and directory search.
+    Only used when the client asks for ``limit`` or ``offset``, so older
+    clients keep getting a plain list.
+    """
+    default_limit = 20
+    max_limit = 100
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            cls.limit_query_param in request.query_params
+            or cls.offset_query_param in request.query_params
+        )
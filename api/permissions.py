@@ -0,0 +1,93 @@
+from collections import namedtuple
+
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import BasePermission
+
+from .invalidation import invalidate_now_and_on_commit
+from .lrucache import MISSING, TTLCache
+from .models import EdirUser
+from .tokens import EDIRS_CLAIM, MEMBERSHIP_VERSION_CLAIM
+
+Membership = namedtuple("Membership", ["status", "is_committee"])
+
+# Cached for users with no EdirUser row so repeated misses stay query-free
+NOT_A_MEMBER = Membership(None, False)
+
+
+membership_cache = TTLCache(
+    max_entries=getattr(settings, "EDIR_MEMBERSHIP_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "EDIR_MEMBERSHIP_CACHE_TTL", 60),
+)
+
+
+def get_membership(user_id, edir_id):
+    """Return the cached ``Membership`` for ``(user_id, edir_id)``."""
+    key = (int(user_id), int(edir_id))
+    membership = membership_cache.get(key)
+    if membership is MISSING:
+        row = (
+            EdirUser.objects.filter(user_id=key[0], edir_id=key[1])
+            .values_list("status", "is_committee")
+            .first()
+        )
+        membership = Membership(*row) if row else NOT_A_MEMBER
+        membership_cache.set(key, membership)
+    return membership
+
+
+def invalidate_membership(edir_id, user_ids):
+    """Forget the cached memberships of ``user_ids`` in the edir."""
+    keys = [(int(user_id), int(edir_id)) for user_id in user_ids]
+    invalidate_now_and_on_commit(lambda: membership_cache.delete_many(keys))
+
+
+def request_membership(request, edir_id):
+    """
+    The caller's membership in ``edir_id``, read from the JWT role claim when
+    the token has one, otherwise from the membership cache.
+
+    A claim older than the user's ``membership_version`` is rejected with a
+    401 so the client refreshes and picks up the change.
+    """
+    token = request.auth
+    if token is not None and hasattr(token, "get") and token.get(EDIRS_CLAIM) is not None:
+        if token.get(MEMBERSHIP_VERSION_CLAIM) != request.user.membership_version:
+            raise AuthenticationFailed(
+                "Your edir memberships changed, refresh your token.", code="membership_changed"
+            )
+        is_committee = token[EDIRS_CLAIM].get(str(edir_id))
+        if is_committee is None:
+            return NOT_A_MEMBER
+        return Membership("Active", bool(is_committee))
+    return get_membership(request.user.id, edir_id)
+
+
+class IsEdirMember(BasePermission):
+    """
+    Allows active members of the edir named by the ``edir_id`` URL kwarg.
+    Staff users are always allowed.
+    """
+    message = "You are not an active member of this edir."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_staff:
+            return True
+        edir_id = view.kwargs.get("edir_id")
+        if edir_id is None:
+            return False
+        return self.check(request_membership(request, edir_id))
+
+    def check(self, membership):
+        return membership.status == "Active"
+
+
+class IsEdirCommittee(IsEdirMember):
+    """Allows active committee members of the edir named by ``edir_id``."""
+    message = "Only committee members of this edir can perform this action."
+
+    def check(self, membership):
+        return membership.status == "Active" and membership.is_committee
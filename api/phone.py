@@ -0,0 +1,64 @@
+import re
+
+from django.conf import settings
+
+DEFAULT_COUNTRY_CODE = getattr(settings, "PHONE_DEFAULT_COUNTRY_CODE", "251")
+NATIONAL_NUMBER_LENGTH = getattr(settings, "PHONE_NATIONAL_NUMBER_LENGTH", 9)
+
+_STRIP = re.compile(r"[\s\-().]")
+
+
+def normalize_phone(raw):
+    """
+    Return ``raw`` in E.164 form (``+2519XXXXXXXX``) or ``None`` when it
+    cannot be a phone number.
+
+    Local numbers with a trunk ``0`` (``09...``), bare national numbers
+    (``9...``) and numbers with the country code with or without ``+`` or
+    ``00`` are all accepted. Other international numbers are kept as given.
+    """
+    if raw is None:
+        return None
+    value = _STRIP.sub("", str(raw))
+    if value.startswith("00"):
+        value = "+" + value[2:]
+    international = value.startswith("+")
+    digits = value[1:] if international else value
+    if not digits.isdigit():
+        return None
+
+    if digits.startswith(DEFAULT_COUNTRY_CODE) and len(digits) == len(DEFAULT_COUNTRY_CODE) + NATIONAL_NUMBER_LENGTH:
+        return "+" + digits
+    if international:
+        return "+" + digits if 8 <= len(digits) <= 15 else None
+    if digits.startswith("0") and len(digits) == NATIONAL_NUMBER_LENGTH + 1:
+        return "+" + DEFAULT_COUNTRY_CODE + digits[1:]
+    if len(digits) == NATIONAL_NUMBER_LENGTH:
+        return "+" + DEFAULT_COUNTRY_CODE + digits
+    return None
+
+
+
+def normalize_phone_prefix(raw):
+    """
+    Return the start of an E.164 number that ``raw``, a partially typed
+    phone number, stands for, or ``None`` when it has no digits or holds
+    anything else.
+
+    Accepts the same spellings as ``normalize_phone``: ``0911`` and ``911``
+    both become ``+251911``, ``2519`` and ``+2519`` become ``+2519``.
+    """
+    value = _STRIP.sub("", str(raw))
+    if value.startswith("00"):
+        value = "+" + value[2:]
+    international = value.startswith("+")
+    digits = value[1:] if international else value
+    if not digits.isdigit():
+        return None
+
+    # A partly typed country code is still read as one
+    if international or digits.startswith(DEFAULT_COUNTRY_CODE) or DEFAULT_COUNTRY_CODE.startswith(digits):
+        return "+" + digits
+    if digits.startswith("0"):
+        return "+" + DEFAULT_COUNTRY_CODE + digits[1:]
+    return "+" + DEFAULT_COUNTRY_CODE + digits
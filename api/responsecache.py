@@ -0,0 +1,106 @@
+import functools
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .invalidation import bump_cache_version, cache_version, invalidate_now_and_on_commit
+
+RESPONSE_CACHE_ALIAS = getattr(settings, "RESPONSE_CACHE_ALIAS", "default")
+RESPONSE_CACHE_TIMEOUT = getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+# Endpoints decorated with cached_response, for the metrics report
+CACHED_ENDPOINTS = []
+
+
+def _cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+def _tag_key(tag):
+    return f"respcache:tag:{tag}"
+
+
+def edir_tag(edir_id):
+    return f"edir:{int(edir_id)}"
+
+
+def tag_version(tag):
+    return cache_version(_cache(), _tag_key(tag))
+
+
+def invalidate_tag(tag):
+    """Drop every response cached under ``tag``; the old entries age out."""
+    invalidate_now_and_on_commit(lambda: bump_cache_version(_cache(), _tag_key(tag)))
+
+
+def invalidate_edir_responses(edir_id):
+    if edir_id is not None:
+        invalidate_tag(edir_tag(edir_id))
+
+
+def _count(endpoint, outcome):
+    cache = _cache()
+    key = f"respcache:metrics:{endpoint}:{outcome}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_metrics():
+    """``{endpoint: {"hits": n, "misses": n, "hit_ratio": r}}`` since the cache was last cleared."""
+    cache = _cache()
+    metrics = {}
+    for endpoint in CACHED_ENDPOINTS:
+        hits = cache.get(f"respcache:metrics:{endpoint}:hit", 0)
+        misses = cache.get(f"respcache:metrics:{endpoint}:miss", 0)
+        total = hits + misses
+        metrics[endpoint] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+    return metrics
+
+
+def cached_response(endpoint, timeout=None):
+    """
+    Cache a DRF function view's 200 responses per ``(endpoint, edir, user)``,
+    tagged with the edir so writes to it invalidate every cached response.
+
+    Apply below ``@api_view``/``@permission_classes`` so authentication and
+    permission checks still run on every request. The view must take
+    ``edir_id``; responses carry ``X-Cache: HIT`` or ``MISS``.
+    """
+    def decorator(view):
+        CACHED_ENDPOINTS.append(endpoint)
+
+        @functools.wraps(view)
+        def wrapper(request, edir_id, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, edir_id, *args, **kwargs)
+
+            tag = edir_tag(edir_id)
+            query = hashlib.md5(request.META.get("QUERY_STRING", "").encode()).hexdigest()[:8]
+            key = f"respcache:{endpoint}:{tag}:{tag_version(tag)}:{request.user.id}:{query}"
+            cache = _cache()
+
+            cached = cache.get(key)
+            if cached is not None:
+                _count(endpoint, "hit")
+                response = Response(cached)
+                response["X-Cache"] = "HIT"
+                return response
+
+            _count(endpoint, "miss")
+            response = view(request, edir_id, *args, **kwargs)
+            if response.status_code == 200 and isinstance(response, Response):
+                cache.set(key, response.data, timeout or RESPONSE_CACHE_TIMEOUT)
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+    return decorator
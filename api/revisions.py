@@ -0,0 +1,59 @@
+import hashlib
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import EdirRevision, EdirUser
+
+
+def current_revision(edir_id, resource):
+    revision = (
+        EdirRevision.objects.filter(edir_id=edir_id, resource=resource)
+        .values_list("revision", flat=True)
+        .first()
+    )
+    return revision or 0
+
+
+def bump_revision(edir_id, resource):
+    if edir_id is None:
+        return
+    updated = EdirRevision.objects.filter(edir_id=edir_id, resource=resource).update(
+        revision=F("revision") + 1
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            EdirRevision.objects.create(edir_id=edir_id, resource=resource, revision=1)
+    except IntegrityError:
+        # Another request created the row first; bump it instead
+        EdirRevision.objects.filter(edir_id=edir_id, resource=resource).update(
+            revision=F("revision") + 1
+        )
+
+
+def bump_user_edirs_revision(user_id, resource):
+    """Bump ``resource`` for every edir the user belongs to."""
+    edir_ids = EdirUser.objects.filter(user_id=user_id).values_list("edir_id", flat=True)
+    for edir_id in edir_ids:
+        bump_revision(edir_id, resource)
+
+
+def revision_etag(resource):
+    """
+    Build an ``etag_func`` for ``django.views.decorators.http.condition``.
+
+    The ETag only depends on the edir's revision counter for ``resource`` and
+    the query string, so a matching ``If-None-Match`` is answered with a 304
+    before the view runs its list query.
+    """
+    def etag_func(request, edir_id, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        etag = f"{resource}-{edir_id}-{current_revision(edir_id, resource)}"
+        query = request.META.get("QUERY_STRING", "")
+        if query:
+            etag += "-" + hashlib.md5(query.encode()).hexdigest()[:8]
+        return etag
+    return etag_func
@@ -0,0 +1,121 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Case, F, FloatField, Func, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import CustomUser, MemberSearchEntry
+from .phone import normalize_phone_prefix
+
+
+def _search_tokens(term):
+    return re.findall(r"\w+", term)
+
+
+def _fts_query(tokens):
+    # Quoted so FTS5 operators in user input are matched as plain words
+    query = " ".join(f'"{token}"' for token in tokens[:-1])
+    return f'{query} "{tokens[-1]}"*'.strip()
+
+
+def _tsquery(tokens):
+    return " & ".join(tokens[:-1] + [f"{tokens[-1]}:*"])
+
+
+def _name_matches(tokens, using):
+    """Ids of users whose name has every token as a word, the last as a prefix."""
+    vendor = connections[using].vendor
+    if vendor == "sqlite":
+        return MemberSearchEntry.objects.using(using).filter(document__match=_fts_query(tokens)).values("user_id")
+    users = CustomUser.objects.using(using)
+    if vendor == "postgresql":
+        return users.filter(RawSQL(
+            "api_customuser.search_vector @@ to_tsquery('simple', %s)", [_tsquery(tokens)],
+            output_field=BooleanField(),
+        )).values("id")
+    matches = Q()
+    for token in tokens:
+        matches &= Q(full_name__icontains=token)
+    return users.filter(matches).values("id")
+
+
+def search_members(queryset, term):
+    """
+    Filter an ``EdirUser`` queryset by member name or phone number and rank it.
+
+    Names match word by word, the last word as a prefix, through the
+    full-text index from migration 0018. Phone numbers match as a prefix of
+    ``normalized_phone`` however the prefix is typed, as a range scan of
+    its unique index. Both sets of user ids come straight from an index, so
+    the edir's roster rows are checked by lookup instead of a ``LIKE`` over
+    every name.
+
+    Matches are ranked phone prefix first, then name prefix, then the rest.
+    """
+    tokens = _search_tokens(term)
+    if not tokens:
+        return queryset.none()
+
+    matches = Q(user__in=_name_matches(tokens, queryset.db))
+    ranks = [When(user__full_name__istartswith=term.strip(), then=Value(1))]
+    prefix = normalize_phone_prefix(term)
+    if prefix is not None:
+        # Every number starting with prefix sorts in [prefix, prefix + 1)
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        phone_ids = CustomUser.objects.using(queryset.db).filter(
+            normalized_phone__gte=prefix, normalized_phone__lt=upper
+        ).values("id")
+        matches |= Q(user__in=phone_ids)
+        ranks.insert(0, When(user__normalized_phone__gte=prefix, user__normalized_phone__lt=upper, then=Value(0)))
+
+    return (
+        queryset.filter(matches)
+        .annotate(rank=Case(*ranks, default=Value(2), output_field=IntegerField()))
+        .order_by("rank", "user__full_name", "id")
+    )
+
+
+def search_edirs(queryset, term):
+    """
+    Filter an ``Edir`` queryset by the words of ``term`` and order it by
+    relevance, name matches weighing most, then address, then description.
+
+    Every word must match, the last one as a prefix so results narrow while
+    the user types. Uses the full-text index from migration 0013: FTS5 with
+    BM25 on SQLite, the ``search_vector`` column with ``ts_rank`` on
+    PostgreSQL. Other backends fall back to unranked substring matching.
+    """
+    tokens = _search_tokens(term)
+    if not tokens:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        return (
+            queryset.filter(search_entry__document__match=_fts_query(tokens))
+            .annotate(rank=Func(
+                F("search_entry__document"), Value(10.0), Value(3.0), Value(1.0),
+                function="bm25", output_field=FloatField(),
+            ))
+            .order_by("rank", "name", "id")
+        )
+    if vendor == "postgresql":
+        query = _tsquery(tokens)
+        return (
+            queryset.filter(RawSQL(
+                "api_edir.search_vector @@ to_tsquery('simple', %s)", [query], output_field=BooleanField()
+            ))
+            .annotate(rank=RawSQL(
+                "ts_rank(api_edir.search_vector, to_tsquery('simple', %s))", [query], output_field=FloatField()
+            ))
+            .order_by("-rank", "name", "id")
+        )
+
+    matches = Q()
+    for token in tokens:
+        matches &= (
+            Q(name__icontains=token)
+            | Q(address__icontains=token)
+            | Q(description__icontains=token)
+        )
+    return queryset.filter(matches).order_by("name", "id")
@@ -1,10 +1,12 @@
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer, UserSerializer as BaseUserSerializer
 from rest_framework import serializers
-from .models import CustomUser, EdirChangeRequest, Family, Edir, Fee, FeeAssignment, Bank, EdirUser, Help, Event, Transaction, BankChangeRequest
+from .models import CustomUser, EdirChangeRequest, Family, Edir, Fee, FeeAssignment, Bank, EdirUser, Help, Event, Transaction, BankChangeRequest, MemberBalance
 import calendar
 from datetime import date
 from django.db.models import Sum
 from django.contrib.auth import password_validation
+from .authentication import check_user_password
+from .fieldsets import SparseFieldsMixin
 
 class UserCreateSerializer(BaseUserCreateSerializer):
     class Meta(BaseUserCreateSerializer.Meta):
@@ -15,6 +17,8 @@ class UserCreateSerializer(BaseUserCreateSerializer):
     def validate_phone_number(self, value):
         if not value.isdigit():
             raise serializers.ValidationError("Phone number must contain only digits.")
+        if CustomUser.objects.by_phone(value).exists():
+            raise serializers.ValidationError("A user with this phone number already exists.")
         return value
 
 class SimpleUserSerializer(serializers.ModelSerializer):
@@ -22,8 +26,13 @@ class SimpleUserSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ["id", "full_name", "phone_number"]
 
-class UserWithNumFamSerializer(serializers.ModelSerializer):
-    number_of_family = serializers.SerializerMethodField()
+class SimpleEdirSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Edir
+        fields = ["id", "name"]
+
+class UserWithNumFamSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    number_of_family = serializers.IntegerField(source="active_family_count", read_only=True)
     # is_committee = serializers.SerializerMethodField()
 
     class Meta:
@@ -40,12 +49,6 @@ class UserWithNumFamSerializer(serializers.ModelSerializer):
             # 'is_committee',
         ]
 
-    def get_number_of_family(self, obj):
-        family = getattr(obj, "family", None)
-        if family is None:
-            return 0
-        return family.filter(status="Active").count()
-
     # def get_is_committee(self, obj):
     #     edir_id = self.context.get("edir_id")
     #     if not edir_id:
@@ -54,7 +57,7 @@ class UserWithNumFamSerializer(serializers.ModelSerializer):
     #     return membership.is_committee if membership else False
 
 
-class UserWithNumFam2Serializer(serializers.ModelSerializer):
+class UserWithNumFam2Serializer(SparseFieldsMixin, serializers.ModelSerializer):
     id = serializers.CharField(source="user.id")
     full_name = serializers.CharField(source="user.full_name")
     phone_number = serializers.CharField(source="user.phone_number")
@@ -65,7 +68,7 @@ class UserWithNumFam2Serializer(serializers.ModelSerializer):
     address = serializers.CharField(source="user.address")
     user_status = serializers.CharField(source="status")
     # is_committee = serializers.CharField(source="is_committee")
-    number_of_family = serializers.SerializerMethodField()
+    number_of_family = serializers.IntegerField(source="user.active_family_count", read_only=True)
 
     class Meta:
         model = EdirUser 
@@ -73,9 +76,35 @@ class UserWithNumFam2Serializer(serializers.ModelSerializer):
             'id', 'full_name', 'phone_number',  'gender', 'marital_status', 
             'profession', 'address', "user_status", "number_of_family", "is_committee"
         ]
-    def get_number_of_family(self, obj):
-        return obj.user.family.filter(status="Active").count()
-        
+
+
+class MemberSearchResultSerializer(UserWithNumFam2Serializer):
+    """A roster row for member search, with the user id as an integer like the other member endpoints."""
+    id = serializers.IntegerField(source="user.id")
+
+
+class MemberNameSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    name = serializers.CharField(source="full_name")
+
+    class Meta:
+        model = CustomUser
+        fields = ["id", "name"]
+
+
+class JoinRequestSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    user_id = serializers.IntegerField(source="user.id")
+    full_name = serializers.CharField(source="user.full_name")
+    phone_number = serializers.CharField(source="user.phone_number")
+    gender = serializers.CharField(source="user.gender")
+    address = serializers.CharField(source="user.address")
+    requested_date = serializers.DateTimeField(source="updated_date")
+
+    class Meta:
+        model = EdirUser
+        fields = [
+            'id', 'user_id', 'full_name', 'phone_number', 'gender', 'address', 'status', 'requested_date'
+        ]
+
 
 class FamilyWithUserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -94,7 +123,7 @@ class FamilyWithUserSerializer(serializers.ModelSerializer):
 #         read_only_fields = ["id", "created_date", ]
 
 
-class EdirSerializer(serializers.ModelSerializer):
+class EdirSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     meeting_date = serializers.DateField(
         input_formats=["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"],
         required=False,
@@ -115,6 +144,8 @@ class EdirSerializer(serializers.ModelSerializer):
             "created_date",
             "meeting_date",
             "meeting_place",
+            "latitude",
+            "longitude",
         ] 
         read_only_fields = (
             # "created_by",
@@ -123,6 +154,10 @@ class EdirSerializer(serializers.ModelSerializer):
             "is_popular",
             "status",
         )
+        extra_kwargs = {
+            "latitude": {"min_value": -90, "max_value": 90},
+            "longitude": {"min_value": -180, "max_value": 180},
+        }
         
 class EdirChangeRequestSerializer(serializers.ModelSerializer):
     maker = SimpleUserSerializer(read_only=True)
@@ -180,12 +215,15 @@ class EdirWithUsersSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_date", "users"]
 
 
-class BankWithEdirSerializer(serializers.ModelSerializer):
+class BankWithEdirSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Bank
         fields = [
             'id', 'bank_name', 'account_number', 'account_name','status', 'edir', 
         ]
+        expandable_fields = {
+            "edir": lambda: SimpleEdirSerializer(read_only=True),
+        }
 class BankSerializer(serializers.ModelSerializer):
     class Meta:
         model = Bank
@@ -222,10 +260,14 @@ class UserWithEdirsSerializer(serializers.ModelSerializer):
 #         model = Bill
 #         fields = "__all__"
 
-class EventSerializer(serializers.ModelSerializer):
+class EventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = "__all__"
+        expandable_fields = {
+            "edir": lambda: SimpleEdirSerializer(read_only=True),
+            "made_by": lambda: SimpleUserSerializer(read_only=True),
+        }
 
 # class SemiBillSerializer(serializers.ModelSerializer):
 #     class Meta:
@@ -248,15 +290,39 @@ class HelpSerializer(serializers.ModelSerializer):
 #     def get_total_amount(self, obj):
 #         return sum(bill.amount for bill in obj.payment.all())
     
-class EdirWithUserStatusSerializer(serializers.ModelSerializer):
+class EdirWithUserStatusSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Edir plus the requesting user's membership status. Views should
+    annotate ``user_status`` onto the queryset (see
+    ``get_requested_edirs``); otherwise it is looked up per edir.
+    """
     user_status = serializers.SerializerMethodField()
 
     class Meta:
         model = Edir
-        fields = "__all__"   # or list your fields
-        extra_fields = ["user_status"]
+        fields = [
+            "id",
+            "name",
+            "monthly_fee",
+            "address",
+            "description",
+            "meeting_date",
+            "meeting_place",
+            "latitude",
+            "longitude",
+            "is_popular",
+            "status",
+            "created_date",
+            "updated_date",
+            "user_status",
+        ]
+        # Annotated by the view; the fallback lookup only needs the pk
+        sparse_sources = {"user_status": ()}
 
     def get_user_status(self, obj):
+        if hasattr(obj, "user_status"):
+            return obj.user_status
+
         request = self.context.get("request")
         if not request:
             return None
@@ -291,60 +357,77 @@ class EdirWithUserStatusSerializer(serializers.ModelSerializer):
 
     
 class EdirDetailSerializer(serializers.ModelSerializer):
-    member_count = serializers.SerializerMethodField()
+    """
+    Dashboard view of an edir. Counts, totals and the committee roster are
+    read from the edir's ``EdirStats`` row and ``unpaid_fees_total`` from
+    the member's ``MemberBalance``; ``api.stats.dashboard_edir`` loads both
+    in one query.
+    """
+    member_count = serializers.IntegerField(source="stats.active_member_count", read_only=True)
     unpaid_fees_total = serializers.SerializerMethodField()
-    committee_members = serializers.SerializerMethodField()
+    committee_members = serializers.JSONField(source="stats.committee_members", read_only=True)
+    total_collected = serializers.DecimalField(
+        source="stats.total_collected", max_digits=14, decimal_places=2, read_only=True
+    )
+    pending_approvals = serializers.SerializerMethodField()
 
     class Meta:
         model = Edir
         fields = [
             "id", "name", "monthly_fee", "address", "description", "meeting_date", "meeting_place",
-            "created_date", "member_count", "unpaid_fees_total", "committee_members"
+            "created_date", "member_count", "unpaid_fees_total", "committee_members",
+            "total_collected", "pending_approvals",
         ]
-    def get_member_count(self, obj):
-        return EdirUser.objects.filter(edir=obj, status="Active").count()
     def get_unpaid_fees_total(self, obj):
+        if hasattr(obj, "unpaid_fees_total"):
+            return obj.unpaid_fees_total
         user = self.context.get("request").user
-        total = (
-            FeeAssignment.objects.filter(
-                user=user,
-                fee__edir=obj,
-                # fee__transaction_type="Deposit",
-                # payment_status="Not Paid",
-            )
-            .aggregate(total=Sum("fee__amount"))["total"]
-        )
-        return total or 0
-    def get_committee_members(self, obj):
-        # members = EdirUser.objects.filter(
-        #     edir=obj,  # get group for this edir
-        #     is_committee=True
-        # ).distinct()
-        committee_links = EdirUser.objects.filter(
-            edir=obj,
-            is_committee=True,
-            status="Active"
-        ).select_related("user")
-
-        members = [link.user for link in committee_links]
-        return UserWithNumFamSerializer(members, many=True).data
+        return (
+            MemberBalance.objects.filter(user=user, edir=obj)
+            .values_list("outstanding", flat=True)
+            .first()
+        ) or 0
+    def get_pending_approvals(self, obj):
+        stats = obj.stats
+        return {
+            "join_requests": stats.pending_join_requests,
+            "payments": stats.pending_payments,
+            "edir_changes": stats.pending_edir_changes,
+            "bank_changes": stats.pending_bank_changes,
+            "member_changes": stats.pending_member_changes,
+        }
 
 # class BillSummarySerializer(serializers.Serializer):
 #     # edir_id = serializers.IntegerField()
 #     payment_date = serializers.DateField()
 #     total_amount = serializers.DecimalField(max_digits=10, decimal_places=2)
 
-class FeeAssignmentSerializer(serializers.ModelSerializer):
+class SimpleFeeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Fee
+        fields = ["id", "name", "category", "amount", "payment_date"]
+
+class FeeAssignmentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = FeeAssignment
         fields = "__all__"
+        expandable_fields = {
+            "fee": lambda: SimpleFeeSerializer(read_only=True),
+            "user": lambda: SimpleUserSerializer(read_only=True),
+            "maker": lambda: SimpleUserSerializer(read_only=True),
+        }
 
-class FeeSerializer(serializers.ModelSerializer):
+class FeeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     supported_member = SimpleUserSerializer(read_only=True)
 
     class Meta:
         model = Fee
         fields = "__all__"
+        expandable_fields = {
+            "edir": lambda: SimpleEdirSerializer(read_only=True),
+            "maker": lambda: SimpleUserSerializer(read_only=True),
+            "checker": lambda: SimpleUserSerializer(read_only=True),
+        }
 
 # class TransactionSerializer(serializers.Serializer):
 #     Trx_ref = serializers.CharField()
@@ -528,7 +611,7 @@ class ChangePasswordSerializer(serializers.Serializer):
 
     def validate_old_password(self, value):
         user = self.context['request'].user
-        if not user.check_password(value):
+        if not check_user_password(user, value):
             raise serializers.ValidationError('Old password is not correct')
         return value
 
@@ -552,7 +635,7 @@ class FamilyDetailSerializer(serializers.ModelSerializer):
 
 class UserDetailSerializer(serializers.ModelSerializer):
     family = FamilyDetailSerializer(many=True, read_only=True)  
-    number_of_family = serializers.SerializerMethodField()
+    number_of_family = serializers.IntegerField(source="active_family_count", read_only=True)
     # is_committee = serializers.SerializerMethodField()
 
     class Meta:
@@ -569,8 +652,6 @@ class UserDetailSerializer(serializers.ModelSerializer):
             'number_of_family',
             # 'is_committee',
         ]
-    def get_number_of_family(self, obj):
-        return obj.family.count()
 
     # def get_is_committee(self, obj):
     #     return False
\ No newline at end of file
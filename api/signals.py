@@ -0,0 +1,201 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .balances import assigned_members, refresh_assigned_members, refresh_balances_for, refresh_member_balances
+from .catalogue import invalidate_popular_edirs
+from .family import refresh_active_family_count
+from .membership import bump_membership_version, membership_changed
+from .models import (
+    Bank, BankChangeRequest, CustomUser, Edir, EdirChangeRequest, EdirUser, EdirUserChangeRequest, Event, Family,
+    Fee, FeeAssignment, Transaction,
+)
+from .permissions import invalidate_membership
+from .responsecache import invalidate_edir_responses
+from .revisions import bump_revision, bump_user_edirs_revision
+from .stats import ensure_edir_stats, refresh_committee_snapshots, refresh_edir_stats
+
+# Saves that only touch these fields never change what the list endpoints return
+USER_BOOKKEEPING_FIELDS = {"last_login", "password", "token_version", "membership_version"}
+
+
+def _deleting(origin, model):
+    if isinstance(origin, model):
+        return True
+    return isinstance(origin, QuerySet) and origin.model is model
+
+
+def deleting_edir(origin):
+    """
+    True for a post_delete cascaded from deleting an edir. Its revision and
+    stats rows are being deleted too, and bumping them would recreate rows
+    pointing at the removed edir.
+    """
+    return _deleting(origin, Edir)
+
+
+def deleting_fee(origin):
+    """
+    True for a post_delete cascaded from deleting a fee. Its assignments are
+    deleted before the fee, whose own handler then refreshes the affected
+    balances once instead of once per assignment.
+    """
+    return _deleting(origin, Fee)
+
+
+def _on_committee(status, is_committee):
+    return status == "Active" and bool(is_committee)
+
+
+@receiver(post_init, sender=EdirUser)
+def remember_membership_status(sender, instance, **kwargs):
+    # The stats row is shifted by the change, so keep what was loaded
+    if instance.pk is None:
+        instance._loaded_membership = (None, False)
+    elif {"status", "is_committee"} <= instance.__dict__.keys():
+        instance._loaded_membership = (instance.status, instance.is_committee)
+    else:
+        # Deferred by only(); reading them here would recurse into post_init
+        instance._loaded_membership = None
+
+
+@receiver([pre_save, pre_delete], sender=EdirUser)
+def load_deferred_membership_status(sender, instance, **kwargs):
+    if instance._loaded_membership is None:
+        instance._loaded_membership = (
+            EdirUser.objects.filter(pk=instance.pk).values_list("status", "is_committee").first()
+            or (None, False)
+        )
+
+
+@receiver([post_save, post_delete], sender=EdirUser)
+def edir_user_changed(sender, instance, origin=None, **kwargs):
+    if deleting_edir(origin):
+        invalidate_membership(instance.edir_id, [instance.user_id])
+        bump_membership_version([instance.user_id])
+        return
+    previous_status, was_committee = instance._loaded_membership
+    if kwargs["signal"] is post_save:
+        current = (instance.status, instance.is_committee)
+    else:
+        current = (None, False)
+    membership_changed(
+        instance.edir_id,
+        [instance.user_id],
+        [(previous_status, current[0])],
+        committee=_on_committee(previous_status, was_committee) != _on_committee(*current),
+    )
+    instance._loaded_membership = current
+
+
+@receiver(post_save, sender=CustomUser)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields and set(update_fields) <= USER_BOOKKEEPING_FIELDS:
+        return
+    bump_user_edirs_revision(instance.id, "members")
+    refresh_committee_snapshots([instance.id])
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def forget_cached_user(sender, instance, **kwargs):
+    invalidate_cached_user(instance.id)
+
+
+@receiver(post_init, sender=Family)
+def remember_family_owner(sender, instance, **kwargs):
+    # family_detail PATCH may move a member to another user; both counters change
+    instance._loaded_user_id = instance.user_id
+
+
+@receiver([post_save, post_delete], sender=Family)
+def family_changed(sender, instance, **kwargs):
+    previous_user_id = getattr(instance, "_loaded_user_id", None)
+    refresh_active_family_count(instance.user_id, previous_user_id)
+    for user_id in {instance.user_id, previous_user_id} - {None}:
+        bump_user_edirs_revision(user_id, "members")
+    instance._loaded_user_id = instance.user_id
+
+
+@receiver([post_save, post_delete], sender=Edir)
+def edir_changed(sender, instance, **kwargs):
+    invalidate_popular_edirs()
+    invalidate_edir_responses(instance.id)
+
+
+@receiver(post_save, sender=Edir)
+def create_edir_stats(sender, instance, created, **kwargs):
+    if created:
+        ensure_edir_stats(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Transaction)
+def transaction_changed(sender, instance, origin=None, **kwargs):
+    if deleting_edir(origin):
+        return
+    refresh_edir_stats(instance.edir_id, "payments")
+    invalidate_edir_responses(instance.edir_id)
+    if kwargs["signal"] is post_save:
+        # Deleting a transaction cascades to its assignments, whose own signal
+        # refreshes them; the nullable FK leaves their delete unordered
+        refresh_balances_for(FeeAssignment.objects.filter(transaction=instance))
+
+
+@receiver([post_save, post_delete], sender=EdirChangeRequest)
+@receiver([post_save, post_delete], sender=BankChangeRequest)
+@receiver([post_save, post_delete], sender=EdirUserChangeRequest)
+def change_request_changed(sender, instance, origin=None, **kwargs):
+    if deleting_edir(origin):
+        return
+    refresh_edir_stats(instance.edir_id, "changes")
+
+
+@receiver([post_save, post_delete], sender=Bank)
+def bank_changed(sender, instance, origin=None, **kwargs):
+    if deleting_edir(origin):
+        return
+    bump_revision(instance.edir_id, "banks")
+
+
+@receiver([post_save, post_delete], sender=Event)
+def event_changed(sender, instance, origin=None, **kwargs):
+    if deleting_edir(origin):
+        return
+    bump_revision(instance.edir_id, "events")
+
+
+@receiver([post_save, post_delete], sender=Fee)
+def fee_changed(sender, instance, origin=None, **kwargs):
+    if deleting_edir(origin):
+        return
+    bump_revision(instance.edir_id, "fees")
+    invalidate_edir_responses(instance.edir_id)
+    if kwargs["signal"] is post_save:
+        # Only active fees count towards the outstanding balance
+        refresh_balances_for(FeeAssignment.objects.filter(fee=instance))
+    else:
+        refresh_assigned_members(getattr(instance, "_assigned_members", {}))
+
+
+@receiver(pre_delete, sender=Fee)
+def remember_assigned_members(sender, instance, origin=None, **kwargs):
+    # The cascaded assignments are gone by post_delete; note whose balances they held
+    if deleting_fee(origin):
+        instance._assigned_members = assigned_members(FeeAssignment.objects.filter(fee=instance))
+
+
+@receiver([post_save, post_delete], sender=FeeAssignment)
+def fee_assignment_changed(sender, instance, origin=None, **kwargs):
+    if deleting_edir(origin) or deleting_fee(origin):
+        return
+    if FeeAssignment.fee.is_cached(instance):
+        edir_id = instance.fee.edir_id
+    else:
+        edir_id = Fee.objects.filter(id=instance.fee_id).values_list("edir_id", flat=True).first()
+    bump_revision(edir_id, "fees")
+    invalidate_edir_responses(edir_id)
+    # A deleted user's balance rows go with them
+    if not _deleting(origin, CustomUser):
+        refresh_member_balances(edir_id, [instance.user_id])
@@ -0,0 +1,171 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db.models import Count, F, Q, Sum
+
+from .balances import user_outstanding_subquery
+from .models import (
+    BankChangeRequest, Edir, EdirChangeRequest, EdirStats, EdirUser, EdirUserChangeRequest, Transaction,
+)
+from .responsecache import invalidate_edir_responses
+from .serializers import UserWithNumFamSerializer
+
+STATS_PARTS = ("members", "committee", "payments", "changes")
+
+# Membership statuses counted on the stats row
+MEMBER_COUNTERS = {"Active": "active_member_count", "Pending": "pending_join_requests"}
+
+
+def committee_snapshot(edir_id):
+    links = (
+        EdirUser.objects.filter(edir_id=edir_id, is_committee=True, status="Active")
+        .select_related("user")
+        .order_by("id")
+    )
+    return UserWithNumFamSerializer([link.user for link in links], many=True).data
+
+
+def _member_values(edir_id):
+    return EdirUser.objects.filter(edir_id=edir_id).aggregate(
+        active_member_count=Count("id", filter=Q(status="Active")),
+        pending_join_requests=Count("id", filter=Q(status="Pending")),
+    )
+
+
+def _payment_values(edir_id):
+    values = Transaction.objects.filter(edir_id=edir_id).aggregate(
+        total_collected=Sum("amount", filter=Q(payment_status="APPROVED", transaction_type="PAYMENT")),
+        pending_payments=Count("id", filter=Q(payment_status="PENDING")),
+    )
+    values["total_collected"] = values["total_collected"] or Decimal("0")
+    return values
+
+
+def _change_values(edir_id):
+    return {
+        "pending_edir_changes": EdirChangeRequest.objects.filter(edir_id=edir_id, status="PENDING").count(),
+        "pending_bank_changes": BankChangeRequest.objects.filter(edir_id=edir_id, status="PENDING").count(),
+        "pending_member_changes": EdirUserChangeRequest.objects.filter(edir_id=edir_id, status="PENDING").count(),
+    }
+
+
+def _stats_values(edir_id, parts):
+    values = {}
+    if "members" in parts:
+        values.update(_member_values(edir_id))
+    if "committee" in parts:
+        values["committee_members"] = committee_snapshot(edir_id)
+    if "payments" in parts:
+        values.update(_payment_values(edir_id))
+    if "changes" in parts:
+        values.update(_change_values(edir_id))
+    return values
+
+
+def refresh_edir_stats(edir_id, *parts):
+    """
+    Recompute the named parts (all by default) of the edir's stats row in
+    the caller's transaction.
+
+    Only an existing row is updated: rows are created with the edir or by
+    ``ensure_edir_stats``, so a refresh fired while an edir is being
+    cascade-deleted cannot recreate its row.
+    """
+    if edir_id is None:
+        return
+    values = _stats_values(edir_id, set(parts or STATS_PARTS))
+    EdirStats.objects.filter(edir_id=edir_id).update(**values)
+    # Cached dashboards embed these figures
+    invalidate_edir_responses(edir_id)
+
+
+def member_count_deltas(transitions):
+    """
+    ``{counter: delta}`` for ``(previous_status, new_status)`` membership
+    changes, where ``None`` stands for a row that did not or no longer exists.
+    """
+    deltas = Counter()
+    for previous, new in transitions:
+        if previous in MEMBER_COUNTERS:
+            deltas[MEMBER_COUNTERS[previous]] -= 1
+        if new in MEMBER_COUNTERS:
+            deltas[MEMBER_COUNTERS[new]] += 1
+    return {counter: delta for counter, delta in deltas.items() if delta}
+
+
+def apply_member_changes(edir_id, transitions, committee=False):
+    """
+    Shift the member counters by the ``transitions`` with ``F()`` updates
+    instead of recounting the edir, and recompute the committee roster only
+    when ``committee`` says it changed. ``rebuild_edir_stats`` corrects any
+    drift.
+    """
+    if edir_id is None:
+        return
+    values = {
+        counter: F(counter) + delta for counter, delta in member_count_deltas(transitions).items()
+    }
+    if committee:
+        values["committee_members"] = committee_snapshot(edir_id)
+    if not values:
+        return
+    EdirStats.objects.filter(edir_id=edir_id).update(**values)
+    invalidate_edir_responses(edir_id)
+
+
+def refresh_committee_snapshots(user_ids):
+    """Refresh the committee roster of every edir where these users sit on the committee."""
+    user_ids = [user_id for user_id in user_ids if user_id is not None]
+    if not user_ids:
+        return
+    edir_ids = set(
+        EdirUser.objects.filter(user_id__in=user_ids, is_committee=True, status="Active")
+        .values_list("edir_id", flat=True)
+    )
+    for edir_id in edir_ids:
+        refresh_edir_stats(edir_id, "committee")
+
+
+def ensure_edir_stats(edir_id):
+    """Create or fully recompute the edir's stats row and return it."""
+    stats, _ = EdirStats.objects.update_or_create(
+        edir_id=edir_id, defaults=_stats_values(edir_id, STATS_PARTS)
+    )
+    return stats
+
+
+def rebuild_edir_stats(batch_size=500):
+    """Recompute every edir's stats row; returns the number of edirs processed."""
+    rebuilt = 0
+    last_id = 0
+    while True:
+        edir_ids = list(
+            Edir.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not edir_ids:
+            return rebuilt
+        for edir_id in edir_ids:
+            ensure_edir_stats(edir_id)
+        rebuilt += len(edir_ids)
+        last_id = edir_ids[-1]
+
+
+def dashboard_edir(edir_id, user):
+    """
+    The edir with its stats row and ``user``'s outstanding balance from the
+    ledger in one query, for ``EdirDetailSerializer``.
+
+    Every edir has a row from migration 0015 or its post_save signal; one
+    missing anyway (e.g. after ``bulk_create``) is computed in memory so a
+    read never writes. ``rebuild_edir_stats`` persists it.
+    """
+    edir = (
+        Edir.objects.select_related("stats")
+        .annotate(unpaid_fees_total=user_outstanding_subquery(user.id))
+        .get(id=edir_id)
+    )
+    try:
+        edir.stats
+    except EdirStats.DoesNotExist:
+        edir.stats = EdirStats(edir=edir, **_stats_values(edir.id, STATS_PARTS))
+    return edir
@@ -1,3 +1,1543 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from openpyxl import Workbook
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CachedJWTAuthentication, user_cache
+from .balances import get_member_balance, verify_balances
+from .catalogue import joined_edirs_cache
+from .hashers import ConfigurablePBKDF2PasswordHasher
+from .importers import import_roster, read_roster
+from .search import search_edirs
+from .stats import STATS_PARTS, _stats_values, dashboard_edir
+from .lrucache import MISSING, TTLCache
+from .permissions import get_membership, membership_cache
+from .responsecache import cache_metrics, edir_tag, invalidate_edir_responses, tag_version
+from .family import repair_active_family_counts
+from .fees import assign_fee
+from .geo import haversine_km
+from .phone import normalize_phone
+from .models import (
+    Bank, CustomUser, Edir, EdirStats, EdirUser, EdirUserAuditLog, EdirUserChangeRequest, Event, Family, Fee,
+    FeeAssignment, FeeAuditLog, MemberBalance, Transaction,
+)
+from .throttling import CacheBucketStore, MemoryBucketStore
+from .tokens import VersionedRefreshToken
+
+
+def make_user(phone_number, full_name="Member", password=None, **extra):
+    return CustomUser.objects.create_user(phone_number=phone_number, full_name=full_name, password=password, **extra)
+
+
+def add_members(edir, count, prefix="07"):
+    """Bulk-add ``count`` active members to ``edir``, every third one with a family member."""
+    users = CustomUser.objects.bulk_create([
+        # bulk_create skips the signal that maintains active_family_count
+        CustomUser(
+            phone_number=f"{prefix}{index:08d}",
+            normalized_phone=normalize_phone(f"{prefix}{index:08d}"),
+            full_name=f"Member {index:05d}",
+            active_family_count=1 if index % 3 == 0 else 0,
+        )
+        for index in range(count)
+    ])
+    EdirUser.objects.bulk_create([EdirUser(edir=edir, user=user, status="Active") for user in users])
+    Family.objects.bulk_create(
+        [Family(user=user, full_name="Child", gender="Male", relationship="Child") for user in users[::3]]
+    )
+    return users
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Runs data migrations between ``before`` and ``after`` and restores the latest schema afterwards."""
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+
+class PhoneLookupTests(TestCase):
+    def setUp(self):
+        self.first = make_user("0911223344", password="secret-pass-1")
+        # A legacy account whose number collides with the first one after
+        # normalization; the 0010 backfill leaves it NULL
+        self.second = make_user("0911000000", password="secret-pass-2")
+        CustomUser.objects.filter(pk=self.second.pk).update(phone_number="251911223344", normalized_phone=None)
+        self.second.refresh_from_db()
+
+    def test_any_spelling_finds_the_normalized_account(self):
+        for spelling in ("0911223344", "+251911223344", "911223344", "0911 22 33 44"):
+            self.assertEqual(CustomUser.objects.get_by_phone(spelling), self.first)
+
+    def test_exact_raw_number_finds_the_colliding_account(self):
+        self.assertEqual(CustomUser.objects.get_by_phone("251911223344"), self.second)
+        self.assertEqual(CustomUser.objects.get_by_natural_key("251911223344"), self.second)
+
+    def test_saving_the_colliding_account_keeps_it_unnormalized(self):
+        self.second.set_password("new-secret-pass")
+        self.second.save()
+        self.second.refresh_from_db()
+        self.assertIsNone(self.second.normalized_phone)
+        self.assertTrue(self.second.check_password("new-secret-pass"))
+
+    def test_unknown_number_raises_does_not_exist(self):
+        with self.assertRaises(CustomUser.DoesNotExist):
+            CustomUser.objects.get_by_phone("0922000000")
+
+    def test_new_user_with_a_taken_number_is_a_validation_error(self):
+        for spelling in ("+251911223344", "0911 223 344"):
+            with self.subTest(spelling=spelling), self.assertRaises(ValidationError) as raised:
+                make_user(spelling)
+            self.assertIn("phone_number", raised.exception.message_dict)
+        self.assertEqual(CustomUser.objects.count(), 2)
+
+
+class NormalizedPhoneBackfillTests(MigrationTestCase):
+    before = [("api", "0009_customuser_active_family_count")]
+    after = [("api", "0010_customuser_normalized_phone")]
+
+    def test_first_account_per_number_gets_the_normalized_value(self):
+        User = self.migrate(self.before).get_model("api", "CustomUser")
+        first = User.objects.create(phone_number="0911223344", full_name="First")
+        second = User.objects.create(phone_number="251911223344", full_name="Second")
+        foreign = User.objects.create(phone_number="+44 20 7946 0958", full_name="Foreign")
+        junk = User.objects.create(phone_number="n/a", full_name="Junk")
+
+        User = self.migrate(self.after).get_model("api", "CustomUser")
+        self.assertEqual(
+            dict(User.objects.values_list("id", "normalized_phone")),
+            {first.id: "+251911223344", second.id: None, foreign.id: "+442079460958", junk.id: None},
+        )
+
+
+class MemberBalanceTests(TestCase):
+    def setUp(self):
+        self.committee = make_user("0911000001")
+        self.member = make_user("0911000002")
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        EdirUser.objects.create(edir=self.edir, user=self.member, status="Active")
+
+    def balance(self):
+        balance = get_member_balance(self.member.id, self.edir.id)
+        return balance.outstanding, balance.pending, balance.paid
+
+    def test_income_fee_payment_moves_through_the_ledger(self):
+        fee = Fee.objects.create(edir=self.edir, name="Jan", amount=25, maker=self.committee)
+        assignment = FeeAssignment.objects.create(fee=fee, user=self.member, maker=self.committee)
+        self.assertEqual(self.balance(), (Decimal("25"), Decimal("0"), Decimal("0")))
+
+        trx = Transaction.objects.create(
+            edir=self.edir, transaction_type="PAYMENT", amount=25, maker=self.member, payment_status="PENDING"
+        )
+        assignment.transaction = trx
+        assignment.save()
+        self.assertEqual(self.balance(), (Decimal("0"), Decimal("25"), Decimal("0")))
+
+        trx.payment_status = "APPROVED"
+        trx.save()
+        self.assertEqual(self.balance(), (Decimal("0"), Decimal("0"), Decimal("25")))
+        self.assertEqual(verify_balances(), [])
+
+    def test_expense_payout_is_not_a_member_balance(self):
+        fee = Fee.objects.create(
+            edir=self.edir, name="Support", amount=500, maker=self.committee,
+            category="Funeral Contribution", supported_member=self.member, status="Pending", fee_type="Expense",
+        )
+        trx = Transaction.objects.create(
+            edir=self.edir, transaction_type="WITHDRAW", amount=500, maker=self.committee, payment_status="PENDING"
+        )
+        FeeAssignment.objects.create(fee=fee, user=self.member, maker=self.committee, transaction=trx)
+        self.assertEqual(self.balance(), (Decimal("0"), Decimal("0"), Decimal("0")))
+
+        trx.payment_status = "APPROVED"
+        trx.save()
+        self.assertEqual(self.balance(), (Decimal("0"), Decimal("0"), Decimal("0")))
+        self.assertEqual(verify_balances(), [])
+
+    def test_deleting_a_payment_reopens_its_fees(self):
+        fee = Fee.objects.create(edir=self.edir, name="Jan", amount=25, maker=self.committee)
+        trx = Transaction.objects.create(
+            edir=self.edir, transaction_type="PAYMENT", amount=25, maker=self.member, payment_status="APPROVED"
+        )
+        FeeAssignment.objects.create(fee=fee, user=self.member, maker=self.committee, transaction=trx)
+        self.assertEqual(self.balance(), (Decimal("0"), Decimal("0"), Decimal("25")))
+
+        trx.delete()
+        self.assertEqual(self.balance(), (Decimal("0"), Decimal("0"), Decimal("0")))
+        self.assertEqual(verify_balances(), [])
+
+    def delete_fee_queries(self, size):
+        members = CustomUser.objects.bulk_create(
+            [CustomUser(phone_number=f"09{size:03d}{index:05d}", full_name="Member") for index in range(size)]
+        )
+        fee = Fee.objects.create(edir=self.edir, name=f"Fee {size}", amount=10, maker=self.committee)
+        FeeAssignment.objects.bulk_create(
+            [FeeAssignment(fee=fee, user=member, maker=self.committee) for member in members]
+        )
+        MemberBalance.objects.bulk_create(
+            [MemberBalance(user=member, edir=self.edir, outstanding=10) for member in members]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            fee.delete()
+        self.assertFalse(MemberBalance.objects.filter(user__in=members).exclude(outstanding=0).exists())
+        return len(queries)
+
+    def test_deleting_a_fee_refreshes_balances_once(self):
+        self.assertEqual(self.delete_fee_queries(5), self.delete_fee_queries(50))
+
+
+class MemberRosterQueryTests(TestCase):
+    # Edir lookup, members revision (ETag) and the annotated roster
+    ROSTER_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.committee = make_user("0911000001")
+        cls.small = Edir.objects.create(name="Small", monthly_fee=10)
+        cls.large = Edir.objects.create(name="Large", monthly_fee=10)
+        add_members(cls.small, 10, prefix="07")
+        add_members(cls.large, 10000, prefix="08")
+
+    def setUp(self):
+        self.client = client_for(self.committee)
+
+    def get_roster(self, edir, **params):
+        return self.client.get(f"/api/edirs/{edir.id}/members/", params)
+
+    def test_full_roster_query_count_is_flat(self):
+        for edir, size in ((self.small, 10), (self.large, 10000)):
+            with self.subTest(size=size), self.assertNumQueries(self.ROSTER_QUERIES):
+                response = self.get_roster(edir)
+            self.assertEqual(len(response.data), size)
+
+    def test_keyset_page_query_count_is_flat(self):
+        for edir in (self.small, self.large):
+            with self.subTest(edir=edir.name), self.assertNumQueries(self.ROSTER_QUERIES):
+                response = self.get_roster(edir, page_size=5, ordering="name")
+            self.assertEqual(len(response.data["results"]), 5)
+
+    def test_roster_reports_family_counts(self):
+        response = self.get_roster(self.small, ordering="name")
+        counts = [member["number_of_family"] for member in response.data]
+        self.assertEqual(counts, [1 if index % 3 == 0 else 0 for index in range(10)])
+
+
+class MemberSearchTests(TestCase):
+    def setUp(self):
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        self.other = Edir.objects.create(name="Other", monthly_fee=10)
+        self.committee = make_user("0911000001", "Tigist Alemu")
+        self.abebe = make_user("0922334455", "Abebe Kebede")
+        self.kebede = make_user("0933445566", "Kebede Abera")
+        self.pending = make_user("0922112233", "Abel Girma")
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        EdirUser.objects.create(edir=self.edir, user=self.abebe, status="Active")
+        EdirUser.objects.create(edir=self.edir, user=self.kebede, status="Active")
+        EdirUser.objects.create(edir=self.edir, user=self.pending, status="Pending")
+        # Matches every term below, but belongs to another edir
+        self.outsider = make_user("0922000000", "Abebe Outside")
+        EdirUser.objects.create(edir=self.other, user=self.outsider, status="Active")
+
+    def search(self, term, user=None, **params):
+        client = client_for(user or self.committee)
+        return client.get(f"/api/edirs/{self.edir.id}/members/search/", {"q": term, **params})
+
+    def ids(self, term, **params):
+        response = self.search(term, **params)
+        self.assertEqual(response.status_code, 200)
+        return [member["id"] for member in response.data["results"]]
+
+    def test_name_prefix_ranks_above_later_word(self):
+        self.assertEqual(self.ids("abe"), [self.abebe.id, self.pending.id, self.kebede.id])
+        self.assertEqual(self.ids("kebede ab"), [self.kebede.id, self.abebe.id])
+
+    def test_phone_prefix_matches_any_spelling(self):
+        for term in ("0922", "922", "+251 922", "25192"):
+            with self.subTest(term=term):
+                self.assertEqual(self.ids(term), [self.abebe.id, self.pending.id])
+        self.assertEqual(self.ids("092233"), [self.abebe.id])
+
+    def test_phone_matches_rank_first(self):
+        self.abebe.full_name = "Abebe 0911"
+        self.abebe.save()
+        self.assertEqual(self.ids("0911"), [self.committee.id, self.abebe.id])
+
+    def test_results_are_scoped_to_the_edir(self):
+        self.assertNotIn(self.outsider.id, self.ids("abebe"))
+        self.assertEqual(self.ids("outside"), [])
+
+    def test_active_members_may_search_and_others_may_not(self):
+        self.assertEqual(self.search("abe", user=self.abebe).status_code, 200)
+        self.assertEqual(self.search("abe", user=self.outsider).status_code, 403)
+        self.assertEqual(self.search("abe", user=self.pending).status_code, 403)
+        self.assertEqual(self.search("").status_code, 400)
+
+    def test_results_are_paginated(self):
+        response = self.search("abe", limit=2, offset=1)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual([member["id"] for member in response.data["results"]], [self.pending.id, self.kebede.id])
+
+    def test_member_ids_are_integers(self):
+        member = self.search("abebe").data["results"][0]
+        self.assertEqual(member["id"], self.abebe.id)
+        self.assertEqual(member["full_name"], "Abebe Kebede")
+
+    def test_index_query_count_is_flat(self):
+        add_members(self.edir, 2000, prefix="07")
+        # Membership, edir, count and page
+        with self.assertNumQueries(4):
+            response = self.search("member 0199", limit=5)
+        self.assertEqual(response.data["count"], 10)
+
+
+class CreateFeeBenchmarkTests(TestCase):
+    """create_fee cost against edir size; the old per-member INSERT loop grew by one query per member."""
+
+    # Up to a couple of hundred members every bulk statement fits in one batch
+    SMALL_EDIR_QUERIES = 16
+    # At 3000 members on SQLite: 16 assignment INSERT batches and 6 balance-refresh
+    # chunks of one SELECT and four INSERT batches
+    LARGE_EDIR_QUERIES = 59
+
+    def setUp(self):
+        self.committee = make_user("0911000001")
+        self.client = client_for(self.committee)
+
+    def make_edir(self, size, prefix):
+        edir = Edir.objects.create(name=f"Edir {size}", monthly_fee=10)
+        EdirUser.objects.create(edir=edir, user=self.committee, status="Active", is_committee=True)
+        add_members(edir, size - 1, prefix=prefix)
+        return edir
+
+    def post_fee(self, edir, **data):
+        return self.client.post(
+            f"/api/fees/create/{edir.id}/",
+            {
+                "category": "Monthly Fee",
+                "name": "January",
+                "amount": "25",
+                "payment_date": "2026-11-01T00:00:00Z",
+                "assign_type": "All Members",
+                **data,
+            },
+            format="json",
+        )
+
+    def create_fee(self, edir):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_fee(edir)
+        self.assertEqual(response.status_code, 201)
+        return len(queries)
+
+    def test_small_edirs_take_a_fixed_number_of_queries(self):
+        for size, prefix in ((10, "07"), (100, "08")):
+            with self.subTest(size=size):
+                self.assertEqual(self.create_fee(self.make_edir(size, prefix)), self.SMALL_EDIR_QUERIES)
+
+    def test_large_edir_grows_by_batches_not_members(self):
+        size = 3000
+        edir = self.make_edir(size, "06")
+        # One bulk statement per batch of rows, never one per member
+        self.assertEqual(self.create_fee(edir), self.LARGE_EDIR_QUERIES)
+        self.assertEqual(FeeAssignment.objects.filter(fee__edir=edir).count(), size)
+        self.assertEqual(MemberBalance.objects.filter(edir=edir, outstanding=25).count(), size)
+
+    def test_audit_row_records_the_count_not_the_members(self):
+        edir = self.make_edir(10, "07")
+        self.create_fee(edir)
+        new_value = FeeAuditLog.objects.get(fee__edir=edir).new_value
+        self.assertEqual(new_value["assigned_member_count"], 10)
+        self.assertNotIn("assigned_members", new_value)
+
+    def test_non_integer_user_ids_are_rejected(self):
+        edir = self.make_edir(10, "07")
+        for users in (["abc"], [None], "12"):
+            with self.subTest(users=users):
+                response = self.post_fee(edir, assign_type="Custom Users", users=users)
+                self.assertEqual(response.status_code, 400)
+        response = self.post_fee(edir, category="Funeral Contribution", supportedMember="abc")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Fee.objects.filter(edir=edir).exists())
+
+
+class TTLCacheTests(TestCase):
+    def test_entries_expire_after_the_ttl(self):
+        cache = TTLCache(ttl=60)
+        with mock.patch("api.lrucache.time.monotonic", return_value=1000):
+            cache.set("key", "value")
+        with mock.patch("api.lrucache.time.monotonic", return_value=1059):
+            self.assertEqual(cache.get("key"), "value")
+        with mock.patch("api.lrucache.time.monotonic", return_value=1060):
+            self.assertIs(cache.get("key"), MISSING)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = make_user("0911000001", password="secret-pass-1")
+        self.authentication = CachedJWTAuthentication()
+        self.token = VersionedRefreshToken.for_user(self.user).access_token
+
+    def authenticate(self):
+        request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        return self.authentication.authenticate(request)[0]
+
+    def test_cache_hits_skip_the_user_query(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_each_request_gets_its_own_copy(self):
+        first = self.authenticate()
+        first.full_name = "Changed by a view"
+        self.assertEqual(self.authenticate().full_name, "Member")
+
+    def test_expired_entries_are_reloaded(self):
+        with mock.patch("api.lrucache.time.monotonic", return_value=1000):
+            self.authenticate()
+        with mock.patch("api.lrucache.time.monotonic", return_value=1000 + user_cache.ttl), \
+                self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_saving_the_user_invalidates_the_entry(self):
+        self.authenticate()
+        self.user.full_name = "Renamed"
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.authenticate().full_name, "Renamed")
+
+    def test_password_change_revokes_cached_tokens(self):
+        self.authenticate()
+        self.user.set_password("secret-pass-2")
+        self.user.revoke_tokens()
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_benchmark_command_compares_both_modes(self):
+        output = io.StringIO()
+        call_command("benchmark_auth", requests=20, stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual([line.split(":")[0] for line in lines], ["without cache", "with cache"])
+        # The user load is the only query /auth/users/me/ makes
+        self.assertTrue(lines[0].endswith("| 1.0 queries/request"))
+        self.assertTrue(lines[1].endswith("| 0.0 queries/request"))
+        self.assertFalse(CustomUser.objects.filter(phone_number="benchmark").exists())
+
+
+class PasswordHashingTests(TestCase):
+    ITERATIONS = 1000
+
+    def setUp(self):
+        # A cheap work factor keeps the suite fast; the pool is what is under test
+        patchers = [
+            mock.patch.object(ConfigurablePBKDF2PasswordHasher, "iterations", self.ITERATIONS),
+            mock.patch("api.throttling._store", MemoryBucketStore()),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def registration(self, index):
+        return {"full_name": f"Member {index}", "phone_number": f"09110000{index:02d}", "password": "secret-pass-1"}
+
+    def assert_usable_hash(self, phone_number):
+        user = CustomUser.objects.get_by_phone(phone_number)
+        self.assertTrue(user.password.startswith(f"pbkdf2_sha256${self.ITERATIONS}$"))
+        self.assertTrue(check_password("secret-pass-1", user.password))
+
+    def test_registration_stores_a_hash_that_logs_in(self):
+        data = self.registration(1)
+        response = APIClient().post("/api/user/register/", data, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assert_usable_hash(data["phone_number"])
+
+        response = APIClient().post(
+            "/auth/jwt/create/", {"phone_number": data["phone_number"], "password": data["password"]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access", response.data)
+
+    async def test_concurrent_registrations_share_the_bounded_pool(self):
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def tracked_make_password(raw_password):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            try:
+                time.sleep(0.05)
+                return make_password(raw_password)
+            finally:
+                with lock:
+                    running -= 1
+
+        client = AsyncClient()
+        count = 8
+        with mock.patch("api.hashers.make_password", tracked_make_password):
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.post("/api/async/user/register/", self.registration(index), content_type="application/json")
+                for index in range(count)
+            ])
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual([response.status_code for response in responses], [200] * count)
+        # Hashes overlap up to the pool size, never beyond it
+        self.assertEqual(peak, min(settings.PASSWORD_HASH_WORKERS, count))
+        self.assertLess(elapsed, count * 0.05)
+        phone_numbers = [self.registration(index)["phone_number"] for index in range(count)]
+        for phone_number in phone_numbers:
+            user = await CustomUser.objects.aget(phone_number=phone_number)
+            self.assertTrue(check_password("secret-pass-1", user.password))
+
+
+class PopularEdirCatalogueTests(TestCase):
+    EDIR_COUNT = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("0911000001")
+        Edir.objects.bulk_create([
+            Edir(name=f"Edir {index:05d}", monthly_fee=10, is_popular=index % 2 == 0)
+            for index in range(cls.EDIR_COUNT)
+        ])
+        cls.popular_ids = list(Edir.objects.filter(is_popular=True).order_by("id").values_list("id", flat=True))
+        EdirUser.objects.create(edir_id=cls.popular_ids[0], user=cls.user, status="Active")
+        EdirUser.objects.create(edir_id=cls.popular_ids[1], user=cls.user, status="Pending")
+
+    def setUp(self):
+        # bulk_create skips the signal that moves the catalogue version
+        cache.clear()
+        joined_edirs_cache.clear()
+        self.client = client_for(CustomUser.objects.get(pk=self.user.pk))
+
+    def get_popular(self, **params):
+        return self.client.get("/api/popular_edirs/", params)
+
+    def test_cold_and_warm_query_counts_at_10k_edirs(self):
+        # The catalogue and the user's memberships
+        with self.assertNumQueries(2):
+            response = self.get_popular()
+        self.assertEqual(len(response.data), len(self.popular_ids) - 2)
+
+        started = time.perf_counter()
+        with self.assertNumQueries(0):
+            response = self.get_popular()
+        self.assertLess(time.perf_counter() - started, 2)
+        self.assertEqual(len(response.data), len(self.popular_ids) - 2)
+
+    def test_active_and_pending_memberships_are_excluded(self):
+        ids = {edir["id"] for edir in self.get_popular().data}
+        self.assertNotIn(self.popular_ids[0], ids)
+        self.assertNotIn(self.popular_ids[1], ids)
+        self.assertIn(self.popular_ids[2], ids)
+
+    def test_edir_changes_rebuild_the_catalogue(self):
+        self.get_popular()
+        edir = Edir.objects.get(pk=self.popular_ids[2])
+        edir.is_popular = False
+        edir.save()
+        with self.assertNumQueries(1):
+            ids = {item["id"] for item in self.get_popular().data}
+        self.assertNotIn(edir.id, ids)
+
+    def test_pages_are_sliced_from_the_cached_list(self):
+        response = self.get_popular(limit=20, offset=40)
+        self.assertEqual(response.data["count"], len(self.popular_ids) - 2)
+        self.assertEqual([edir["id"] for edir in response.data["results"]], self.popular_ids[42:62])
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        membership_cache.clear()
+        self.user = make_user("0911000001", is_staff=True)
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        EdirUser.objects.create(edir=self.edir, user=self.user, status="Active", is_committee=True)
+        self.client = client_for(self.user)
+
+    def dashboard(self):
+        response = self.client.get(f"/api/edir/{self.edir.id}/")
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_tag_bump_invalidates_the_cached_response(self):
+        self.assertEqual(self.dashboard()["X-Cache"], "MISS")
+        self.assertEqual(self.dashboard()["X-Cache"], "HIT")
+
+        version = tag_version(edir_tag(self.edir.id))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            invalidate_edir_responses(self.edir.id)
+        # Bumped now and again once the transaction commits
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(tag_version(edir_tag(self.edir.id)), version + 2)
+        self.assertEqual(self.dashboard()["X-Cache"], "MISS")
+
+    def test_writes_to_the_edir_invalidate_it(self):
+        self.dashboard()
+        Edir.objects.filter(pk=self.edir.pk).update(name="Renamed")
+        self.assertEqual(self.dashboard().data["name"], "Edir")
+        self.edir.name = "Renamed"
+        self.edir.save()
+        response = self.dashboard()
+        self.assertEqual((response["X-Cache"], response.data["name"]), ("MISS", "Renamed"))
+
+    def test_hits_and_misses_are_recorded(self):
+        for _ in range(3):
+            self.dashboard()
+        self.assertEqual(cache_metrics()["dashboard"], {"hits": 2, "misses": 1, "hit_ratio": 0.6667})
+
+        response = self.client.get("/api/cache/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["dashboard"]["misses"], 1)
+        self.assertEqual(response.data["edir_details"], {"hits": 0, "misses": 0, "hit_ratio": None})
+
+
+class RosterImportTests(TestCase):
+    ROWS = [
+        ["Full Name", "Phone", "Committee"],
+        ["Abebe Kebede", 911223344, "yes"],
+        ["Almaz Tesfaye", "0922334455", ""],
+    ]
+
+    def setUp(self):
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+
+    def xlsx(self):
+        workbook = Workbook()
+        for row in self.ROWS:
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        content.seek(0)
+        return content
+
+    def csv(self):
+        return io.BytesIO("\n".join(",".join(str(value) for value in row) for row in self.ROWS).encode())
+
+    def test_csv_and_xlsx_read_the_same_rows(self):
+        from_csv = read_roster(self.csv(), "roster.csv")
+        from_xlsx = read_roster(self.xlsx(), "roster.xlsx")
+        self.assertEqual(from_csv, from_xlsx)
+        self.assertEqual(from_xlsx[0], {"full_name": "Abebe Kebede", "phone_number": "911223344", "is_committee": "yes"})
+
+    def test_xlsx_roster_creates_members(self):
+        report = import_roster(self.edir, read_roster(self.xlsx(), "roster.xlsx"))
+        self.assertEqual(report["created"], 2)
+        self.assertTrue(
+            EdirUser.objects.filter(edir=self.edir, user__normalized_phone="+251911223344", is_committee=True).exists()
+        )
+
+
+class CheckPhonesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.caller = make_user("0911000001", password="secret-pass-1")
+        make_user("0911223344", password="secret-pass-2")
+        make_user("0933445566")
+        # Collides with 0911223344 after normalization; see PhoneLookupTests
+        legacy = make_user("0911000002")
+        CustomUser.objects.filter(pk=legacy.pk).update(phone_number="251911223344", normalized_phone=None, password="!")
+
+    def check(self, phone_numbers):
+        response = client_for(self.caller).post("/api/check_phones/", {"phone_numbers": phone_numbers}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_reports_existence_and_password_without_user_ids(self):
+        data = self.check(["+251 911 223 344", "0933445566", "0944000000", "251911223344", "not a number"])
+        self.assertEqual(data["invalid"], ["not a number"])
+        self.assertEqual(
+            [(item["phone_number"], item["exists"], item["has_password"]) for item in data["results"]],
+            [
+                ("+251 911 223 344", True, True),
+                ("0933445566", True, False),
+                ("0944000000", False, False),
+                # The raw number of the colliding account, which has no password
+                ("251911223344", True, False),
+            ],
+        )
+        for item in data["results"]:
+            self.assertNotIn("user_id", item)
+
+
+class EdirSearchTests(TestCase):
+    def setUp(self):
+        self.by_name = Edir.objects.create(name="Bole Mutual Aid", monthly_fee=10, description="Neighbours")
+        self.by_address = Edir.objects.create(name="Unity", monthly_fee=10, address="Bole subcity")
+        self.by_description = Edir.objects.create(name="Hope", monthly_fee=10, description="Serving bole families")
+        self.inactive = Edir.objects.create(name="Bole Elders", monthly_fee=10, status="Not Active")
+        Edir.objects.create(name="Kirkos Friends", monthly_fee=10)
+
+    def search(self, term, queryset=None):
+        return list(search_edirs(queryset or Edir.objects.all(), term))
+
+    def test_name_matches_rank_above_address_and_description(self):
+        results = self.search("bole", Edir.objects.filter(status="Active"))
+        self.assertEqual(results, [self.by_name, self.by_address, self.by_description])
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.assertEqual(self.search("mutual a"), [self.by_name])
+        self.assertEqual(self.search("kirk"), [Edir.objects.get(name="Kirkos Friends")])
+
+    def test_search_syntax_in_input_is_matched_literally(self):
+        self.assertEqual(self.search('" OR * NEAR('), [])
+        self.assertEqual(self.search(""), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.by_name.name = "Zebra Circle"
+        self.by_name.save()
+        self.assertEqual(self.search("zebra"), [self.by_name])
+        self.by_name.delete()
+        self.assertEqual(self.search("zebra"), [])
+
+    def test_list_endpoint_combines_search_status_and_paging(self):
+        client = client_for(make_user("0911000001"))
+        response = client.get("/api/edir/list/", {"q": "bole", "status": "Active", "limit": 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual([edir["id"] for edir in response.data["results"]], [self.by_name.id, self.by_address.id])
+
+
+class EdirStatsBackfillTests(MigrationTestCase):
+    before = [("api", "0014_edir_coordinates")]
+    after = [("api", "0015_edirstats")]
+
+    def test_existing_edirs_get_their_stats_rows(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model("api", "CustomUser")
+        Edir = apps.get_model("api", "Edir")
+        EdirUser = apps.get_model("api", "EdirUser")
+        Transaction = apps.get_model("api", "Transaction")
+
+        chair = User.objects.create(phone_number="0911000001", full_name="Chair", active_family_count=2)
+        member = User.objects.create(phone_number="0911000002", full_name="Member")
+        busy = Edir.objects.create(name="Busy", monthly_fee=10)
+        quiet = Edir.objects.create(name="Quiet", monthly_fee=10)
+        EdirUser.objects.create(edir=busy, user=chair, status="Active", is_committee=True)
+        EdirUser.objects.create(edir=busy, user=member, status="Pending")
+        Transaction.objects.create(
+            edir=busy, transaction_type="PAYMENT", amount=40, maker=member, payment_status="APPROVED", reference="T1"
+        )
+        Transaction.objects.create(
+            edir=busy, transaction_type="PAYMENT", amount=15, maker=member, payment_status="PENDING", reference="T2"
+        )
+
+        self.migrate(self.after)
+
+        for edir_id in (busy.id, quiet.id):
+            stats = EdirStats.objects.filter(edir_id=edir_id).values(*_stats_values(edir_id, STATS_PARTS)).get()
+            self.assertEqual(stats, _stats_values(edir_id, STATS_PARTS))
+        busy_stats = EdirStats.objects.get(edir_id=busy.id)
+        self.assertEqual((busy_stats.active_member_count, busy_stats.pending_join_requests), (1, 1))
+        self.assertEqual(busy_stats.committee_members[0]["number_of_family"], 2)
+
+
+class DashboardStatsTests(TestCase):
+    def test_dashboard_read_does_not_create_a_missing_stats_row(self):
+        user = make_user("0911000001")
+        edir = Edir.objects.bulk_create([Edir(name="Bulk", monthly_fee=10)])[0]
+        EdirUser.objects.create(edir=edir, user=user, status="Active", is_committee=True)
+        EdirStats.objects.filter(edir=edir).delete()
+
+        dashboard = dashboard_edir(edir.id, user)
+        self.assertEqual(dashboard.stats.active_member_count, 1)
+        self.assertFalse(EdirStats.objects.filter(edir=edir).exists())
+
+
+class EdirStatsDeltaTests(TestCase):
+    # The membership row, the revision, the users' membership_version and one F() update of the stats
+    STATUS_CHANGE_QUERIES = 4
+
+    def setUp(self):
+        membership_cache.clear()
+        self.committee = make_user("0911000001", "Chair")
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        self.chair_link = EdirUser.objects.create(
+            edir=self.edir, user=self.committee, status="Active", is_committee=True
+        )
+        self.applicant = make_user("0922000001")
+        EdirUser.objects.create(edir=self.edir, user=self.applicant, status="Pending")
+
+    def assertStatsCurrent(self):
+        stats = EdirStats.objects.filter(edir=self.edir).values(*_stats_values(self.edir.id, STATS_PARTS)).get()
+        self.assertEqual(stats, _stats_values(self.edir.id, STATS_PARTS))
+
+    def test_status_change_is_a_fixed_number_of_queries(self):
+        link = EdirUser.objects.get(edir=self.edir, user=self.applicant)
+        link.status = "Active"
+        with self.assertNumQueries(self.STATUS_CHANGE_QUERIES):
+            link.save()
+        stats = EdirStats.objects.get(edir=self.edir)
+        self.assertEqual((stats.active_member_count, stats.pending_join_requests), (2, 0))
+        self.assertStatsCurrent()
+
+    def test_committee_changes_refresh_the_roster(self):
+        self.chair_link.status = "Not Active"
+        self.chair_link.save()
+        self.assertEqual(EdirStats.objects.get(edir=self.edir).committee_members, [])
+        self.chair_link.delete()
+        EdirUser.objects.get(edir=self.edir, user=self.applicant).delete()
+        self.assertStatsCurrent()
+
+    def test_saving_a_deferred_row_applies_the_right_delta(self):
+        link = EdirUser.objects.only("id").get(edir=self.edir, user=self.applicant)
+        link.status = "Active"
+        link.save()
+        self.assertStatsCurrent()
+
+    def test_batch_transitions_keep_the_stats_current(self):
+        members = add_members(self.edir, 3)
+        EdirStats.objects.filter(edir=self.edir).update(active_member_count=4)
+        response = client_for(self.committee).post(
+            f"/api/edirs/{self.edir.id}/members/status/",
+            {"status": "Blocked", "user_ids": [members[0].id, members[1].id, self.committee.id]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(EdirStats.objects.get(edir=self.edir).committee_members, [])
+        self.assertStatsCurrent()
+
+
+class RevisionETagTests(TestCase):
+    def setUp(self):
+        self.committee = make_user("0911000001")
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        self.client = client_for(self.committee)
+        self.members_url = f"/api/edirs/{self.edir.id}/members/"
+
+    def etag(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_matching_etag_gets_304_before_the_list_query(self):
+        etag = self.etag(self.members_url)
+        # Only the revision lookup runs
+        with self.assertNumQueries(1):
+            response = self.client.get(self.members_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_membership_change_moves_the_etag(self):
+        etag = self.etag(self.members_url)
+        EdirUser.objects.create(edir=self.edir, user=make_user("0911000002"), status="Active")
+        response = self.client.get(self.members_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.data), 2)
+
+    def test_query_string_is_part_of_the_etag(self):
+        self.assertNotEqual(self.etag(self.members_url), self.etag(self.members_url, ordering="-name"))
+
+    def test_resources_are_versioned_separately(self):
+        fees_url = f"/api/fees/{self.edir.id}/"
+        members_etag = self.etag(self.members_url)
+        fees_etag = self.etag(fees_url)
+
+        fee = Fee.objects.create(edir=self.edir, name="Jan", amount=25, maker=self.committee)
+        # The bulk assignment path skips post_save and bumps the revision itself
+        assign_fee(fee, [self.committee.id], maker=self.committee)
+
+        self.assertNotEqual(self.etag(fees_url), fees_etag)
+        response = self.client.get(self.members_url, HTTP_IF_NONE_MATCH=members_etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class BatchMemberStatusTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.committee = make_user("0911000001")
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        self.active = make_user("0911000002")
+        self.inactive = make_user("0911000003")
+        self.blocked = make_user("0911000004")
+        EdirUser.objects.create(edir=self.edir, user=self.active, status="Active")
+        EdirUser.objects.create(edir=self.edir, user=self.inactive, status="Not Active")
+        EdirUser.objects.create(edir=self.edir, user=self.blocked, status="Blocked")
+
+    def post(self, data, user=None):
+        return client_for(user or self.committee).post(
+            f"/api/edirs/{self.edir.id}/members/status/", data, format="json"
+        )
+
+    def test_each_id_gets_its_outcome(self):
+        unknown = self.blocked.id + 100
+        response = self.post({
+            "status": "Blocked",
+            "user_ids": [self.active.id, self.inactive.id, self.blocked.id, unknown, self.active.id],
+            "comment": "Annual review",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(
+            {item["user_id"]: (item["outcome"], item["previous_status"]) for item in response.data["results"]},
+            {
+                self.active.id: ("updated", "Active"),
+                self.inactive.id: ("updated", "Not Active"),
+                self.blocked.id: ("unchanged", "Blocked"),
+                unknown: ("not_member", None),
+            },
+        )
+        self.assertEqual(
+            EdirUser.objects.filter(edir=self.edir, status="Blocked").count(), 3
+        )
+        logs = EdirUserAuditLog.objects.filter(edir=self.edir, new_status="Blocked")
+        self.assertEqual(
+            sorted(logs.values_list("user_id", "previous_status")),
+            sorted([(self.active.id, "Active"), (self.inactive.id, "Not Active")]),
+        )
+
+    def test_one_update_per_previous_status(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.post({"status": "Rejected", "user_ids": [self.active.id, self.inactive.id, self.blocked.id]})
+        updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "api_ediruser"')]
+        self.assertEqual(len(updates), 3)
+
+    def test_concurrent_change_is_reported_as_a_conflict(self):
+        real_values_list = QuerySet.values_list
+
+        def stale_read(queryset, *fields, **kwargs):
+            rows = real_values_list(queryset, *fields, **kwargs)
+            if fields != ("user_id", "status"):
+                return rows
+            rows = list(rows)
+            # Another request deactivates the member after the read
+            EdirUser.objects.filter(user=self.active).update(status="Not Active")
+            return rows
+
+        with mock.patch.object(QuerySet, "values_list", stale_read):
+            response = self.post({"status": "Blocked", "user_ids": [self.active.id]})
+        self.assertEqual(response.data["results"][0]["outcome"], "conflict")
+        self.assertEqual(EdirUser.objects.get(user=self.active).status, "Not Active")
+        self.assertFalse(EdirUserAuditLog.objects.exists())
+
+    def test_invalid_requests_are_rejected(self):
+        self.assertEqual(self.post({"status": "Gone", "user_ids": [self.active.id]}).status_code, 400)
+        self.assertEqual(self.post({"status": "Blocked", "user_ids": []}).status_code, 400)
+        self.assertEqual(self.post({"status": "Blocked", "user_ids": ["x"]}).status_code, 400)
+        self.assertEqual(self.post({"status": "Blocked", "user_ids": [self.active.id]}, user=self.active).status_code, 403)
+
+
+class JoinRequestQueueTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.committee = make_user("0911000001")
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        self.requests = [make_user(f"092200000{index}", f"Applicant {index}") for index in range(3)]
+        for user in self.requests:
+            EdirUser.objects.create(edir=self.edir, user=user, status="Pending")
+        self.client = client_for(self.committee)
+
+    def decide(self, decision, user_ids):
+        response = self.client.post(
+            f"/api/edirs/{self.edir.id}/requests/decide/", {"decision": decision, "user_ids": user_ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_queue_pages_oldest_first_with_one_query_per_page(self):
+        url = f"/api/edirs/{self.edir.id}/requests/"
+        self.client.get(url)
+        # The committee check is cached after the first request
+        with self.assertNumQueries(1):
+            first = self.client.get(url, {"page_size": 2}).data
+        self.assertEqual([item["user_id"] for item in first["results"]], [user.id for user in self.requests[:2]])
+        with self.assertNumQueries(1):
+            second = self.client.get(first["next"]).data
+        self.assertEqual([item["user_id"] for item in second["results"]], [self.requests[2].id])
+        self.assertIsNone(second["next"])
+
+    def test_approve_moves_pending_rows_and_reports_counts(self):
+        unknown = self.requests[-1].id + 100
+        data = self.decide("approve", [self.requests[0].id, self.requests[1].id, self.committee.id, unknown])
+        self.assertEqual(data["decided"], 2)
+        self.assertEqual(data["counts"], {"pending": 1, "active": 3, "rejected": 0})
+        self.assertEqual(
+            {item["user_id"]: item["outcome"] for item in data["results"]},
+            {
+                self.requests[0].id: "updated",
+                self.requests[1].id: "updated",
+                self.committee.id: "unchanged",
+                unknown: "not_member",
+            },
+        )
+        approved = EdirUser.objects.get(edir=self.edir, user=self.requests[0])
+        self.assertEqual(approved.status, "Active")
+        self.assertIsNotNone(approved.joined_date)
+        self.assertEqual(
+            EdirUserChangeRequest.objects.filter(edir=self.edir, status="APPROVED", action="JOIN_REQUEST").count(), 2
+        )
+
+    def test_reject_skips_members_that_are_no_longer_pending(self):
+        self.decide("approve", [self.requests[0].id])
+        data = self.decide("reject", [self.requests[0].id, self.requests[2].id])
+        self.assertEqual(
+            {item["user_id"]: item["outcome"] for item in data["results"]},
+            {self.requests[0].id: "skipped", self.requests[2].id: "updated"},
+        )
+        self.assertEqual(data["counts"], {"pending": 1, "active": 2, "rejected": 1})
+        self.assertEqual(EdirUserChangeRequest.objects.filter(edir=self.edir, status="REJECTED").count(), 1)
+
+
+class ActiveFamilyCountTests(TestCase):
+    def setUp(self):
+        self.user = make_user("0911000001")
+        self.client = client_for(self.user)
+
+    def stored_count(self):
+        return CustomUser.objects.values_list("active_family_count", flat=True).get(pk=self.user.pk)
+
+    def add_family(self, full_name):
+        response = self.client.post(
+            f"/api/admin-add-family/{self.user.id}/",
+            {"full_name": full_name, "gender": "Female", "relationship": "Child"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        return Family.objects.get(user=self.user, full_name=full_name)
+
+    def test_create_deactivate_and_delete_maintain_the_counter(self):
+        first = self.add_family("Hanna")
+        second = self.add_family("Dawit")
+        self.assertEqual(self.stored_count(), 2)
+
+        response = self.client.patch(f"/api/family/{first.id}/deactivate/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_count(), 1)
+
+        response = self.client.delete(f"/api/family/{second.id}/delete/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.stored_count(), 0)
+
+        # Deleting the deactivated row leaves the count where it is
+        self.client.delete(f"/api/family/{first.id}/delete/")
+        self.assertEqual(self.stored_count(), 0)
+
+    def test_serializers_read_the_stored_count(self):
+        self.add_family("Hanna")
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/user/{self.user.id}/")
+        self.assertEqual(response.data["number_of_family"], 1)
+
+    def test_repair_fixes_drifted_counts_in_batches(self):
+        other = make_user("0911000002")
+        Family.objects.bulk_create([
+            Family(user=self.user, full_name="Hanna", gender="Female", relationship="Child"),
+            Family(user=self.user, full_name="Dawit", gender="Male", relationship="Child", status="Not Active"),
+            Family(user=other, full_name="Sara", gender="Female", relationship="Partner"),
+        ])
+        # bulk_create skips the signal, so both counters are stale; a third user is already right
+        make_user("0911000003")
+        self.assertEqual(repair_active_family_counts(batch_size=2), 2)
+        self.assertEqual(self.stored_count(), 1)
+        self.assertEqual(CustomUser.objects.get(pk=other.pk).active_family_count, 1)
+        self.assertEqual(repair_active_family_counts(), 0)
+
+
+class EdirMembershipPermissionTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        self.committee = make_user("0911000001")
+        self.member = make_user("0911000002")
+        self.outsider = make_user("0911000003")
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        self.membership = EdirUser.objects.create(edir=self.edir, user=self.member, status="Active")
+
+    def test_memberships_and_misses_are_cached(self):
+        for user, expected in ((self.member, ("Active", False)), (self.outsider, (None, False))):
+            with self.subTest(user=user.phone_number):
+                with self.assertNumQueries(1):
+                    self.assertEqual(tuple(get_membership(user.id, self.edir.id)), expected)
+                with self.assertNumQueries(0):
+                    self.assertEqual(tuple(get_membership(user.id, self.edir.id)), expected)
+
+    def test_edir_user_changes_invalidate_the_entry(self):
+        get_membership(self.member.id, self.edir.id)
+        self.membership.is_committee = True
+        self.membership.save()
+        self.assertTrue(get_membership(self.member.id, self.edir.id).is_committee)
+
+        self.membership.delete()
+        self.assertIsNone(get_membership(self.member.id, self.edir.id).status)
+
+    def test_committee_endpoints_check_the_role(self):
+        url = f"/api/edirs/{self.edir.id}/requests/"
+        self.assertEqual(client_for(self.committee).get(url).status_code, 200)
+        self.assertEqual(client_for(self.member).get(url).status_code, 403)
+        self.assertEqual(client_for(self.outsider).get(url).status_code, 403)
+        staff = make_user("0911000004", is_staff=True)
+        self.assertEqual(client_for(staff).get(url).status_code, 200)
+
+    def test_cached_permission_check_costs_no_query(self):
+        client = client_for(self.member)
+        url = f"/api/edirs/{self.edir.id}/members/search/"
+        client.get(url, {"q": "member"})
+        # Edir, count and page; the membership comes from the cache
+        with self.assertNumQueries(3):
+            self.assertEqual(client.get(url, {"q": "member"}).status_code, 200)
+
+    def test_check_user_in_edir_uses_the_cache(self):
+        client = client_for(self.committee)
+        url = f"/api/check-user-in-edir/{self.edir.id}/{self.member.phone_number}/"
+        self.assertEqual(client.post(url).data, {"exists": True})
+        # Only the phone lookup runs on a warm cache
+        with self.assertNumQueries(1):
+            self.assertEqual(client.post(url).data, {"exists": True})
+        response = client.post(f"/api/check-user-in-edir/{self.edir.id + 1}/{self.member.phone_number}/")
+        self.assertEqual(response.status_code, 404)
+
+
+class MemberProfileTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.committee = make_user("0911000001")
+        self.member = make_user("0911000002", "Abebe Kebede")
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        EdirUser.objects.create(edir=self.edir, user=self.member, status="Active")
+        Family.objects.create(user=self.member, full_name="Hanna", gender="Female", relationship="Child")
+        Family.objects.create(
+            user=self.member, full_name="Dawit", gender="Male", relationship="Child", status="Not Active"
+        )
+        fee = Fee.objects.create(edir=self.edir, name="Jan", amount=25, maker=self.committee)
+        assign_fee(fee, [self.member.id], maker=self.committee)
+        self.client = client_for(self.committee)
+        self.url = f"/api/user/{self.member.id}/{self.edir.id}/"
+
+    def test_profile_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["membership_status"], "Edir Member")
+        self.assertEqual(response.data["user_status"], "Active")
+        self.assertFalse(response.data["is_committee"])
+        self.assertEqual(response.data["number_of_family"], 1)
+        self.assertNotIn("family", response.data)
+
+    def test_include_family_and_balance_adds_only_the_family_prefetch(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {"include": "family,balance"})
+        self.assertEqual([member["full_name"] for member in response.data["family"]], ["Hanna"])
+        self.assertEqual(response.data["outstanding_balance"], "25.00")
+
+    def test_non_members_and_missing_edirs(self):
+        outsider = make_user("0911000003")
+        response = self.client.get(f"/api/user/{outsider.id}/{self.edir.id}/")
+        self.assertEqual(response.data["membership_status"], "Not a Member")
+        self.assertEqual(self.client.get(f"/api/user/{self.member.id}/{self.edir.id + 1}/").status_code, 404)
+        self.assertEqual(self.client.get(f"/api/user/{outsider.id + 1}/").status_code, 404)
+
+    def test_patch_updates_the_committee_flag(self):
+        response = self.client.patch(self.url, {"is_Committee": True}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_committee"])
+        self.assertTrue(EdirUser.objects.get(edir=self.edir, user=self.member).is_committee)
+        self.assertTrue(get_membership(self.member.id, self.edir.id).is_committee)
+
+
+@override_settings(TOKEN_BUCKET_THROTTLES={
+    "phone_check": {
+        "ip": {"capacity": 4, "refill_per_minute": 1},
+        "phone": {"capacity": 2, "refill_per_minute": 1},
+    },
+    "password": {
+        "ip": {"capacity": 4, "refill_per_minute": 1},
+        "phone": {"capacity": 2, "refill_per_minute": 1},
+    },
+})
+class TokenBucketThrottleTests(TestCase):
+    def setUp(self):
+        # Buckets shared through the LocMem cache, as with TOKEN_BUCKET_STORE = "cache"
+        cache.clear()
+        patcher = mock.patch("api.throttling._store", CacheBucketStore("default"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def check_phone(self, phone_number):
+        return self.client.get(f"/api/check_user_phone/{phone_number}/")
+
+    def assert_throttled(self, response):
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+
+    def test_phone_bucket_rejects_before_any_query(self):
+        for spelling in ("0911223344", "+251911223344"):
+            self.assertEqual(self.check_phone(spelling).status_code, 200)
+        # Both spellings drew from the same number's bucket
+        with self.assertNumQueries(0):
+            response = self.check_phone("911223344")
+        self.assert_throttled(response)
+        self.assertEqual(self.check_phone("0922334455").status_code, 200)
+
+    def test_ip_bucket_spans_numbers_and_endpoints(self):
+        for index in range(4):
+            self.assertEqual(self.check_phone(f"09110000{index:02d}").status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.check_phone("0911000099")
+        self.assert_throttled(response)
+        other_ip = APIClient(REMOTE_ADDR="10.0.0.2")
+        self.assertEqual(other_ip.get("/api/check_user_phone/0911000099/").status_code, 200)
+
+    def test_password_endpoints_share_their_bucket(self):
+        data = {"phone_number": "0911223344", "password": "secret-pass-1"}
+        for _ in range(2):
+            self.assertNotEqual(self.client.post("/api/set_new_password/", data, format="json").status_code, 429)
+        # The async views check the same buckets
+        with self.assertNumQueries(0):
+            response = self.client.post("/api/async/set_new_password/", data, format="json")
+        self.assert_throttled(response)
+
+    def test_bucket_refills_over_time(self):
+        store = MemoryBucketStore()
+        with mock.patch("api.throttling.time.time", return_value=1000):
+            self.assertEqual([store.consume("key", 2, 1 / 60)[0] for _ in range(3)], [True, True, False])
+        with mock.patch("api.throttling.time.time", return_value=1060):
+            self.assertEqual([store.consume("key", 2, 1 / 60)[0] for _ in range(2)], [True, False])
+
+
+class RoleClaimTokenTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        user_cache.clear()
+        patchers = [
+            mock.patch.object(ConfigurablePBKDF2PasswordHasher, "iterations", PasswordHashingTests.ITERATIONS),
+            mock.patch("api.throttling._store", MemoryBucketStore()),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = make_user("0911000001", password="secret-pass-1")
+        self.chaired = Edir.objects.create(name="Chaired", monthly_fee=10)
+        self.joined = Edir.objects.create(name="Joined", monthly_fee=10)
+        self.requested = Edir.objects.create(name="Requested", monthly_fee=10)
+        EdirUser.objects.create(edir=self.chaired, user=self.user, status="Active", is_committee=True)
+        self.membership = EdirUser.objects.create(edir=self.joined, user=self.user, status="Active")
+        EdirUser.objects.create(edir=self.requested, user=self.user, status="Pending")
+        # Each membership bumped membership_version in the database
+        self.user.refresh_from_db()
+        self.credentials = {"phone_number": "0911000001", "password": "secret-pass-1"}
+
+    def bearer(self, access):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return client
+
+    def assert_claims(self, access, edirs):
+        token = AccessToken(access)
+        self.assertEqual(token["edirs"], edirs)
+        self.assertEqual(token["mv"], CustomUser.objects.get(pk=self.user.pk).membership_version)
+
+    def test_login_tokens_carry_active_roles(self):
+        response = APIClient().post("/auth/jwt/create/", self.credentials, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assert_claims(response.data["access"], {str(self.chaired.id): 1, str(self.joined.id): 0})
+
+    def test_async_login_tokens_carry_the_same_claims(self):
+        response = self.client.post("/api/async/auth/jwt/create/", self.credentials, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assert_claims(response.json()["access"], {str(self.chaired.id): 1, str(self.joined.id): 0})
+
+    def test_permissions_read_the_claim_without_a_query(self):
+        client = self.bearer(VersionedRefreshToken.for_user(self.user).access_token)
+        client.get(f"/api/edirs/{self.chaired.id}/requests/")
+        # The authenticated user is cached; only the queue page is read
+        with self.assertNumQueries(1):
+            self.assertEqual(client.get(f"/api/edirs/{self.chaired.id}/requests/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(f"/api/edirs/{self.joined.id}/requests/").status_code, 403)
+
+    def test_membership_change_forces_a_refresh(self):
+        refresh = VersionedRefreshToken.for_user(self.user)
+        client = self.bearer(refresh.access_token)
+        self.assertEqual(client.get(f"/api/edirs/{self.joined.id}/requests/").status_code, 403)
+        self.membership.is_committee = True
+        self.membership.save()
+
+        response = client.get(f"/api/edirs/{self.joined.id}/requests/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["detail"].code, "membership_changed")
+
+        response = APIClient().post("/auth/jwt/refresh/", {"refresh": str(refresh)}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assert_claims(response.data["access"], {str(self.chaired.id): 1, str(self.joined.id): 1})
+        self.assertEqual(self.bearer(response.data["access"]).get(f"/api/edirs/{self.joined.id}/requests/").status_code, 200)
+
+
+class NearbyEdirTests(TestCase):
+    # Around Meskel Square, Addis Ababa
+    CENTRE = (9.0108, 38.7613)
+
+    def setUp(self):
+        self.piassa = Edir.objects.create(name="Piassa", monthly_fee=10, latitude=9.0333, longitude=38.7500)
+        self.bole = Edir.objects.create(name="Bole", monthly_fee=10, latitude=8.9806, longitude=38.7578)
+        self.adama = Edir.objects.create(name="Adama", monthly_fee=10, latitude=8.5400, longitude=39.2700)
+        Edir.objects.create(name="Closed", monthly_fee=10, latitude=9.0110, longitude=38.7610, status="Not Active")
+        Edir.objects.create(name="Unlocated", monthly_fee=10, address="Kirkos")
+        self.client = client_for(make_user("0911000001"))
+
+    def nearby(self, **params):
+        lat, lng = self.CENTRE
+        return self.client.get("/api/edir/nearby/", {"lat": lat, "lng": lng, **params})
+
+    def test_active_edirs_within_the_radius_nearest_first(self):
+        with self.assertNumQueries(1):
+            response = self.nearby(radius=5)
+        self.assertEqual([edir["id"] for edir in response.data], [self.piassa.id, self.bole.id])
+        expected = round(haversine_km(*self.CENTRE, self.piassa.latitude, self.piassa.longitude), 3)
+        self.assertEqual(response.data[0]["distance_km"], expected)
+        self.assertLess(response.data[0]["distance_km"], 5)
+
+        far = self.nearby(radius=50).data
+        self.assertEqual([edir["id"] for edir in far], [self.piassa.id, self.bole.id])
+
+    def test_bounding_box_is_applied_through_the_index(self):
+        queryset = Edir.objects.filter(
+            latitude__range=(8.9, 9.1), longitude__range=(38.7, 38.8)
+        ).values("id")
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = " ".join(str(row) for row in cursor.fetchall())
+        self.assertIn("api_edir_lat_lng_idx", plan)
+
+    def test_results_are_paginated_on_request(self):
+        response = self.nearby(radius=5, limit=1, offset=1)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual([edir["id"] for edir in response.data["results"]], [self.bole.id])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.client.get("/api/edir/nearby/", {"lat": 9}).status_code, 400)
+        self.assertEqual(self.nearby(radius="far").status_code, 400)
+        self.assertEqual(self.nearby(radius=500).status_code, 400)
+        self.assertEqual(self.client.get("/api/edir/nearby/", {"lat": 91, "lng": 38}).status_code, 400)
+
+    def test_geocode_command_fills_missing_coordinates(self):
+        located = Edir.objects.create(name="Kazanchis", monthly_fee=10, address="Kazanchis, Addis Ababa")
+        unknown = Edir.objects.create(name="Nowhere", monthly_fee=10, address="No such place")
+        failing = Edir.objects.create(name="Flaky", monthly_fee=10, address="Megenagna")
+        replies = {
+            "Kirkos": mock.Mock(status_code=200, json=lambda: [{"lat": "9.0", "lon": "38.75"}]),
+            "Kazanchis, Addis Ababa": mock.Mock(status_code=200, json=lambda: [{"lat": "9.02", "lon": "38.77"}]),
+            "No such place": mock.Mock(status_code=200, json=lambda: []),
+            "Megenagna": mock.Mock(status_code=503),
+        }
+        session = mock.Mock()
+        session.get.side_effect = lambda url, params, **kwargs: replies[params["q"]]
+        output, errors = io.StringIO(), io.StringIO()
+        with mock.patch("api.management.commands.geocode_edirs.requests.Session", return_value=session):
+            call_command("geocode_edirs", delay=0, stdout=output, stderr=errors)
+
+        self.assertEqual(output.getvalue().strip(), "Geocoded 2 edir(s), 1 not found, 1 failed")
+        self.assertIn(f"Edir {failing.id}", errors.getvalue())
+        located.refresh_from_db()
+        self.assertEqual((located.latitude, located.longitude), (9.02, 38.77))
+        unknown.refresh_from_db()
+        self.assertIsNone(unknown.latitude)
+        # Edirs that already had coordinates were not looked up again
+        self.assertEqual(session.get.call_count, 4)
+
+
+class RequestedEdirsTests(TestCase):
+    def setUp(self):
+        self.user = make_user("0911000001")
+        self.requests = {}
+        for index, request_status in enumerate(["Pending", "Pending", "Rejected", "Pending", "Cancelled"]):
+            edir = Edir.objects.create(name=f"Requested {index}", monthly_fee=10)
+            EdirUser.objects.create(edir=edir, user=self.user, status=request_status)
+            self.requests[edir.id] = request_status
+        joined = Edir.objects.create(name="Joined", monthly_fee=10)
+        EdirUser.objects.create(edir=joined, user=self.user, status="Active")
+        # Another user's request must not leak into the list
+        EdirUser.objects.create(edir=joined, user=make_user("0911000002"), status="Pending")
+        self.client = client_for(self.user)
+
+    def test_one_query_with_each_requests_status(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/requested_edirs/")
+        self.assertEqual({edir["id"]: edir["user_status"] for edir in response.data}, self.requests)
+        self.assertNotIn("users", response.data[0])
+
+    def test_query_count_does_not_grow_with_requests(self):
+        for index in range(20):
+            edir = Edir.objects.create(name=f"More {index}", monthly_fee=10)
+            EdirUser.objects.create(edir=edir, user=self.user, status="Pending")
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/requested_edirs/")
+        self.assertEqual(len(response.data), len(self.requests) + 20)
+
+
+class HomeSummaryTests(TestCase):
+    # The edirs with their counts, then the latest events of all of them
+    HOME_QUERIES = 2
+
+    def setUp(self):
+        self.user = make_user("0911000001")
+        self.client = client_for(self.user)
+
+    def add_edir(self, index, is_committee=False):
+        edir = Edir.objects.create(
+            name=f"Edir {index:02d}", monthly_fee=10,
+            meeting_date=timezone.localdate() + datetime.timedelta(days=7), meeting_place="Hall",
+        )
+        EdirUser.objects.create(edir=edir, user=self.user, status="Active", is_committee=is_committee)
+        EdirUser.objects.create(edir=edir, user=make_user(f"09220000{index:02d}"), status="Pending")
+        for day in range(4):
+            Event.objects.create(
+                edir=edir, made_by=self.user, title=f"Event {day}", description="Meeting",
+                date=timezone.now() - datetime.timedelta(days=day),
+            )
+        fee = Fee.objects.create(edir=edir, name="Jan", amount=25, maker=self.user)
+        assign_fee(fee, [self.user.id], maker=self.user)
+        return edir
+
+    def home(self):
+        response = self.client.get("/api/home/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_does_not_grow_with_edirs(self):
+        self.add_edir(0, is_committee=True)
+        with self.assertNumQueries(self.HOME_QUERIES):
+            self.home()
+        for index in range(1, 6):
+            self.add_edir(index)
+        with self.assertNumQueries(self.HOME_QUERIES):
+            data = self.home()
+        self.assertEqual(len(data["edirs"]), 6)
+
+    def test_summary_contents(self):
+        chaired = self.add_edir(0, is_committee=True)
+        self.add_edir(1)
+        data = self.home()
+        self.assertEqual(data["outstanding_total"], Decimal("50"))
+        first, second = data["edirs"]
+        self.assertEqual((first["id"], first["member_count"], first["outstanding"]), (chaired.id, 1, Decimal("25")))
+        self.assertEqual(first["pending_approvals"]["join_requests"], 1)
+        self.assertIsNone(second["pending_approvals"])
+        self.assertEqual(first["next_meeting"]["place"], "Hall")
+        self.assertEqual([event["title"] for event in first["latest_events"]], ["Event 0", "Event 1", "Event 2"])
+
+    def test_user_without_edirs_costs_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.home()
+        self.assertEqual(data, {"outstanding_total": Decimal("0"), "edirs": []})
+
+
+class SparseFieldsTests(TestCase):
+    def setUp(self):
+        membership_cache.clear()
+        self.committee = make_user("0911000001", "Committee Member", gender="Female")
+        self.edir = Edir.objects.create(name="Edir", monthly_fee=10)
+        EdirUser.objects.create(edir=self.edir, user=self.committee, status="Active", is_committee=True)
+        applicant = make_user("0922000001", "Applicant")
+        EdirUser.objects.create(edir=self.edir, user=applicant, status="Pending")
+        Bank.objects.create(edir=self.edir, bank_name="CBE", account_name="Edir", account_number="1000")
+        self.client = client_for(self.committee)
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        return data["results"] if isinstance(data, dict) else data
+
+    def test_member_lists_honour_fields(self):
+        urls = [
+            f"/api/edirs/{self.edir.id}/members/",
+            f"/api/members/{self.edir.id}/active/",
+            f"/api/edir/{self.edir.id}/members/",
+            f"/api/edirs/{self.edir.id}/requests/",
+            f"/api/bank_list/{self.edir.id}/",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                rows = self.get(url, fields="id")
+                self.assertTrue(rows)
+                self.assertEqual([set(row) for row in rows], [{"id"}] * len(rows))
+
+    def test_unknown_field_names_are_ignored(self):
+        rows = self.get(f"/api/members/{self.edir.id}/active/", fields="full_name,no_such_field")
+        self.assertEqual(rows, [{"full_name": "Committee Member"}])
+
+    def test_trimmed_roster_fetches_only_the_needed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.get(f"/api/edirs/{self.edir.id}/members/", fields="full_name")
+        self.assertEqual(sorted(row["full_name"] for row in rows), ["Applicant", "Committee Member"])
+        roster_sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("gender", roster_sql)
+
+    def test_without_fields_the_full_shape_is_kept(self):
+        rows = self.get(f"/api/edir/{self.edir.id}/members/")
+        self.assertEqual(
+            sorted(rows, key=lambda row: row["name"]),
+            [{"id": user.id, "name": user.full_name} for user in CustomUser.objects.order_by("full_name")],
+        )
+
+    def test_include_expands_the_bank_edir(self):
+        (bank,) = self.get(f"/api/bank_list/{self.edir.id}/", fields="id,edir", include="edir")
+        self.assertEqual(bank["edir"], {"id": self.edir.id, "name": "Edir"})
+
+    def test_home_fields_do_not_trim_the_nested_events(self):
+        Event.objects.create(
+            edir=self.edir, made_by=self.committee, title="Meeting", description="Monthly", date=timezone.now()
+        )
+        response = self.client.get("/api/home/", {"fields": "id"})
+        self.assertEqual(response.status_code, 200)
+        (event,) = response.data["edirs"][0]["latest_events"]
+        self.assertEqual((event["title"], event["description"]), ("Meeting", "Monthly"))
@@ -0,0 +1,177 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle, UserRateThrottle
+
+from .lrucache import MISSING, TTLCache
+from .phone import normalize_phone
+
+
+class PhoneLookupThrottle(UserRateThrottle):
+    """Per-user (or per-IP when anonymous) limit for batch phone lookups."""
+    scope = "phone_lookup"
+
+
+class MemoryBucketStore:
+    """
+    Token buckets kept in this process. The number of buckets is bounded and
+    idle ones expire after an hour, by which time they would be full again.
+    """
+
+    def __init__(self, max_entries=100000):
+        self._buckets = TTLCache(max_entries=max_entries, ttl=3600)
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_per_second):
+        with self._lock:
+            state = self._buckets.get(key)
+            allowed, state, wait = _take(None if state is MISSING else state, capacity, refill_per_second)
+            self._buckets.set(key, state)
+        return allowed, wait
+
+
+class CacheBucketStore:
+    """
+    Token buckets shared between processes through a Django cache alias.
+
+    Read-modify-write is not atomic across processes, so concurrent requests
+    can occasionally both take the last token; that slack is acceptable for
+    abuse throttling and avoids a round trip per lock.
+    """
+
+    def __init__(self, alias="default"):
+        self.alias = alias
+
+    def consume(self, key, capacity, refill_per_second):
+        cache = caches[self.alias]
+        allowed, state, wait = _take(cache.get(key), capacity, refill_per_second)
+        cache.set(key, state, timeout=int(capacity / refill_per_second) + 1)
+        return allowed, wait
+
+
+def _take(state, capacity, refill_per_second):
+    """Refill ``state`` (``(tokens, timestamp)`` or ``None``) and take one token."""
+    now = time.time()
+    tokens, updated = state if state else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+    if tokens >= 1:
+        return True, (tokens - 1, now), None
+    return False, (tokens, now), (1 - tokens) / refill_per_second
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    """The store selected by ``settings.TOKEN_BUCKET_STORE`` ("memory" or "cache")."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if getattr(settings, "TOKEN_BUCKET_STORE", "memory") == "cache":
+                    _store = CacheBucketStore(getattr(settings, "TOKEN_BUCKET_CACHE", "default"))
+                else:
+                    _store = MemoryBucketStore()
+    return _store
+
+
+def bucket_rate(scope, kind):
+    """``(capacity, refill_per_second)`` from ``settings.TOKEN_BUCKET_THROTTLES``."""
+    rate = settings.TOKEN_BUCKET_THROTTLES[scope][kind]
+    return rate["capacity"], rate["refill_per_minute"] / 60
+
+
+def consume_token(scope, kind, key):
+    """Take a token from the ``scope``/``kind`` bucket for ``key``; returns ``(allowed, wait)``."""
+    capacity, refill_per_second = bucket_rate(scope, kind)
+    return get_bucket_store().consume(f"throttle:{scope}:{kind}:{key}", capacity, refill_per_second)
+
+
+def request_phone_number(request, view=None):
+    """The phone number a request is about, from the URL or the body, normalized."""
+    phone_number = None
+    if view is not None:
+        phone_number = view.kwargs.get("phone_number")
+    if phone_number is None:
+        data = getattr(request, "data", None)
+        if hasattr(data, "get"):
+            phone_number = data.get("phone_number")
+    if not phone_number:
+        return None
+    return normalize_phone(phone_number) or str(phone_number)
+
+
+def check_buckets(request, scope, phone_number=None):
+    """
+    Token-bucket check for plain Django views; returns the seconds to wait
+    when the caller's IP or phone bucket is empty, else ``None``.
+    """
+    keys = [("ip", BaseThrottle().get_ident(request))]
+    if phone_number:
+        keys.append(("phone", normalize_phone(phone_number) or str(phone_number)))
+    waits = []
+    for kind, key in keys:
+        allowed, wait = consume_token(scope, kind, key)
+        if not allowed:
+            waits.append(wait)
+    return max(waits) if waits else None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by a token bucket per ``(scope, kind, key)``.
+    Buckets only need the request itself, so a rejected request never
+    reaches the ORM.
+    """
+    scope = None
+    kind = None
+
+    def get_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        allowed, self._wait = consume_token(self.scope, self.kind, key)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    kind = "ip"
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class PhoneTokenBucketThrottle(TokenBucketThrottle):
+    kind = "phone"
+
+    def get_key(self, request, view):
+        return request_phone_number(request, view)
+
+
+class PhoneCheckIPThrottle(IPTokenBucketThrottle):
+    scope = "phone_check"
+
+
+class PhoneCheckNumberThrottle(PhoneTokenBucketThrottle):
+    scope = "phone_check"
+
+
+class PasswordIPThrottle(IPTokenBucketThrottle):
+    scope = "password"
+
+
+class PasswordNumberThrottle(PhoneTokenBucketThrottle):
+    scope = "password"
+
+
+PHONE_CHECK_THROTTLES = [PhoneCheckIPThrottle, PhoneCheckNumberThrottle]
+PASSWORD_THROTTLES = [PasswordIPThrottle, PasswordNumberThrottle]
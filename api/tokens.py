@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import EdirUser
+
+# Tokens issued before the claim existed carry no version and count as 0
+TOKEN_VERSION_CLAIM = "ver"
+# {"<edir_id>": 1 if committee else 0} for the user's active memberships
+EDIRS_CLAIM = "edirs"
+MEMBERSHIP_VERSION_CLAIM = "mv"
+
+
+def membership_claim(user):
+    return {
+        str(edir_id): int(is_committee)
+        for edir_id, is_committee in EdirUser.objects.filter(user=user, status="Active")
+        .values_list("edir_id", "is_committee")
+    }
+
+
+class VersionedRefreshToken(RefreshToken):
+    """
+    Refresh token (and derived access tokens) stamped with ``token_version``
+    and the user's edir roles as of ``membership_version``.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[TOKEN_VERSION_CLAIM] = user.token_version
+        token[EDIRS_CLAIM] = membership_claim(user)
+        token[MEMBERSHIP_VERSION_CLAIM] = user.membership_version
+        return token
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = VersionedRefreshToken
+
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = VersionedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = (
+            get_user_model().objects
+            .filter(**{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)})
+            .first()
+        )
+        if user is None or refresh.get(TOKEN_VERSION_CLAIM, 0) != user.token_version:
+            raise InvalidToken("Token has been revoked")
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        # Re-issue from the user rather than copying the old claims, so the
+        # new access token carries the current edir roles
+        fresh = self.token_class.for_user(user)
+        data = {"access": str(fresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            data["refresh"] = str(fresh)
+        return data
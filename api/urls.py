@@ -1,19 +1,22 @@
 from django.urls import path
 from django.conf import settings
 from django.conf.urls.static import static
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     #User and Member related endpoints
     path('edirs/<int:edir_id>/members/', views.members_list_create, name='members-list-create'),
+    path('edirs/<int:edir_id>/members/search/', views.search_edir_members, name='search-edir-members'),
     path('members/<int:edir_id>/active/', views.active_members_list, name='active-members-list'),
     path("edir/<int:edir_id>/members/", views.members_by_edir, name="members-by-edir"),
     path('admin-create-user/<int:edir_id>/', views.admin_create_user, name='admin-create-user'),
+    path('import-members/<int:edir_id>/', views.import_members, name='import-members'),
     
     path('add-existed-user/<int:edir_id>/', views.add_existed_user, name='add-existed-user'),
-    path('check-user-in-edir/<int:edir_id>/<int:phone_number>/', views.check_user_in_edir, name='check-user-in-edir'),
+    path('check-user-in-edir/<int:edir_id>/<str:phone_number>/', views.check_user_in_edir, name='check-user-in-edir'),
     path('user/register/', views.self_register, name='user-register'),
     path("user/<int:user_id>/<int:edir_id>/deactivate/", views.deactivate_member, name="deactivate-member"),
+    path("edirs/<int:edir_id>/members/status/", views.batch_update_member_status, name="batch-member-status"),
     
     # path('user/<int:user_id>/<int:edir_id>/', views.user_detail, name='user-detail'),
     # path('user/<int:user_id>/', views.user_detail_with_family, name='user-detail_with_family'),
@@ -22,11 +25,16 @@ urlpatterns = [
     path('user/<int:user_id>/<int:edir_id>/', views.user_detail, name='user-detail-with-edir'),
     path('set-password/<uidb64>/<token>/', views.set_password, name='set-password'),
     
-    path('check_user_phone/<int:phone_number>/', views.check_user_phone, name='check_user_phone'),
-    path('check_user_phoneNumber/<int:phone_number>/', views.check_user_phoneNumber, name='check_user_phoneNumber'),
+    path('check_user_phone/<str:phone_number>/', views.check_user_phone, name='check_user_phone'),
+    path('check_user_phoneNumber/<str:phone_number>/', views.check_user_phoneNumber, name='check_user_phoneNumber'),
     path('check_phone/', views.check_phone, name='check_phone'),
+    path('check_phones/', views.check_phones, name='check_phones'),
     path('set_new_password/', views.set_new_password, name='set_new_password'),
     path('auth/change-password/', views.change_password, name='change-password'),
+    path('async/user/register/', async_views.self_register, name='async-user-register'),
+    path('async/set_new_password/', async_views.set_new_password, name='async-set-new-password'),
+    path('async/auth/change-password/', async_views.change_password, name='async-change-password'),
+    path('async/auth/jwt/create/', async_views.obtain_token_pair, name='async-jwt-create'),
     
     #Family related endpoints
     path('admin-add-family/<int:user_id>/', views.add_family, name='admin-add-family'),   
@@ -50,11 +58,16 @@ urlpatterns = [
     path("edir/add/", views.add_edir, name="add_edir"),
     path("user/", views.get_user_with_edirs, name="user-with-edirs"),
     path("popular_edirs/", views.get_popular_edirs, name="popular-edirs"),
+    path("home/", views.home, name="home"),
+    path("cache/metrics/", views.response_cache_metrics, name="response-cache-metrics"),
     path("requested_edirs/", views.get_requested_edirs, name="requested-edirs"),
     path('join_edir/<int:edir_id>/', views.join_edir, name='join-edir'), 
     path('edir_request/<int:edir_id>/<str:status>', views.update_edir_request, name='update-edir-request'), 
     path('edir_cancel_request/<int:edir_id>/', views.cancel_edir_request, name='cancel-edir-request'),
+    path('edirs/<int:edir_id>/requests/', views.pending_join_requests, name='pending-join-requests'),
+    path('edirs/<int:edir_id>/requests/decide/', views.decide_join_requests, name='decide-join-requests'),
     path("edir/list/", views.list_edirs, name="list_edirs"),
+    path("edir/nearby/", views.get_nearby_edirs, name="nearby_edirs"),
 
     path("edir/<int:edir_id>/", views.dashboard, name="edir-detail"),
     path("edir/detail/<int:edir_id>/", views.edir_detail, name="edir-detail"),
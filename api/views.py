@@ -1,32 +1,50 @@
 from asyncio.log import logger
 
 from django.shortcuts import render
-from django.db.models import Count, Sum, F, OuterRef, Subquery, Exists, Q
+from django.db.models import Count, Sum, F, OuterRef, Subquery, Exists, Q, Prefetch, Case, When, Value, BooleanField
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
-from django.contrib.auth.hashers import make_password
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
-from rest_framework.decorators import api_view, permission_classes, authentication_classes, parser_classes
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, parser_classes, throttle_classes
 from .serializers import BankSerializer, UserWithNumFamSerializer, FamilyWithUserSerializer, EdirSerializer, UserWithEdirsSerializer, EdirDetailSerializer, EdirSerializer, FeeSerializer, FeeAssignmentReadOnlySerializer, ChangePasswordSerializer, FeeAssignmentDetailSerializer, FeeWithAssignmentsSerializer, BankChangeRequestSerializer
-from .serializers import UserDetailSerializer, BankWithEdirSerializer, EdirDetailSerializer, UserWithNumFam2Serializer, EdirSerializer, EdirWithUserStatusSerializer, HelpSerializer, EventSerializer, ExpenseFeeSerializer, FeeDetailSerializer, FeeAssignmentSerializer, EdirChangeRequestSerializer
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from .serializers import FamilyDetailSerializer, JoinRequestSerializer, MemberNameSerializer
+from .serializers import UserDetailSerializer, BankWithEdirSerializer, EdirDetailSerializer, UserWithNumFam2Serializer, MemberSearchResultSerializer, EdirSerializer, EdirWithUserStatusSerializer, HelpSerializer, EventSerializer, ExpenseFeeSerializer, FeeDetailSerializer, FeeAssignmentSerializer, EdirChangeRequestSerializer
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from .models import EdirAuditLog, EdirChangeRequest, EdirUserChangeRequest, Family, Edir, Fee, FeeAssignment, Bank, EdirUser, Help, Event, Transaction, UserAuditLog, EdirUserAuditLog, BankAuditLog, FeeAuditLog, FeeAssignAuditLog, CustomUser, TrxAuditLog, BankChangeRequest
 from django.utils import timezone
 from django.utils.dateparse import parse_datetime, parse_date
-from django.db.models.functions import TruncDate
+from django.db.models.functions import TruncDate, Coalesce
 from django.db import transaction
 from collections import defaultdict
 from decimal import Decimal
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 import uuid
 import json
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.forms.models import model_to_dict
 import logging
 from core.audit import model_to_json
+from .pagination import MemberCursorPagination, MemberSearchPagination, JoinRequestCursorPagination, EdirCatalogPagination
+from .search import search_edirs, search_members
+from .revisions import revision_etag
+from .importers import RosterImportError, import_roster, read_roster
+from .membership import MAX_BATCH_SIZE, membership_changed, transition_members
+from .balances import get_member_balance, outstanding_balance_subquery, refresh_balances_for
+from .fees import assign_fee
+from .phone import normalize_phone
+from .throttling import PASSWORD_THROTTLES, PHONE_CHECK_THROTTLES, PhoneLookupThrottle
+from .tokens import VersionedRefreshToken
+from .hashers import hash_password
+from .catalogue import joined_edir_ids, popular_edirs
+from .geo import nearby_edirs
+from .home import home_summary
+from .stats import dashboard_edir
+from .responsecache import cache_metrics, cached_response
+from .permissions import IsEdirCommittee, IsEdirMember, get_membership
 
 import calendar
 import datetime
@@ -34,8 +52,22 @@ from datetime import date
 
 User = get_user_model()
 
+def edir_member_roster(edir):
+    return (
+        EdirUser.objects.filter(
+            edir=edir,
+            status__in=["Active", "Pending"]
+        )
+        .select_related("user")
+        .annotate(
+            member_name=F("user__full_name"),
+            member_joined=Coalesce("joined_date", "user__created_date"),
+        )
+    )
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])  
+@condition(etag_func=revision_etag("members"))
 def members_list_create(request, edir_id=None):
     if request.method == 'GET':
         try:
@@ -43,12 +75,18 @@ def members_list_create(request, edir_id=None):
         except Edir.DoesNotExist:
             return Response({"error": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
         
-        edir_users = EdirUser.objects.filter(
-            edir=edir,
-            status__in=["Active", "Pending"]
-        ).select_related("user")
-
-        serializer = UserWithNumFam2Serializer(edir_users, many=True, context={"edir_id": edir.id})
+        edir_users = UserWithNumFam2Serializer.sparse_queryset(edir_member_roster(edir), request.query_params)
+        context = {"edir_id": edir.id, "fieldset": request.query_params}
+
+        # Keyset pagination is opt-in so existing clients keep the full list
+        if MemberCursorPagination.is_requested(request):
+            paginator = MemberCursorPagination()
+            page = paginator.paginate_queryset(edir_users, request)
+            serializer = UserWithNumFam2Serializer(page, many=True, context=context)
+            return paginator.get_paginated_response(serializer.data)
+
+        edir_users = edir_users.order_by(*MemberCursorPagination.ordering_for(request))
+        serializer = UserWithNumFam2Serializer(edir_users, many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK) 
 
     if request.method == 'POST':
@@ -60,6 +98,24 @@ def members_list_create(request, edir_id=None):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEdirMember])
+def search_edir_members(request, edir_id):
+    term = request.query_params.get("q", "").strip()
+    if not term:
+        return Response({"error": "q is required"}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        edir = Edir.objects.get(id=edir_id)
+    except Edir.DoesNotExist:
+        return Response({"error": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    results = search_members(edir_member_roster(edir), term)
+
+    paginator = MemberSearchPagination()
+    page = paginator.paginate_queryset(results, request)
+    serializer = MemberSearchResultSerializer(page, many=True, context={"edir_id": edir.id})
+    return paginator.get_paginated_response(serializer.data)
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])  # or your custom permission
 def active_members_list(request, edir_id=None):
@@ -68,13 +124,15 @@ def active_members_list(request, edir_id=None):
         except Edir.DoesNotExist:
             return Response({"error": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        edir_users = EdirUser.objects.filter(
-            edir=edir,
-            status="Active"
-        ).select_related("user")
-        users = [eu.user for eu in edir_users]
+        users = User.objects.filter(
+            ediruser__edir=edir,
+            ediruser__status="Active"
+        )
+        users = UserWithNumFamSerializer.sparse_queryset(users, request.query_params)
 
-        serializer = UserWithNumFamSerializer(users, many=True, context={"edir_id": edir.id})
+        serializer = UserWithNumFamSerializer(
+            users, many=True, context={"edir_id": edir.id, "fieldset": request.query_params}
+        )
         return Response(serializer.data, status=status.HTTP_200_OK) 
 
 
@@ -86,9 +144,9 @@ def members_by_edir(request, edir_id):
     except Edir.DoesNotExist:
         return Response({"error": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
         
-    members = edir.users.all()
-    data = [{"id": m.id, "name": m.full_name} for m in members]
-    return Response(data, status=status.HTTP_200_OK)
+    members = MemberNameSerializer.sparse_queryset(edir.users.all(), request.query_params)
+    serializer = MemberNameSerializer(members, many=True, context={"fieldset": request.query_params})
+    return Response(serializer.data, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -101,63 +159,109 @@ def user_detail_with_family(request, user_id):
     serializer = UserDetailSerializer(user)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
+def member_profile(user_id, edir_id=None, include=()):
+    """
+    Fetch a user with their membership in ``edir_id`` (and, on request, the
+    outstanding balance) annotated, so the whole profile is one query.
+    ``include=("family",)`` adds a prefetch of the active family members.
+    """
+    queryset = User.objects.filter(id=user_id)
+    if edir_id is not None:
+        membership = EdirUser.objects.filter(user=OuterRef("pk"), edir_id=edir_id)
+        queryset = queryset.annotate(
+            edir_exists=Exists(Edir.objects.filter(id=edir_id)),
+            membership_status=Subquery(membership.values("status")[:1]),
+            membership_is_committee=Subquery(membership.values("is_committee")[:1]),
+        )
+    if "balance" in include:
+        queryset = queryset.annotate(outstanding_balance=outstanding_balance_subquery(edir_id))
+    if "family" in include:
+        queryset = queryset.prefetch_related(
+            Prefetch("family", queryset=Family.objects.filter(status="Active"), to_attr="active_family")
+        )
+    return queryset.first()
+
 @api_view(['GET', 'PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
 def user_detail(request, user_id, edir_id=None):
-    edir= None
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
+    include = {part.strip() for part in request.query_params.get("include", "").split(",")}
+    user = member_profile(user_id, edir_id, include if request.method == 'GET' else ())
+    if user is None:
         return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-    # try:
-    #     membership = GroupMembership.objects.get(user=user, group__edir_id=edir_id)
-    # except GroupMembership.DoesNotExist:
-    #     membership = None
-    membership = None
-    membership_status = "Not a Member"
-    if edir_id is not None:
-        try:
-            edir = Edir.objects.get(id=edir_id)
-        except Edir.DoesNotExist:
-            return Response({"detail": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
-        try:
-            # membership = GroupMembership.objects.get(user=user, group__edir_id=edir_id)
-            membership = EdirUser.objects.get(user=user, edir=edir)
-            if membership.is_committee:
-                membership_status = "Committee Member"
-            else:
-                membership_status = "Edir Member"
-        except EdirUser.DoesNotExist:
-            membership_status = "Not a Member"
+    if edir_id is not None and not user.edir_exists:
+        return Response({"detail": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    is_member = edir_id is not None and user.membership_status is not None
+    is_committee = bool(is_member and user.membership_is_committee)
+    if not is_member:
+        membership_status = "Not a Member"
+    elif is_committee:
+        membership_status = "Committee Member"
+    else:
+        membership_status = "Edir Member"
+
     if request.method == 'GET':
         serializer = UserWithNumFamSerializer(user)
-        # membership = GroupMembership.objects.get(user=user, group__edir_id=edir_id)
         response_data = serializer.data
-        response_data["is_committee"] = membership.is_committee if membership else False
+        response_data["is_committee"] = is_committee
         response_data["membership_status"] = membership_status
+        if is_member:
+            response_data["user_status"] = user.membership_status
+        if "family" in include:
+            response_data["family"] = FamilyDetailSerializer(user.active_family, many=True).data
+        if "balance" in include:
+            response_data["outstanding_balance"] = str(user.outstanding_balance.quantize(Decimal("0.01")))
         return Response(response_data, status=status.HTTP_200_OK)
 
     elif request.method in ['PUT', 'PATCH']:
         serializer = UserWithNumFamSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            is_committee = request.data.get("is_Committee", None)
-            if is_committee is not None:
-                # membership = GroupMembership.objects.filter(user=user, group__edir_id=edir_id).first()
-                membership = EdirUser.objects.filter(user=user, edir=edir).first()
-                if membership:
-                    membership.is_committee = bool(is_committee)
-                    membership.save()
-
-            # return combined response
             response_data = serializer.data
-            if membership:
-                response_data["is_committee"] = membership.is_committee
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            requested_committee = request.data.get("is_Committee", None)
+            if requested_committee is not None and is_member:
+                is_committee = bool(requested_committee)
+                EdirUser.objects.filter(user=user, edir_id=edir_id).update(
+                    is_committee=is_committee, updated_date=timezone.now()
+                )
+                membership_changed(edir_id, [user.id], committee=True)
+            if is_member:
+                response_data["is_committee"] = is_committee
+            return Response(response_data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+def register_user(data, password_hash):
+    """Create a self-registered user and its audit row (shared with async_views)."""
+    user = User.objects.create(
+        full_name=data.get('full_name'),
+        phone_number=data.get('phone_number'),
+        # email=email,
+        gender=data.get('gender'),
+        marital_status=data.get('marital_status'),
+        profession=data.get('profession'),
+        address=data.get('address'),
+        password=password_hash,
+    )
+    UserAuditLog.objects.create(
+        user=user,
+        action="Self Registered",
+        performed_by=user,
+        new_value=model_to_dict(user, exclude=["password","last_login", "user_permissions","updated_date"]),
+    )
+    return user
+
+def apply_new_password(user, password_hash):
+    """Store a new password hash, revoke older JWTs and return a fresh pair."""
+    user.password = password_hash
+    user.revoke_tokens()
+    user.save()
+    refresh = VersionedRefreshToken.for_user(user)
+    return {"access": str(refresh.access_token), "refresh": str(refresh)}
+
 @api_view(['POST'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes(PASSWORD_THROTTLES)
 def self_register(request):
     logger = logging.getLogger("user_registration")
     if request.method == 'POST':
@@ -183,24 +287,13 @@ def self_register(request):
                 )
                 return Response({'error': 'full_name and phone_number are required'}, status=status.HTTP_400_BAD_REQUEST)
 
-            user = User.objects.create(
-                full_name=full_name,
-                phone_number=phone_number,
-                # email=email,
-                gender=gender,
-                marital_status=marital_status,
-                profession=profession,
-                address=address,
-                password=make_password(password),
-            )
-            user.save()
+            if User.objects.by_phone(phone_number).exists():
+                logger.warning(
+                    f"Validation failed - Phone already registered | phone: {phone_number}"
+                )
+                return Response({'error': 'A user with this phone number already exists'}, status=status.HTTP_400_BAD_REQUEST)
 
-            UserAuditLog.objects.create(
-            user=user,
-            action="Self Registered",
-            performed_by=user,
-            new_value=model_to_dict(user, exclude=["password","last_login", "user_permissions","updated_date"]),
-            )
+            user = register_user(data, hash_password(password))
             logger.info(
                 f"User registered successfully | user_data="+ json.dumps(model_to_json(user, exclude=["password","last_login", "updated_date"]))
             )
@@ -238,6 +331,12 @@ def admin_create_user(request, edir_id):
             )
             return Response({'error': 'full_name and phone_number are required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        if User.objects.by_phone(phone_number).exists():
+            logger.warning(
+                f"Validation failed - Phone already registered | phone: {phone_number}"
+            )
+            return Response({'error': 'A user with this phone number already exists'}, status=status.HTTP_400_BAD_REQUEST)
+
         user = User.objects.create(
             full_name=full_name,
             phone_number=phone_number,
@@ -300,6 +399,43 @@ def admin_create_user(request, edir_id):
         )
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEdirCommittee])
+@parser_classes([MultiPartParser, FormParser])
+def import_members(request, edir_id):
+    logger = logging.getLogger("user_registration")
+    roster_file = request.FILES.get("file")
+    if not roster_file:
+        return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+    dry_run = str(request.data.get("dry_run", "")).lower() in ("1", "true", "yes")
+
+    try:
+        edir = Edir.objects.get(id=edir_id)
+    except Edir.DoesNotExist:
+        return Response({'error': 'Edir not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        rows = read_roster(roster_file, roster_file.name)
+        report = import_roster(edir, rows, performed_by=request.user, dry_run=dry_run)
+    except RosterImportError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.exception(
+            f"Roster import failed | edir={edir} | file={roster_file.name} | imported by={request.user} | error={str(e)}"
+        )
+        return Response(
+            {'error': 'Internal server error'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    logger.info(
+        f"Roster import finished | edir={edir} | file={roster_file.name} | dry_run={dry_run} | "
+        f"rows={report['total_rows']} | created={report['created']} | duplicates={len(report['duplicates'])} | "
+        f"errors={len(report['errors'])} | imported by={request.user}"
+    )
+    return Response(report, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def join_edir(request, edir_id):
@@ -311,13 +447,15 @@ def join_edir(request, edir_id):
         edir_user = EdirUser.objects.get(edir=edir, user=request.user)
         # edir_user = EdirUser.objects.get(user=user, edir=edir)
         edir_user.status = "Pending"
+        edir_user.updated_date = timezone.now()
         edir_user.save()
     except EdirUser.DoesNotExist:
         # return JsonResponse({"error": "User is not found in Edir Request"}, status=404)
         EdirUser.objects.create(
             user=request.user,
             edir=edir,
-            status= "Pending"
+            status= "Pending",
+            updated_date=timezone.now(),
         )
     return Response({'message': 'User created by admin'}, status=status.HTTP_201_CREATED)
 
@@ -361,6 +499,147 @@ def update_edir_request (request, edir_id, status):
     }, status=200)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEdirCommittee])
+def batch_update_member_status(request, edir_id):
+    logger = logging.getLogger("edir_membership")
+    allowed_statuses = ["Active", "Not Active", "Blocked", "Rejected"]
+    target_status = request.data.get("status")
+    if target_status not in allowed_statuses:
+        return Response({"error": "Invalid status value"}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_ids = request.data.get("user_ids")
+    if not isinstance(user_ids, list) or not user_ids:
+        return Response({"error": "user_ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(user_ids) > MAX_BATCH_SIZE:
+        return Response(
+            {"error": f"At most {MAX_BATCH_SIZE} users can be updated at once"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        user_ids = [int(user_id) for user_id in user_ids]
+    except (TypeError, ValueError):
+        return Response({"error": "user_ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        edir = Edir.objects.get(id=edir_id)
+    except Edir.DoesNotExist:
+        return Response({"error": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    results = transition_members(
+        edir,
+        user_ids,
+        target_status,
+        performed_by=request.user,
+        comment=request.data.get("comment"),
+    )
+    updated = [user_id for user_id, result in results.items() if result["outcome"] == "updated"]
+    logger.info(
+        f"Batch member status update | edir={edir.id, edir.name} | status={target_status} | "
+        f"requested={len(results)} | updated={len(updated)} | by={request.user.id, request.user.full_name}"
+    )
+
+    return Response({
+        "edir_id": edir.id,
+        "status": target_status,
+        "updated": len(updated),
+        "results": [{"user_id": user_id, **result} for user_id, result in results.items()],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsEdirCommittee])
+def pending_join_requests(request, edir_id):
+    pending = EdirUser.objects.filter(edir_id=edir_id, status="Pending").select_related("user")
+    pending = JoinRequestSerializer.sparse_queryset(pending, request.query_params)
+
+    paginator = JoinRequestCursorPagination()
+    page = paginator.paginate_queryset(pending, request)
+    serializer = JoinRequestSerializer(page, many=True, context={"fieldset": request.query_params})
+    return paginator.get_paginated_response(serializer.data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEdirCommittee])
+def decide_join_requests(request, edir_id):
+    logger = logging.getLogger("edir_membership")
+    decisions = {
+        "approve": ("Active", "Joined", "APPROVED"),
+        "reject": ("Rejected", "MODIFIED", "REJECTED"),
+    }
+    decision = request.data.get("decision")
+    if decision not in decisions:
+        return Response({"error": "decision must be approve or reject"}, status=status.HTTP_400_BAD_REQUEST)
+    target_status, audit_action, request_status = decisions[decision]
+
+    user_ids = request.data.get("user_ids")
+    if not isinstance(user_ids, list) or not user_ids:
+        return Response({"error": "user_ids must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(user_ids) > MAX_BATCH_SIZE:
+        return Response(
+            {"error": f"At most {MAX_BATCH_SIZE} requests can be decided at once"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        user_ids = [int(user_id) for user_id in user_ids]
+    except (TypeError, ValueError):
+        return Response({"error": "user_ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        edir = Edir.objects.get(id=edir_id)
+    except Edir.DoesNotExist:
+        return Response({"error": "Edir not found"}, status=status.HTTP_404_NOT_FOUND)
+
+    comment = request.data.get("comment")
+    now = timezone.now()
+    extra_updates = {"joined_date": now} if decision == "approve" else {}
+    with transaction.atomic():
+        results = transition_members(
+            edir,
+            user_ids,
+            target_status,
+            performed_by=request.user,
+            from_statuses=["Pending"],
+            comment=comment,
+            audit_action=audit_action,
+            **extra_updates,
+        )
+        decided = [user_id for user_id, result in results.items() if result["outcome"] == "updated"]
+        EdirUserChangeRequest.objects.bulk_create([
+            EdirUserChangeRequest(
+                user_id=user_id,
+                edir=edir,
+                action="JOIN_REQUEST",
+                maker_id=user_id,
+                checker=request.user,
+                status=request_status,
+                comment=comment,
+                old_value={"status": "Pending"},
+                new_value={"status": target_status},
+                approved_at=now,
+            )
+            for user_id in decided
+        ])
+
+    counts = EdirUser.objects.filter(edir=edir).aggregate(
+        pending=Count("id", filter=Q(status="Pending")),
+        active=Count("id", filter=Q(status="Active")),
+        rejected=Count("id", filter=Q(status="Rejected")),
+    )
+    logger.info(
+        f"Join requests decided | edir={edir.id, edir.name} | decision={decision} | "
+        f"requested={len(results)} | decided={len(decided)} | by={request.user.id, request.user.full_name}"
+    )
+
+    return Response({
+        "edir_id": edir.id,
+        "decision": decision,
+        "decided": len(decided),
+        "counts": counts,
+        "results": [{"user_id": user_id, **result} for user_id, result in results.items()],
+    }, status=status.HTTP_200_OK)
+
+
 @csrf_exempt
 @api_view(['PUT', 'PATCH'])
 @permission_classes([IsAuthenticated])
@@ -679,7 +958,7 @@ def add_existed_user(request, edir_id):
     is_committee = data.get('is_Committee', False)
 
     try:
-        user = User.objects.get(phone_number=phone_number)
+        user = User.objects.get_by_phone(phone_number)
     except User.DoesNotExist:
         return Response({'error': 'User not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -717,17 +996,14 @@ def check_user_in_edir(request, edir_id, phone_number):
     # phone_number = request.data.get('phone_number')
 
     try:
-        user = User.objects.get(phone_number=phone_number)
+        user = User.objects.get_by_phone(phone_number)
     except User.DoesNotExist:
         return Response({'exists': False}, status=status.HTTP_200_OK)
 
-    try:
-        edir = Edir.objects.get(id=edir_id)
-    except Edir.DoesNotExist:
+    is_member = get_membership(user.id, edir_id).status is not None
+    if not is_member and not Edir.objects.filter(id=edir_id).exists():
         return Response({'error': 'Edir not found'}, status=status.HTTP_404_NOT_FOUND)
 
-    is_member = edir.users.filter(id=user.id).exists()
-
     return Response({'exists': is_member}, status=status.HTTP_200_OK)
 
 
@@ -735,6 +1011,7 @@ def check_user_in_edir(request, edir_id, phone_number):
 @api_view(["POST"])
 @authentication_classes([])
 @permission_classes([AllowAny])  # allow unauthenticated users
+@throttle_classes(PASSWORD_THROTTLES)
 def set_new_password(request):
     phone_number = request.data.get("phone_number")
     password = request.data.get("password")
@@ -746,7 +1023,7 @@ def set_new_password(request):
         )
 
     try:
-        user = User.objects.get(phone_number=phone_number)
+        user = User.objects.get_by_phone(phone_number)
 
         # Only allow if the user has no usable password
         if user.has_usable_password():
@@ -755,12 +1032,8 @@ def set_new_password(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Set password
-        user.set_password(password)
-        user.save()
-
-        # Auto-login: create JWT tokens
-        refresh = RefreshToken.for_user(user)
+        # Set password and auto-login with fresh JWT tokens
+        tokens = apply_new_password(user, hash_password(password))
 
         return Response({
             "message": "Password set successfully",
@@ -769,8 +1042,7 @@ def set_new_password(request):
                 "full_name": user.full_name,
                 "phone_number": user.phone_number,
             },
-            "access": str(refresh.access_token),
-            "refresh": str(refresh),
+            **tokens,
         }, status=status.HTTP_200_OK)
 
     except User.DoesNotExist:
@@ -780,14 +1052,16 @@ def set_new_password(request):
         )
 
 @api_view(["POST"])
+@authentication_classes([])
 @permission_classes([AllowAny])   # 👈 allow unauthenticated requests
+@throttle_classes(PHONE_CHECK_THROTTLES)
 def check_phone(request):
     phone_number = request.data.get("phone_number")
     if not phone_number:
         return Response({"error": "Phone number is required"}, status=400)
 
     try:
-        user = User.objects.get(phone_number=phone_number)
+        user = User.objects.get_by_phone(phone_number)
         return Response({
             "exists": True,
             "has_password": user.has_usable_password()
@@ -799,27 +1073,102 @@ def check_phone(request):
         )
 
 
+PHONE_LOOKUP_CHUNK_SIZE = 200
+MAX_PHONE_LOOKUP = 3000
+
+def lookup_registered_phones(numbers):
+    """
+    Resolve ``{raw: normalized}`` numbers to ``{raw: has_password}`` for the
+    registered ones, with chunked ``IN`` queries on the unique
+    ``normalized_phone`` and ``phone_number`` indexes.
+
+    As in ``CustomUserManager.by_phone``, an exact ``phone_number`` match
+    wins, so accounts left without a normalized number are still found.
+    """
+    found = {}
+    items = list(numbers.items())
+    for start in range(0, len(items), PHONE_LOOKUP_CHUNK_SIZE):
+        chunk = items[start:start + PHONE_LOOKUP_CHUNK_SIZE]
+        rows = (
+            User.objects.filter(
+                Q(normalized_phone__in=[number for raw, number in chunk])
+                | Q(phone_number__in=[raw for raw, number in chunk])
+            )
+            .annotate(has_password=Case(
+                When(password__startswith=UNUSABLE_PASSWORD_PREFIX, then=Value(False)),
+                default=Value(True),
+                output_field=BooleanField(),
+            ))
+            .values_list("phone_number", "normalized_phone", "has_password")
+        )
+        by_raw = {}
+        by_normalized = {}
+        for phone_number, normalized, has_password in rows:
+            by_raw[phone_number] = has_password
+            if normalized is not None:
+                by_normalized[normalized] = has_password
+        for raw, number in chunk:
+            if raw in by_raw:
+                found[raw] = by_raw[raw]
+            elif number in by_normalized:
+                found[raw] = by_normalized[number]
+    return found
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@throttle_classes([PhoneLookupThrottle])
+def check_phones(request):
+    phone_numbers = request.data.get("phone_numbers")
+    if not isinstance(phone_numbers, list) or not phone_numbers:
+        return Response({"error": "phone_numbers must be a non-empty list"}, status=status.HTTP_400_BAD_REQUEST)
+    if len(phone_numbers) > MAX_PHONE_LOOKUP:
+        return Response(
+            {"error": f"At most {MAX_PHONE_LOOKUP} phone numbers can be checked at once"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    normalized = {raw: normalize_phone(raw) for raw in dict.fromkeys(map(str, phone_numbers))}
+    found = lookup_registered_phones({raw: number for raw, number in normalized.items() if number})
+
+    results = []
+    invalid = []
+    for raw, number in normalized.items():
+        if number is None:
+            invalid.append(raw)
+            continue
+        results.append({
+            "phone_number": raw,
+            "normalized": number,
+            "exists": raw in found,
+            "has_password": found.get(raw, False),
+        })
+    return Response({"results": results, "invalid": invalid}, status=status.HTTP_200_OK)
+
 @api_view(['GET'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes(PHONE_CHECK_THROTTLES)
 def check_user_phone(request, phone_number):
     if not phone_number:
         return Response({'detail': 'Phone number is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    exists = User.objects.filter(phone_number=phone_number).exists()
+    exists = User.objects.by_phone(phone_number).exists()
     return Response({
         "phone_number": phone_number,
         "exists": exists
     }, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
+@authentication_classes([])
 @permission_classes([AllowAny])
+@throttle_classes(PHONE_CHECK_THROTTLES)
 def check_user_phoneNumber(request, phone_number):
     if not phone_number:
         return Response({'detail': 'Phone number is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
-    exists = User.objects.filter(phone_number=phone_number).exists()
+    user = User.objects.by_phone(phone_number).first()
+    exists = user is not None
     if (exists):
-        user = User.objects.get(phone_number=phone_number)
         serializer = UserWithNumFamSerializer(user)
         return Response({
         "user": serializer.data,
@@ -896,16 +1245,17 @@ def add_family(request, user_id):
     if not full_name :
         return Response({'error': 'full_name is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-    family = Family.objects.create(
-        user = user,
-        # partner= partner_user,
-        full_name=full_name,
-        gender=gender,
-        # date_of_birth=date_of_birth,
-        profession=profession,
-        relationship=relationship,
-    )
-    family.save()
+    # The family signal updates user.active_family_count; keep both in one commit
+    with transaction.atomic():
+        Family.objects.create(
+            user = user,
+            # partner= partner_user,
+            full_name=full_name,
+            gender=gender,
+            # date_of_birth=date_of_birth,
+            profession=profession,
+            relationship=relationship,
+        )
     return Response({'message': 'parther added by admin'}, status=status.HTTP_201_CREATED)
 
 @api_view(['GET'])
@@ -940,7 +1290,8 @@ def family_detail(request, user_id):
     elif request.method in ['PUT', 'PATCH']:
         serializer = FamilyWithUserSerializer(family, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                serializer.save()
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -962,7 +1313,8 @@ def deactivate_family(request, family_id):
 
     family.status = "Not Active"
     family.updated_date = timezone.now()
-    family.save()
+    with transaction.atomic():
+        family.save()
 
     return JsonResponse({
         "message": "Family deactivated successfully",
@@ -977,7 +1329,8 @@ def deactivate_family(request, family_id):
 def delete_family_member(request, family_id):
     try:
         family_member = Family.objects.get(id=family_id)
-        family_member.delete()
+        with transaction.atomic():
+            family_member.delete()
         return Response({"message": "Family member deleted successfully"}, status=status.HTTP_200_OK)
     except Family.DoesNotExist:
         return Response({"error": "Family member not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -1080,9 +1433,77 @@ def add_edir(request):
 @permission_classes([IsAuthenticated])
 def list_edirs(request):
     edirs = Edir.objects.all()
-    serializer = EdirSerializer(edirs, many=True)
+
+    edir_status = request.query_params.get("status")
+    if edir_status:
+        if edir_status not in dict(Edir._meta.get_field("status").choices):
+            return Response({"error": f"Invalid status '{edir_status}'"}, status=400)
+        edirs = edirs.filter(status=edir_status)
+
+    term = request.query_params.get("q", "").strip()
+    if term:
+        edirs = search_edirs(edirs, term)
+    else:
+        edirs = edirs.order_by("id")
+    edirs = EdirSerializer.sparse_queryset(edirs, request.query_params)
+
+    context = {"fieldset": request.query_params}
+    if EdirCatalogPagination.is_requested(request):
+        paginator = EdirCatalogPagination()
+        page = paginator.paginate_queryset(edirs, request)
+        return paginator.get_paginated_response(EdirSerializer(page, many=True, context=context).data)
+    serializer = EdirSerializer(edirs, many=True, context=context)
     return Response(serializer.data)
 
+NEARBY_DEFAULT_RADIUS_KM = 5
+NEARBY_MAX_RADIUS_KM = 50
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_nearby_edirs(request):
+    try:
+        lat = float(request.query_params["lat"])
+        lng = float(request.query_params["lng"])
+        radius = float(request.query_params.get("radius", NEARBY_DEFAULT_RADIUS_KM))
+    except KeyError:
+        return Response({"error": "lat and lng are required"}, status=400)
+    except ValueError:
+        return Response({"error": "lat, lng and radius must be numbers"}, status=400)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return Response({"error": "lat or lng out of range"}, status=400)
+    if not 0 < radius <= NEARBY_MAX_RADIUS_KM:
+        return Response({"error": f"radius must be between 0 and {NEARBY_MAX_RADIUS_KM} km"}, status=400)
+
+    edirs = nearby_edirs(lat, lng, radius)
+    paginator = EdirCatalogPagination() if EdirCatalogPagination.is_requested(request) else None
+    if paginator is not None:
+        edirs = paginator.paginate_queryset(edirs, request)
+    data = [
+        {**item, "distance_km": edir.distance_km}
+        for edir, item in zip(edirs, EdirSerializer(edirs, many=True, context={"fieldset": request.query_params}).data)
+    ]
+    if paginator is not None:
+        return paginator.get_paginated_response(data)
+    return Response(data)
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def response_cache_metrics(request):
+    return Response(cache_metrics())
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def home(request):
+    logger = logging.getLogger("edir_creation")
+    try:
+        return Response(home_summary(request.user, context={"request": request}))
+    except Exception as e:
+        logger.exception(f"Home summary failed | requested by={request.user} | error={str(e)}")
+        return Response(
+            {'error': 'Internal server error'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_user_with_edirs(request):
@@ -1091,7 +1512,8 @@ def get_user_with_edirs(request):
         ediruser__user=request.user,
         ediruser__status="Active"   # <-- FILTER BY ACTIVE MEMBERSHIP
     )
-    serializer = EdirSerializer(edirs, many=True)
+    edirs = EdirSerializer.sparse_queryset(edirs, request.query_params)
+    serializer = EdirSerializer(edirs, many=True, context={"fieldset": request.query_params})
     # serializer = UserWithEdirsSerializer(request.user)
     return Response(serializer.data)
 
@@ -1111,19 +1533,14 @@ def get_user_with_edirs(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_popular_edirs(request):
-    excluded_edirs = EdirUser.objects.filter(
-        user=request.user,
-        status__in=["Active", "Pending"]
-    ).values("edir_id")
+    excluded = joined_edir_ids(request.user)
+    edirs = [edir for edir in popular_edirs() if edir["id"] not in excluded]
 
-    edirs = Edir.objects.filter(
-        status="Active", is_popular = True
-    ).exclude(
-        id__in=Subquery(excluded_edirs)
-    )
-
-    serializer = EdirSerializer(edirs, many=True)
-    return Response(serializer.data)
+    if EdirCatalogPagination.is_requested(request):
+        paginator = EdirCatalogPagination()
+        page = paginator.paginate_queryset(edirs, request)
+        return paginator.get_paginated_response(page)
+    return Response(edirs)
 
 # @api_view(["GET"])
 # @permission_classes([IsAuthenticated])
@@ -1138,10 +1555,18 @@ def get_popular_edirs(request):
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_requested_edirs(request):
-    edirs = Edir.objects.filter(
-        ediruser__user=request.user,
-        ediruser__status__in=["Pending", "Rejected", "Cancelled"]
-    ).distinct()
+    join_requests = EdirUser.objects.filter(
+        user=request.user,
+        status__in=["Pending", "Rejected", "Cancelled"]
+    )
+    edirs = (
+        Edir.objects.filter(id__in=join_requests.values("edir_id"))
+        .annotate(user_status=Subquery(
+            join_requests.filter(edir=OuterRef("pk")).values("status")[:1]
+        ))
+        .order_by("id")
+    )
+    edirs = EdirWithUserStatusSerializer.sparse_queryset(edirs, request.query_params)
 
     serializer = EdirWithUserStatusSerializer(
         edirs,
@@ -1206,13 +1631,15 @@ def add_bank(request, edir_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@condition(etag_func=revision_etag("banks"))
 def edir_bank_list(request, edir_id):
     logger = logging.getLogger("bank_account")
     try:
         edir = Edir.objects.get(id=edir_id)
         bank = Bank.objects.filter(edir=edir, status__in=["Active", "Pending"])
+        bank = BankWithEdirSerializer.sparse_queryset(bank, request.query_params)
         
-        serializer = BankWithEdirSerializer(bank, many=True)
+        serializer = BankWithEdirSerializer(bank, many=True, context={"fieldset": request.query_params})
         # print(serializer.data)
         return Response(serializer.data)
     except Exception as e:
@@ -1377,10 +1804,13 @@ def add_event(request, edir_id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@condition(etag_func=revision_etag("events"))
 def edir_event_list(request, edir_id):
     try:
         edir = Edir.objects.get(id=edir_id)
-        event = Event.objects.filter(edir=edir, status="Active")
+        event = EventSerializer.sparse_queryset(
+            Event.objects.filter(edir=edir, status="Active"), request.query_params
+        )
     except Edir.DoesNotExist:
         return Response({"detail": "Edir not added"}, status=status.HTTP_404_NOT_FOUND)
     except Event.DoesNotExist:
@@ -1393,7 +1823,7 @@ def edir_event_list(request, edir_id):
         except ValueError:
             return Response({"error": "Invalid limit"}, status=status.HTTP_400_BAD_REQUEST)
 
-    serializer = EventSerializer(event, many=True)
+    serializer = EventSerializer(event, many=True, context={"fieldset": request.query_params})
     return Response(serializer.data)
 
 
@@ -1401,11 +1831,13 @@ def edir_event_list(request, edir_id):
 @permission_classes([IsAuthenticated])
 def popular_event_list(request):
     try:
-        event = Event.objects.filter(edir__isnull=True, status="Active")
+        event = EventSerializer.sparse_queryset(
+            Event.objects.filter(edir__isnull=True, status="Active"), request.query_params
+        )
     except Event.DoesNotExist:
         return Response({"detail": "Event not added"}, status=status.HTTP_404_NOT_FOUND)
     
-    serializer = EventSerializer(event, many=True)
+    serializer = EventSerializer(event, many=True, context={"fieldset": request.query_params})
     return Response(serializer.data)
 
 @api_view(['GET', 'PUT'])
@@ -2013,10 +2445,11 @@ def get_payment_detail(request, ref):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response("dashboard")
 def dashboard(request, edir_id):
     logger = logging.getLogger("edir_creation")
     try:
-        edir = Edir.objects.get(id=edir_id)
+        edir = dashboard_edir(edir_id, request.user)
         serializer = EdirDetailSerializer(edir, context={"request": request})
             
         # data = serializer.data
@@ -2252,11 +2685,12 @@ def reject_edir_edit(request, id):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response("edir_details")
 def edir_details(request, edir_id):
     user = request.user
     today = date.today()
     try:
-        edir = Edir.objects.get(id=edir_id)
+        edir = dashboard_edir(edir_id, request.user)
         serializer = EdirDetailSerializer(edir, context={"request": request})
 
     except Edir.DoesNotExist:
@@ -2657,9 +3091,9 @@ def get_edir_incomes(request, edir_id):
         )
         .annotate(has_payment=Exists(paid_trx))
         .filter(has_payment=True)
-        .select_related("fee", "user")  # optimize
         .order_by("-id")
     )
+    paid_fees = FeeAssignmentSerializer.sparse_queryset(paid_fees, request.query_params)
 
     limit = request.query_params.get("limit")
     if limit is not None:
@@ -2671,7 +3105,7 @@ def get_edir_incomes(request, edir_id):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-    serializer = FeeAssignmentSerializer(paid_fees, many=True)
+    serializer = FeeAssignmentSerializer(paid_fees, many=True, context={"fieldset": request.query_params})
     return Response(serializer.data, status=200)
 
 @api_view(["GET"])
@@ -2844,84 +3278,91 @@ def create_fee(request, edir_id):
 
         supported_member = None
         if supported_member_id and (category == "Funeral Contribution" or category == "Sickness Support"):
+            try:
+                supported_member_id = int(supported_member_id)
+            except (TypeError, ValueError):
+                return Response({"error": "supportedMember must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
             supported_member = User.objects.get(id=supported_member_id)
 
-        fee = Fee.objects.create(
-            edir=edir,
-            category=data.get("category"),
-            name=data.get("name"),
-            supported_member = supported_member,
-            maker = request.user,
-            reason=data.get("reason"),
-            amount=data.get("amount"),
-            payment_date=data.get("payment_date"),
-        )
+        if assign_type == "Custom Users":
+            users = data.get("users", [])
+            if not isinstance(users, list):
+                return Response({"error": "users must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                user_ids = list(dict.fromkeys(int(uid) for uid in users))
+            except (TypeError, ValueError):
+                return Response({"error": "users must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+            found_ids = set(User.objects.filter(id__in=user_ids).values_list("id", flat=True))
+            missing = [uid for uid in user_ids if uid not in found_ids]
+            if missing:
+                return Response(
+                    {"error": f"Users not found: {missing}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if supported_member:
+                user_ids = [uid for uid in user_ids if uid != supported_member.id]
 
-        if assign_type == "All Members":
-            # members = edir.users.all()
-            members = User.objects.filter(
-                ediruser__edir=edir,
-                ediruser__status="Active"
-            )
-            for m in members:
-                if supported_member and m == supported_member:
-                    # FeeAssignment.objects.create(fee=fee, user=m, payment_status="For You")
-                    continue
-                else:
-                    FeeAssignment.objects.create(fee=fee, user=m, maker = request.user)
-            
-            assigned_members_info = [
-                {
-                    "id": m.id,
-                    "phone": m.phone_number
-                }
-                for m in members
-            ]
-            logger.info(
-                f"fee created for all members successfully | "
-                f"fee={fee} | "
-                f"assigned_members={assigned_members_info} | "
-                f"created_by={request.user.id, request.user.phone_number}"
+        with transaction.atomic():
+            fee = Fee.objects.create(
+                edir=edir,
+                category=data.get("category"),
+                name=data.get("name"),
+                supported_member = supported_member,
+                maker = request.user,
+                reason=data.get("reason"),
+                amount=data.get("amount"),
+                payment_date=data.get("payment_date"),
             )
-            FeeAuditLog.objects.create(
-                fee=fee,
-                action="Create Fee",
-                performed_by=request.user,
-                new_value= {
-                    "fee": model_to_dict(fee),
-                    "assigned_members": assigned_members_info,
-                    "created_by": {
-                        "id": request.user.id,
-                        "phone_number": request.user.phone_number,
-                    }
-                },
+
+            if assign_type == "All Members":
+                members = (
+                    User.objects.filter(ediruser__edir=edir, ediruser__status="Active")
+                    .order_by("id")
+                    .values_list("id", flat=True)
+                )
+                if supported_member:
+                    members = members.exclude(id=supported_member.id)
+                member_ids = list(members)
+                assign_fee(fee, member_ids, maker=request.user)
+                # The assignments themselves list the members; keep the audit row small
+                FeeAuditLog.objects.create(
+                    fee=fee,
+                    action="Create Fee",
+                    performed_by=request.user,
+                    new_value= {
+                        "fee": model_to_dict(fee),
+                        "assigned_member_count": len(member_ids),
+                        "created_by": {
+                            "id": request.user.id,
+                            "phone_number": request.user.phone_number,
+                        }
+                    },
+                    )
+                logger.info(
+                    f"fee created for all members successfully | "
+                    f"fee={fee} | "
+                    f"assigned_members={len(member_ids)} | "
+                    f"created_by={request.user.id, request.user.phone_number}"
                 )
 
-        elif assign_type == "Custom Users":
-            user_ids = data.get("users", [])
-            for uid in user_ids:
-                user = User.objects.get(id=uid)
-                if supported_member and user == supported_member:
-                    # FeeAssignment.objects.create(fee=fee, user=user, payment_status="For You")
-                    continue
-                else:
-                    FeeAssignment.objects.create(fee=fee, user=user, maker = request.user)
-            FeeAuditLog.objects.create(
-                fee=fee,
-                action="Create Fee",
-                performed_by=request.user,
-                new_value= {
-                    "fee": model_to_dict(fee),
-                    "assigned_members": model_to_dict(user_ids),
-                    "created_by": {
-                        "id": request.user.id,
-                        "phone_number": request.user.phone_number,
-                    }
-                },
+            elif assign_type == "Custom Users":
+                assign_fee(fee, user_ids, maker=request.user)
+                FeeAuditLog.objects.create(
+                    fee=fee,
+                    action="Create Fee",
+                    performed_by=request.user,
+                    new_value= {
+                        "fee": model_to_dict(fee),
+                        "assigned_members": user_ids,
+                        "created_by": {
+                            "id": request.user.id,
+                            "phone_number": request.user.phone_number,
+                        }
+                    },
+                    )
+                logger.info(
+                    f"fee created for custom members successfully | fee={fee} | assigned_members={len(user_ids)} | created_by={request.user.id, request.user.phone_number}"
                 )
-            logger.info(
-                f"fee created for custom members successfully | fee={fee} assigned members id = {user_ids} created by = {request.user.id}, {request.user.phone_number}"
-            )
 
         return Response(FeeSerializer(fee).data, status=status.HTTP_201_CREATED)
     except Edir.DoesNotExist:
@@ -3119,6 +3560,7 @@ def update_expense(request, fee_id):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@condition(etag_func=revision_etag("fees"))
 def get_edir_fees(request, edir_id):
     logger = logging.getLogger("fetch_payment")
     try:
@@ -3138,6 +3580,7 @@ def get_edir_fees(request, edir_id):
                 status="Active",
                 fee_type="Income",
             )
+        fees = FeeSerializer.sparse_queryset(fees, request.query_params)
 
         limit = request.query_params.get("limit")
         if limit:
@@ -3149,7 +3592,7 @@ def get_edir_fees(request, edir_id):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-        serializer = FeeSerializer(fees, many=True)
+        serializer = FeeSerializer(fees, many=True, context={"fieldset": request.query_params})
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     except Exception as e:
@@ -3309,7 +3752,12 @@ def get_unpaid_fees(request, edir_id, user_id):
             for a in unpaid_fees
         ]
 
-        return Response(data, status=status.HTTP_200_OK)
+        balance = get_member_balance(user_id, edir_id)
+        response = Response(data, status=status.HTTP_200_OK)
+        response["X-Outstanding-Balance"] = str(balance.outstanding)
+        response["X-Pending-Balance"] = str(balance.pending)
+        response["X-Paid-Balance"] = str(balance.paid)
+        return response
 
     except Exception as e:
         logger.exception(
@@ -3579,10 +4027,13 @@ def pay_fees(request, edir_id):
         )
 
         # ✅ link all assignments to this transaction
-        assignments.update(transaction=trx)
+        assignment_ids = list(assignments.values_list("id", flat=True))
+        FeeAssignment.objects.filter(id__in=assignment_ids).update(transaction=trx)
+        # update() skips the FeeAssignment signal that keeps balances current
+        refresh_balances_for(FeeAssignment.objects.filter(id__in=assignment_ids))
 
         logger.info(
-            f"Payment created | trx={trx.reference} | assignments={assignments.count()} | by={request.user}"
+            f"Payment created | trx={trx.reference} | assignments={len(assignment_ids)} | by={request.user}"
         )
         TrxAuditLog.objects.create(
             transaction=trx,
@@ -3596,7 +4047,7 @@ def pay_fees(request, edir_id):
             {
                 "transaction_id": trx.id,
                 "reference": trx.reference,
-                "paid_fees": assignments.count(),
+                "paid_fees": len(assignment_ids),
             },
             status=201,
         )
@@ -3694,11 +4145,7 @@ def change_password(request):
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    user = request.user
-    user.set_password(serializer.validated_data['new_password'])
-    user.save()
-
-    # Optionally: invalidate existing tokens (forces re-login)
-    # Token.objects.filter(user=user).delete()
+    # Tokens issued before the change stop working; hand this client new ones
+    tokens = apply_new_password(request.user, hash_password(serializer.validated_data['new_password']))
 
-    return Response({'detail': 'Password changed successfully'}, status=status.HTTP_200_OK)
+    return Response({'detail': 'Password changed successfully', **tokens}, status=status.HTTP_200_OK)
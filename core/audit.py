@@ -9,6 +9,8 @@ def model_to_json(instance, exclude=None):
     data = model_to_dict(instance, exclude=exclude or [])
 
     for field in instance._meta.fields:
+        if exclude and field.name in exclude:
+            continue
         value = getattr(instance, field.name, None)
 
         # Handle File/Image fields
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -62,14 +63,32 @@ REST_FRAMEWORK = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'phone_lookup': '30/hour',
+    },
+}
+# Token buckets for the unauthenticated phone and password endpoints: each
+# caller IP and each phone number gets `capacity` requests, refilled steadily
+TOKEN_BUCKET_THROTTLES = {
+    'phone_check': {
+        'ip': {'capacity': 60, 'refill_per_minute': 30},
+        'phone': {'capacity': 10, 'refill_per_minute': 5},
+    },
+    'password': {
+        'ip': {'capacity': 20, 'refill_per_minute': 10},
+        'phone': {'capacity': 5, 'refill_per_minute': 1},
+    },
 }
+# "memory" keeps buckets per process; "cache" shares them through CACHES[TOKEN_BUCKET_CACHE]
+TOKEN_BUCKET_STORE = os.environ.get('TOKEN_BUCKET_STORE', 'memory')
+TOKEN_BUCKET_CACHE = 'default'
 DJOSER = {
     'LOGIN_FIELD': 'phone_number',
     'USER_CREATE_PASSWORD_RETYPE': True,
@@ -85,7 +104,28 @@ SIMPLE_JWT = {
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'api.tokens.VersionedTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.tokens.VersionedTokenRefreshSerializer',
+}
+AUTH_USER_CACHE_SIZE = 10000
+AUTH_USER_CACHE_TTL = 300
+# Seconds the shared popular-edir list may be served before it is rebuilt
+POPULAR_EDIRS_CACHE_TIMEOUT = 300
+# Per-process local memory unless a shared backend is configured; the
+# response cache and shared token buckets use these aliases
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'edir-amba',
+    },
 }
+# Cached dashboard/edir_details responses, invalidated per edir on writes
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+# Nominatim-compatible geocoder used by the geocode_edirs command
+GEOCODER_URL = os.environ.get("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+GEOCODER_USER_AGENT = os.environ.get("GEOCODER_USER_AGENT", "edir-amba")
+GEOCODER_COUNTRY_CODES = "et"
 
 ROOT_URLCONF = 'edir_amba.urls'
 AUTH_USER_MODEL = 'api.CustomUser'
@@ -126,6 +166,22 @@ DATABASES = {
 }
 
 
+PASSWORD_HASHERS = [
+    'api.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# PBKDF2 work factor; existing hashes are upgraded on the next login
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', '1000000'))
+# Password hashes computed at once, across all request threads
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+
+AUTHENTICATION_BACKENDS = [
+    'api.authentication.PooledModelBackend',
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -215,6 +271,11 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
+        "edir_membership": {
+            "handlers": ["daily_file"],
+            "level": "INFO",
+            "propagate": False,
+        },
     },
 }
 